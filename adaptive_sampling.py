@@ -0,0 +1,105 @@
+import cv2
+
+from frame_sampler import sample_frames, seek_sample_frames
+from gesture_detection import GestureTracker, get_frame_interval, get_hands, infer_landmarks
+from inference_preprocess import make_preprocessor
+from keyframe_index import load_keyframe_index
+
+# === Helpers ===
+def get_coarse_interval(fps, dense_interval, coarse_fps):
+    """Coarse step, rounded to a multiple of the dense step so coarse frames are dense frames too."""
+    return dense_interval * max(1, round(fps / coarse_fps / dense_interval))
+
+# === Pass 1: Coarse Scan ===
+def coarse_scan(input_file, coarse_interval, hands, preprocessor=None, progress=None, seek=False):
+    """Return (frames with a hand, inference calls).
+
+    With seek, a coarse step longer than a GOP jumps between keyframes
+    instead of decoding every frame (see seek_sample_frames).
+    """
+    cap = cv2.VideoCapture(input_file)
+    hits = []
+    calls = 0
+    frames = (seek_sample_frames(cap, coarse_interval, load_keyframe_index(input_file), progress) if seek
+              else sample_frames(cap, coarse_interval, progress))
+    for frame_number, image in frames:
+        calls += 1
+        if infer_landmarks(hands, image, preprocessor):
+            hits.append(frame_number)
+    cap.release()
+    return hits, calls
+
+def dense_windows(hits, coarse_interval):
+    """Merge (previous coarse frame, next coarse frame) around every hit.
+
+    The neighbouring coarse frames had no hand, and frames without a hand
+    never change GestureTracker, so only the open interval between them
+    needs dense sampling. Windows are (start, end), 1-based and inclusive.
+    """
+    windows = []
+    for hit in hits:
+        start, end = max(1, hit - coarse_interval + 1), hit + coarse_interval - 1
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], end)
+        else:
+            windows.append((start, end))
+    return windows
+
+# === Adaptive Detection ===
+def detect_adaptive(input_file, fps_reduction_factor, coarse_fps=2, hands=None, progress=None,
+                    preprocess=None, cache_writer=None, event_log=None, frame_source='opencv'):
+    """Coarse scan for hands, then dense sampling only around them.
+
+    The dense frames are the same ones a fixed-interval run would sample
+    (frame_number % frame_interval == 0), so the events match a dense run
+    unless a hand is visible for less than one coarse step and never lands
+    on a coarse frame. Returns (score_events, stats) with the inference
+    calls made and the calls a dense run would have made. frame_source
+    'seek' lets the coarse scan seek (the dense windows are read in order
+    and seek on their own); anything else reads with plain OpenCV.
+    """
+    hands = hands or get_hands()
+    preprocessor = make_preprocessor(preprocess)
+    cap = cv2.VideoCapture(input_file)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    dense_interval = get_frame_interval(fps, fps_reduction_factor)
+    coarse_interval = get_coarse_interval(fps, dense_interval, coarse_fps)
+
+    hits, coarse_calls = coarse_scan(input_file, coarse_interval, hands, preprocessor, progress,
+                                     frame_source == 'seek')
+
+    tracker = GestureTracker(event_log=event_log)
+    score_events = []
+    dense_calls = 0
+    cap = cv2.VideoCapture(input_file)
+    position = 0
+    for start, end in dense_windows(hits, coarse_interval):
+        # Seek only when it skips more than a second; short gaps are cheaper to grab through.
+        if start - 1 - position > fps:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start - 1)
+            position = start - 1
+        while position < start - 1 and cap.grab():
+            position += 1
+        for frame_number, image in sample_frames(cap, dense_interval, start_frame=position):
+            position = frame_number
+            landmarks = infer_landmarks(hands, image, preprocessor)
+            dense_calls += 1
+            if cache_writer:
+                cache_writer.add(frame_number, landmarks)
+            score_events.extend(tracker.update(frame_number, frame_number / fps, landmarks))
+            if frame_number + dense_interval > end:
+                break
+    cap.release()
+
+    stats = {'coarse_calls': coarse_calls, 'dense_calls': dense_calls,
+             'dense_run_calls': frame_count // dense_interval}
+    return score_events, stats
+
+def print_adaptive_stats(input_file, stats):
+    calls = stats['coarse_calls'] + stats['dense_calls']
+    baseline = max(1, stats['dense_run_calls'])
+    print(f"{input_file}: {calls} hands.process calls ({stats['coarse_calls']} coarse + "
+          f"{stats['dense_calls']} dense) vs {baseline} for a dense run, "
+          f"{100 * (1 - calls / baseline):.1f}% fewer")
@@ -0,0 +1,74 @@
+# hands.process latency per InferencePreprocessor setting on real footage.
+#
+#   python benchmarks/bench_inference_preprocess.py GX011291.MP4 --frames 200 --roi 0.3 0.2 0.7 1.0
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import mediapipe as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_sampler import sample_frames
+from inference_preprocess import make_preprocessor
+
+
+def load_frames(video_path, frame_interval, count):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    for _, image in sample_frames(cap, frame_interval):
+        frames.append(image)
+        if len(frames) >= count:
+            break
+    cap.release()
+    return frames
+
+def time_setting(frames, preprocess):
+    hands = mp.solutions.hands.Hands()
+    preprocessor = make_preprocessor(preprocess)
+    prepare_time = infer_time = 0.0
+    hands_found = 0
+    for image in frames:
+        start = time.perf_counter()
+        image_rgb = preprocessor.prepare(image) if preprocessor else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        mid = time.perf_counter()
+        landmarks = hands.process(image_rgb).multi_hand_landmarks
+        if preprocessor:
+            landmarks = preprocessor.map_landmarks(landmarks)
+        end = time.perf_counter()
+        prepare_time += mid - start
+        infer_time += end - mid
+        hands_found += bool(landmarks)
+    hands.close()
+    n = len(frames)
+    return prepare_time / n * 1000, infer_time / n * 1000, hands_found
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('video')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--frame-interval', type=int, default=5)
+    parser.add_argument('--roi', type=float, nargs=4, metavar=('X0', 'Y0', 'X1', 'Y1'))
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frame_interval, args.frames)
+    height, width = frames[0].shape[:2]
+    print(f"{os.path.basename(args.video)}: {width}x{height}, {len(frames)} sampled frames")
+
+    settings = [('full frame', None)]
+    for target_width in (1920, 1280, 960, 640):
+        if target_width < width:
+            settings.append((f'width {target_width}', {'target_width': target_width}))
+    if args.roi:
+        settings.append(('fixed roi', {'roi': tuple(args.roi)}))
+        settings.append(('fixed roi, width 640', {'roi': tuple(args.roi), 'target_width': 640}))
+    settings.append(('auto roi, width 960', {'auto_roi': True, 'target_width': 960}))
+
+    baseline = None
+    for name, preprocess in settings:
+        prepare_ms, infer_ms, hands_found = time_setting(frames, preprocess)
+        total = prepare_ms + infer_ms
+        baseline = baseline or total
+        print(f"{name:22s} prepare {prepare_ms:6.2f} ms  hands.process {infer_ms:6.2f} ms  "
+              f"saved {100 * (1 - total / baseline):5.1f}%  frames with hands {hands_found}")
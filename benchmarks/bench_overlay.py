@@ -0,0 +1,55 @@
+# Per-frame scoreboard cost: draw_text_with_background twice (as in
+# hl_overlay.py, which copies the frame per call) against the cached-sprite
+# compositor in overlay.py.
+#
+#   python benchmarks/bench_overlay.py --frames 200
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from overlay import draw_scoreboard
+
+
+def draw_text_with_background(image, text, font, scale, color, thickness, bg_color, x_offset, y_offset, padding=10):
+    text_size, _ = cv2.getTextSize(text, font, scale, thickness)
+    width, _ = image.shape[1], image.shape[0]
+    x = int((width - text_size[0] - padding) // 2 + x_offset)
+    y = int(y_offset)
+    bg_color = tuple(map(int, bg_color))
+    writable_image = image.copy()
+    cv2.rectangle(writable_image, (x, y - text_size[1] - padding), (x + text_size[0] + padding, y + padding), bg_color, -1)
+    cv2.putText(writable_image, text, (x + padding // 2, y - padding // 2), font, scale, color, thickness, cv2.LINE_AA)
+    return writable_image
+
+def old_overlay(img, s1, s2):
+    return draw_text_with_background(
+        draw_text_with_background(img, f'Team Black: {s1}', cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, (0, 0, 0), 0, 50),
+        f'Team Orange: {s2}', cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, (0, 0, 255), 0, 100)
+
+def new_overlay(img, s1, s2):
+    return draw_scoreboard(img, 'Team Black', s1, 'Team Orange', s2,
+                           ((0, 0, 0), (255, 255, 255)), ((0, 0, 255), (255, 255, 255)))
+
+def time_per_frame(overlay, frame, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        overlay(frame, i // 50, i // 70)  # score changes now and then
+    return (time.perf_counter() - start) / frames * 1e6
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    for name, (width, height) in (('1080p', (1920, 1080)), ('4K', (3840, 2160))):
+        frame = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+        writable = time_per_frame(old_overlay, frame, args.frames), time_per_frame(new_overlay, frame, args.frames)
+        frame.flags.writeable = False  # what moviepy hands to fl_image
+        readonly = time_per_frame(old_overlay, frame, args.frames), time_per_frame(new_overlay, frame, args.frames)
+        print(f"{name:5s} writable frame:  old {writable[0]:8.0f} us  sprite {writable[1]:6.0f} us")
+        print(f"{name:5s} read-only frame: old {readonly[0]:8.0f} us  sprite {readonly[1]:6.0f} us")
@@ -0,0 +1,72 @@
+# Decoded frames per second of the old read-then-skip loop against
+# frame_sampler.sample_frames and the ffmpeg raw pipe, on a real chapter
+# (ideally a long 4K one).
+#
+#   python benchmarks/bench_sampling.py GX011291.MP4 --fps-reduction-factor 5
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ffmpeg_source import ffmpeg_frames
+from frame_sampler import sample_frames
+
+
+def read_then_skip(cap, frame_interval, max_frames):
+    sampled = []
+    while cap.isOpened():
+        success, image = cap.read()
+        if not success:
+            break
+        frame_number = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if frame_number % frame_interval == 0:
+            sampled.append(frame_number)
+        if max_frames and frame_number >= max_frames:
+            break
+    return sampled
+
+def grab_and_sample(cap, frame_interval, max_frames):
+    sampled = []
+    for frame_number, _ in sample_frames(cap, frame_interval):
+        if max_frames and frame_number > max_frames:
+            break
+        sampled.append(frame_number)
+    return sampled
+
+def ffmpeg_pipe(video_path, frame_interval, max_frames):
+    end_frame = max_frames or None
+    return [frame_number for frame_number, _ in ffmpeg_frames(video_path, frame_interval, end_frame=end_frame)]
+
+def run(name, reader, video_path, frame_interval, max_frames):
+    cap = cv2.VideoCapture(video_path)
+    start = time.perf_counter()
+    sampled = reader(video_path if reader is ffmpeg_pipe else cap, frame_interval, max_frames)
+    elapsed = time.perf_counter() - start
+    cap.release()
+    frames = max_frames or (sampled[-1] if sampled else 0)
+    print(f"{name:16s} {frames / elapsed:8.1f} decoded frames/s  "
+          f"{len(sampled)} sampled in {elapsed:.2f}s")
+    return sampled
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('video')
+    parser.add_argument('--fps-reduction-factor', type=float, default=5)
+    parser.add_argument('--max-frames', type=int, default=0)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    frame_interval = int(fps / (fps / args.fps_reduction_factor))
+    print(f"{os.path.basename(args.video)}: {width}x{height} @ {fps:.2f} fps, frame_interval={frame_interval}")
+
+    before = run('read-then-skip', read_then_skip, args.video, frame_interval, args.max_frames)
+    after = run('grab/retrieve', grab_and_sample, args.video, frame_interval, args.max_frames)
+    print("Sampled frame numbers match" if before == after else "Sampled frame numbers DIFFER")
+    piped = run('ffmpeg pipe', ffmpeg_pipe, args.video, frame_interval, args.max_frames)
+    print("ffmpeg frame numbers match" if piped == before else "ffmpeg frame numbers DIFFER")
@@ -0,0 +1,214 @@
+# End-to-end stage timings on synthetic footage, so the pipeline can be
+# measured without match recordings. Clips (ffmpeg testsrc2 + a tone) and
+# a _scores.csv with evenly spaced events are generated into --work-dir
+# and reused on later runs.
+#
+#   python benchmarks/bench_suite.py --output bench.json
+#   python benchmarks/bench_suite.py --baseline bench.json --tolerance 0.15
+#
+# Metrics ending in _per_s are better when higher, the rest (_s, _us) when
+# lower. With --baseline every metric that got worse by more than
+# --tolerance is listed and the exit status is 1. The synthetic frames
+# contain no hands, so inference_calls_per_s is the no-detection rate.
+# The startup stage times `cli.py <command> -n` for every command and fails
+# the run if one of them, or a render with the ffmpeg renderer, imports a
+# library that only detection, the moviepy renderer or uploads need.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+from gesture_detection import detect_range, get_frame_interval, get_hands, open_sampled_frames, format_timestamp
+from overlay import draw_scoreboard
+from segment_split import split_segments
+
+STAGES = ('decode', 'inference', 'overlay', 'render', 'split', 'startup')
+CLI_COMMANDS = ('detect', 'render', 'split', 'combine', 'upload', 'run')
+HEAVY_MODULES = ('mediapipe', 'moviepy', 'googleapiclient', 'google_auth_oauthlib')
+TEAM1_COLORS, TEAM2_COLORS = ((255, 255, 0), (0, 0, 0)), ((0, 0, 255), (255, 255, 255))
+
+# === Synthetic Footage ===
+def make_clip(work_dir, width, height, fps, seconds):
+    path = os.path.join(work_dir, f'synthetic_{width}x{height}_{fps}fps_{seconds}s.mp4')
+    if not os.path.exists(path):
+        subprocess.run(['ffmpeg', '-v', 'error', '-y',
+                        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={fps}:duration={seconds}',
+                        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={seconds}',
+                        '-c:v', 'libx264', '-preset', 'ultrafast', '-g', str(fps), '-pix_fmt', 'yuv420p',
+                        '-c:a', 'aac', '-shortest', path], check=True)
+    return path
+
+def make_scores_csv(video_path, seconds, events_per_minute):
+    path = video_path.rsplit('.', 1)[0] + '_scores.csv'
+    count = max(1, int(seconds * events_per_minute / 60))
+    with open(path, 'w') as f:
+        f.write(f"{video_path}\nTimestamp,Team Black,Team Orange,Highlights\nStarting Scores,0,0,0\n")
+        for i in range(count):
+            t = (i + 1) * seconds / (count + 1)
+            f.write(f"{format_timestamp(t)},{int(i % 2 == 0)},{int(i % 2 == 1)},0\n")
+    return path
+
+# === Stages ===
+def bench_decode(video_path, fps_reduction_factor, frame_source, name='decode'):
+    cap = cv2.VideoCapture(video_path)
+    interval = get_frame_interval(cap.get(cv2.CAP_PROP_FPS), fps_reduction_factor)
+    cap.release()
+    start = time.perf_counter()
+    last = 0
+    for last, _ in open_sampled_frames(video_path, interval, frame_source=frame_source):
+        pass
+    return {f'{name}_{frame_source}_frames_per_s': last / (time.perf_counter() - start)}
+
+def bench_inference(video_path, fps_reduction_factor):
+    calls = []
+    start = time.perf_counter()
+    detect_range(video_path, fps_reduction_factor, hands=get_hands(), progress=calls.append)
+    elapsed = time.perf_counter() - start
+    cap = cv2.VideoCapture(video_path)
+    sampled = sum(calls) // get_frame_interval(cap.get(cv2.CAP_PROP_FPS), fps_reduction_factor)
+    cap.release()
+    return {'inference_calls_per_s': sampled / elapsed, 'detect_s': elapsed}
+
+def bench_overlay(width, height, frames=200):
+    from split_and_hl import draw_text_with_background
+    frame = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for i in range(frames):
+        draw_text_with_background(
+            draw_text_with_background(frame.copy(), f'Team Black: {i // 50}', cv2.FONT_HERSHEY_SIMPLEX, 1,
+                                      TEAM1_COLORS[1], 2, TEAM1_COLORS[0], 0, 50),
+            f'Team Orange: {i // 70}', cv2.FONT_HERSHEY_SIMPLEX, 1, TEAM2_COLORS[1], 2, TEAM2_COLORS[0], 0, 100)
+    legacy = (time.perf_counter() - start) / frames * 1e6
+    frame.flags.writeable = False
+    start = time.perf_counter()
+    for i in range(frames):
+        draw_scoreboard(frame, 'Team Black', i // 50, 'Team Orange', i // 70, TEAM1_COLORS, TEAM2_COLORS)
+    return {'overlay_legacy_us': legacy, 'overlay_sprite_us': (time.perf_counter() - start) / frames * 1e6}
+
+def bench_render(csv_path, renderer, include_overlays=True, slow_motion_factor=1):
+    from split_and_hl import create_highlight_video
+    start = time.perf_counter()
+    output = create_highlight_video(csv_path, highlight_duration=7, include_overlays=include_overlays,
+                                    slow_motion_factor=slow_motion_factor, renderer=renderer)
+    return {f'render_{renderer}_s': time.perf_counter() - start}, output
+
+def bench_split(highlight_path, formats, work_dir):
+    start = time.perf_counter()
+    split_segments(highlight_path, 7, formats, output_dir=os.path.join(work_dir, 'clips'))
+    return {'split_s': time.perf_counter() - start}
+
+def heavy_imports(command, cwd):
+    """Run cli.py with -X importtime; (wall seconds, heavy top-level modules it imported)."""
+    start = time.perf_counter()
+    run = subprocess.run([sys.executable, '-X', 'importtime', os.path.join(REPO, 'cli.py'), *command],
+                         cwd=cwd, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    imported = {line.split('|')[-1].strip().split('.')[0] for line in run.stderr.splitlines()
+                if line.startswith('import time:')}
+    return elapsed, sorted(imported.intersection(HEAVY_MODULES))
+
+def bench_startup(work_dir, csv_path):
+    """Startup seconds per command, and (what, modules) for every heavy import that should not happen."""
+    metrics, leaks = {}, []
+    for command in CLI_COMMANDS:
+        metrics[f'startup_{command}_s'], heavy = heavy_imports([command, '-n'], work_dir)
+        if heavy:
+            leaks.append((f'{command} -n', heavy))
+    _, heavy = heavy_imports(['render', '--renderer', 'ffmpeg', '--force', os.path.abspath(csv_path)], work_dir)
+    if heavy:
+        leaks.append(('render --renderer ffmpeg', heavy))
+    return metrics, leaks
+
+# === Baseline ===
+def compare(results, baseline, tolerance):
+    """(clip, metric, baseline, current) for every metric that regressed by more than tolerance."""
+    regressions = []
+    for clip, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(clip, {}).get(metric)
+            if not old:
+                continue
+            change = value / old - 1
+            worse = -change if metric.endswith('_per_s') else change
+            if worse > tolerance:
+                regressions.append((clip, metric, old, value))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resolutions', default='1280x720,1920x1080')
+    parser.add_argument('--fps', default='25,50')
+    parser.add_argument('--seconds', type=int, default=30)
+    parser.add_argument('--events-per-minute', type=float, default=4)
+    parser.add_argument('--fps-reduction-factor', type=float, default=5)
+    parser.add_argument('--sparse-fps', type=float, default=0.5, help="sampling rate of the decode_sparse metrics")
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--renderers', default='ffmpeg,moviepy')
+    parser.add_argument('--split-formats', default='square,mobile')
+    parser.add_argument('--work-dir', default='bench_media')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    stages = args.stages.split(',')
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = {}
+    for resolution in args.resolutions.split(','):
+        width, height = map(int, resolution.split('x'))
+        for fps in map(int, args.fps.split(',')):
+            clip = make_clip(args.work_dir, width, height, fps, args.seconds)
+            name = os.path.splitext(os.path.basename(clip))[0]
+            metrics = results[name] = {}
+            if 'decode' in stages:
+                metrics.update(bench_decode(clip, args.fps_reduction_factor, 'opencv'))
+                metrics.update(bench_decode(clip, args.fps_reduction_factor, 'ffmpeg'))
+                # Sampling sparser than the one-second GOPs of make_clip, where 'seek' skips whole GOPs
+                for frame_source in ('opencv', 'seek'):
+                    metrics.update(bench_decode(clip, fps / args.sparse_fps, frame_source, 'decode_sparse'))
+            if 'inference' in stages:
+                metrics.update(bench_inference(clip, args.fps_reduction_factor))
+            if 'overlay' in stages:
+                metrics.update(bench_overlay(width, height))
+            highlight = None
+            if 'render' in stages:
+                csv_path = make_scores_csv(clip, args.seconds, args.events_per_minute)
+                for renderer in args.renderers.split(','):
+                    timing, highlight = bench_render(csv_path, renderer)
+                    metrics.update(timing)
+            if 'split' in stages and highlight:
+                metrics.update(bench_split(highlight, tuple(args.split_formats.split(',')), args.work_dir))
+            print(name, json.dumps({k: round(v, 2) for k, v in metrics.items()}))
+
+    leaks = []
+    if 'startup' in stages:
+        csv_path = make_scores_csv(clip, args.seconds, args.events_per_minute)
+        results['cli_startup'], leaks = bench_startup(args.work_dir, csv_path)
+        print('cli_startup', json.dumps({k: round(v, 3) for k, v in results['cli_startup'].items()}))
+        for command, modules in leaks:
+            print(f"HEAVY IMPORT cli.py {command}: {', '.join(modules)}")
+
+    report = {'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                          'cpus': os.cpu_count(), 'opencv': cv2.__version__},
+              'settings': vars(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for clip, metric, old, new in regressions:
+            print(f"REGRESSION {clip} {metric}: {old:.2f} -> {new:.2f}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    if leaks:
+        sys.exit(1)
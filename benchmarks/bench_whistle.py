@@ -0,0 +1,85 @@
+# How much hand inference whistle gating saves on real chapters, and what
+# it costs: a full detect_range against detect_windows around the whistles
+# whistle_detection.WhistleGate finds, with the share of the video skipped
+# and the full-scan events the gated run missed.
+#
+#   python benchmarks/bench_whistle.py GX011291.MP4 GX021291.MP4 --before 10 --after 20
+#   python benchmarks/bench_whistle.py --synthetic bench_media --whistles 12,55,90
+#
+# --synthetic writes a clip (testsrc2 with pink noise and 3.5 kHz whistles
+# at the given seconds) to check that scan finds them; it contains no hands,
+# so only the whistle times and the skipped share mean anything on it.
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gesture_detection import detect_range, detect_windows, get_hands
+from whistle_detection import WhistleGate, print_whistle_report
+
+
+def make_whistle_clip(work_dir, whistle_times, seconds=120, whistle_seconds=0.8):
+    os.makedirs(work_dir, exist_ok=True)
+    path = os.path.join(work_dir, f"whistles_{'_'.join(str(t) for t in whistle_times)}_{seconds}s.mp4")
+    if not os.path.exists(path):
+        enable = '+'.join(f'between(t,{t},{t + whistle_seconds})' for t in whistle_times)
+        subprocess.run(['ffmpeg', '-v', 'error', '-y',
+                        '-f', 'lavfi', '-i', f'testsrc2=size=640x360:rate=25:duration={seconds}',
+                        '-f', 'lavfi', '-i', f'anoisesrc=color=pink:amplitude=0.05:duration={seconds}',
+                        '-f', 'lavfi', '-i', f'sine=frequency=3500:sample_rate=48000:duration={seconds}',
+                        '-filter_complex', f"[2]volume=0.5:enable='{enable}',volume=0:enable='not({enable})'[w];"
+                                           "[1][w]amix=inputs=2:normalize=0[a]",
+                        '-map', '0:v', '-map', '[a]', '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac',
+                        '-shortest', path], check=True)
+    return path
+
+def run(input_file, gate, fps_reduction_factor, hands):
+    cap = cv2.VideoCapture(input_file)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    duration = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) / fps
+    cap.release()
+    name = os.path.basename(input_file)
+
+    start = time.perf_counter()
+    whistles = gate.scan(input_file)
+    scan_seconds = time.perf_counter() - start
+    if whistles is None:
+        print(f"{name}: no audio")
+        return
+    print(f"{name}: audio scan {scan_seconds:.2f}s, whistles at "
+          + ', '.join(f'{start:.1f}s' for start, _, _ in whistles))
+    windows = gate.windows(whistles, duration)
+
+    start = time.perf_counter()
+    full_events = detect_range(input_file, fps_reduction_factor, hands=hands)
+    full_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    gated_events = detect_windows(input_file, fps_reduction_factor,
+                                  [(int(start * fps), int(end * fps)) for start, end in windows], hands=hands)
+    gated_seconds = time.perf_counter() - start
+    print(f"{name}: full scan {full_seconds:.1f}s, gated {scan_seconds + gated_seconds:.1f}s "
+          f"(audio scan included)")
+    print_whistle_report(name, whistles, windows, duration, full_events, gated_events)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos', nargs='*')
+    parser.add_argument('--before', type=float, default=10)
+    parser.add_argument('--after', type=float, default=20)
+    parser.add_argument('--min-snr-db', type=float, default=12)
+    parser.add_argument('--fps-reduction-factor', type=float, default=5)
+    parser.add_argument('--synthetic', metavar='DIR', help='also generate a clip with whistles into DIR')
+    parser.add_argument('--whistles', default='12,55,90', help='whistle seconds of the synthetic clip')
+    args = parser.parse_args()
+
+    videos = list(args.videos)
+    if args.synthetic:
+        videos.append(make_whistle_clip(args.synthetic, [int(t) for t in args.whistles.split(',')]))
+    gate = WhistleGate(before=args.before, after=args.after, min_snr_db=args.min_snr_db)
+    hands = get_hands()
+    for video in videos:
+        run(video, gate, args.fps_reduction_factor, hands)
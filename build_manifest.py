@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+
+from landmark_cache import video_fingerprint
+
+MANIFEST_NAME = 'highlights_manifest.json'
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+def output_files(result):
+    """Files a step produced: its result path, every file in a result directory, or nothing."""
+    if not isinstance(result, str) or not os.path.exists(result):
+        return []
+    if os.path.isdir(result):
+        return sorted(os.path.join(result, name) for name in os.listdir(result))
+    return [result]
+
+# === Build Manifest ===
+class BuildManifest:
+    """Skip pipeline steps whose inputs, settings and outputs haven't changed.
+
+    Each step is recorded under a name with the fingerprints of its input
+    files (size, mtime and sampled blocks, see video_fingerprint), a hash
+    of its parameters, its result and the fingerprints of the files it
+    produced. A step is current when all of those still match, so editing
+    a chapter, a setting or deleting an output reruns just that step and
+    the steps fed by it. The manifest is rewritten after every step, so a
+    run that dies halfway keeps what it finished.
+
+    A step with editable outputs (a _scores.csv that is reviewed and
+    corrected by hand) only needs them to exist: editing them keeps the
+    step current, so a rerun doesn't overwrite the corrections.
+    """
+
+    def __init__(self, path, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.steps = {}
+        if enabled and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.steps = json.load(f)
+            except (OSError, ValueError):
+                self.steps = {}
+
+    def is_current(self, name, inputs, params):
+        entry = self.steps.get(name)
+        if not entry or entry['params'] != params_hash(params):
+            return False
+        try:
+            if entry['inputs'] != [[p, video_fingerprint(p)] for p in inputs]:
+                return False
+            return all(os.path.exists(p) if fp is None else video_fingerprint(p) == fp for p, fp in entry['outputs'])
+        except OSError:
+            return False
+
+    def step(self, name, inputs, params, build, editable=False):
+        """build()'s result, or the recorded result when the step is current."""
+        if self.enabled and self.is_current(name, inputs, params):
+            print(f"Up to date: {name}")
+            return self.steps[name]['result']
+        result = build()
+        if self.enabled:
+            self.record(name, inputs, params, result, editable)
+        return result
+
+    def record(self, name, inputs, params, result, editable=False):
+        entry = {'inputs': [[p, video_fingerprint(p)] for p in inputs], 'params': params_hash(params),
+                 'result': result,
+                 'outputs': [[p, None if editable else video_fingerprint(p)] for p in output_files(result)]}
+        with self.lock:
+            self.steps[name] = entry
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.steps, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,183 @@
+# Command-line entry point for the highlight pipeline:
+#
+#   python cli.py detect [videos]       score events -> <video>_events.ndjson and _scores.csv
+#   python cli.py render [score files]  one highlight reel per _scores.csv
+#   python cli.py split [reels]         cut reels into short clips
+#   python cli.py combine [reels]       join reels into combined_highlights.mp4
+#   python cli.py upload [video]        upload to YouTube (--clips DIR for split clips too)
+#   python cli.py run                   all of the above, overlapping the stages (as split_and_hl.py does)
+#
+# Without file arguments a command takes what it finds in --dir (default:
+# the current directory); file arguments, like --clips, are relative to
+# --dir, not to where cli.py is run from. Every step goes through highlights_manifest.json,
+# so running detect, then render, then run does no step twice. Options
+# override the settings at the top of split_and_hl.py for this run.
+#
+# Only the standard library is imported here; the pipeline modules import
+# cv2 and numpy, and mediapipe, moviepy and the Google API client are only
+# imported by the code that uses them (detection, the moviepy renderer and
+# uploads). -n prints what a command would process and exits, which is
+# how benchmarks/bench_suite.py measures each command's startup.
+import argparse
+import os
+import sys
+import time
+
+_started = time.perf_counter()
+
+def _add_detect_options(parser):
+    parser.add_argument('--teams', nargs=2, metavar='NAME', help='team names, as signalled by 1 and 2 fingers')
+    parser.add_argument('--starting-scores', nargs=2, type=int, metavar='N')
+    parser.add_argument('--workers', type=int, help='detection processes shared by all chapters (detection_workers)')
+    parser.add_argument('--frame-source', choices=('opencv', 'seek', 'ffmpeg'))
+    parser.add_argument('--stream-render', action='store_true', help='cut each reel while its detection runs')
+    parser.add_argument('--whistles', type=float, nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='hand inference only from BEFORE seconds ahead of each referee whistle to AFTER past it')
+    parser.add_argument('--whistle-only', action='store_true', help='make every whistle a highlight, no hand inference')
+
+def _add_render_options(parser):
+    parser.add_argument('--renderer', choices=('moviepy', 'ffmpeg'))
+    parser.add_argument('--highlight-duration', type=float)
+    parser.add_argument('--overlays', action='store_true', help='draw the scoreboard on the reels')
+    parser.add_argument('--slow-motion', type=float, metavar='FACTOR')
+
+def _add_split_options(parser):
+    parser.add_argument('--formats', help="comma-separated segment_split formats, e.g. 'square,mobile'")
+    parser.add_argument('--segment-length', type=float, help='seconds per clip (segment_length)')
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-C', '--dir', default='.', help='directory with the recordings and outputs')
+    common.add_argument('-n', '--dry-run', action='store_true', help='print what would be processed and exit')
+    common.add_argument('--force', action='store_true', help='ignore highlights_manifest.json and redo every step')
+    common.add_argument('--join-chapters', action='store_true', help="treat a GoPro session's chapters as one video")
+
+    parser = argparse.ArgumentParser(description='Football highlights from hand-signalled score events.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    detect = commands.add_parser('detect', parents=[common], help='find score events in recordings')
+    detect.add_argument('files', nargs='*', help='chapters, relative to --dir (default: every GX*.mp4 there)')
+    _add_detect_options(detect)
+    render = commands.add_parser('render', parents=[common], help='cut highlight reels from score files')
+    render.add_argument('files', nargs='*', help='score files, relative to --dir (default: every *_scores.csv there)')
+    _add_render_options(render)
+    split = commands.add_parser('split', parents=[common], help='cut highlight reels into clips')
+    split.add_argument('files', nargs='*', help='reels, relative to --dir (default: every *_highlights.mp4 there)')
+    _add_split_options(split)
+    combine = commands.add_parser('combine', parents=[common], help='join highlight reels into one video')
+    combine.add_argument('files', nargs='*', help='reels, relative to --dir (default: every *_highlights.mp4 there)')
+    upload = commands.add_parser('upload', parents=[common], help='upload a video to YouTube')
+    upload.add_argument('file', nargs='?', help='relative to --dir (default: combined_highlights.mp4 there)')
+    upload.add_argument('--clips', action='append', default=[], metavar='DIR',
+                        help='also upload the clips in DIR, relative to --dir')
+    run = commands.add_parser('run', parents=[common], help='detect, render, split, combine and upload')
+    run.add_argument('files', nargs='*', help='chapters, relative to --dir (default: every GX*.mp4 there)')
+    _add_detect_options(run)
+    _add_render_options(run)
+    _add_split_options(run)
+    run.add_argument('--no-upload', action='store_true')
+    run.add_argument('--upload-clips', action='store_true', help='upload every split clip as well')
+    return parser
+
+def configure(hl, args):
+    """Copy the options that were given onto split_and_hl's settings."""
+    hl.incremental_build = not args.force
+    hl.join_chapters = args.join_chapters or hl.join_chapters
+    given = lambda name: getattr(args, name, None) is not None
+    if given('teams'):
+        hl.team_one, hl.team_two = args.teams
+    if given('starting_scores'):
+        hl.starting_score_one, hl.starting_score_two = args.starting_scores
+    if given('workers'):
+        hl.detection_workers = args.workers
+    if given('frame_source'):
+        hl.frame_source = args.frame_source
+    if given('whistles') or getattr(args, 'whistle_only', False):
+        before, after = args.whistles or (10, 20)
+        hl.whistle_gating = {'before': before, 'after': after, 'whistle_only': args.whistle_only}
+    if getattr(args, 'stream_render', False):
+        hl.stream_render = True
+    if given('renderer'):
+        hl.highlight_renderer = args.renderer
+    settings = dict(hl.highlight_settings)
+    if given('highlight_duration'):
+        settings['highlight_duration'] = args.highlight_duration
+    if getattr(args, 'overlays', False):
+        settings['include_overlays'] = True
+    if given('slow_motion'):
+        settings['slow_motion_factor'] = args.slow_motion
+    hl.highlight_settings = settings
+    if given('formats'):
+        hl.split_formats = tuple(args.formats.split(','))
+    if given('segment_length'):
+        hl.segment_length = args.segment_length
+    if getattr(args, 'upload_clips', False):
+        hl.upload_split_clips = True
+
+def resolve(args, path):
+    """A path from the command line as an absolute path; relative ones are in --dir."""
+    return os.path.abspath(os.path.join(args.dir, path))
+
+def inputs(hl, args, suffix):
+    """The files named on the command line, or the matching ones in --dir, as absolute paths."""
+    found = args.files or (hl.find_videos(args.dir) if suffix is None else hl.find_outputs(args.dir, suffix))
+    return [resolve(args, f) for f in found]
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    import metrics
+    import split_and_hl as hl
+    configure(hl, args)
+    metrics.observe('startup_seconds', time.perf_counter() - _started, command=args.command)
+
+    if args.command == 'upload':
+        files = [resolve(args, args.file or 'combined_highlights.mp4')]
+    elif args.command in ('detect', 'run'):
+        files = inputs(hl, args, None)
+        outside = [f for f in files if os.path.dirname(f) != os.path.abspath(args.dir)]
+        if outside:
+            sys.exit(f"{args.command}: recordings have to be in {os.path.abspath(args.dir)}: {', '.join(outside)}")
+    elif args.command == 'render':
+        files = inputs(hl, args, '_scores.csv')
+    else:
+        files = inputs(hl, args, '_highlights.mp4')
+    clip_dirs = [resolve(args, d) for d in getattr(args, 'clips', [])]
+    if args.dry_run:
+        print(f"{args.command}: {len(files)} file(s), started in {time.perf_counter() - _started:.3f}s")
+        for path in files + clip_dirs:
+            print(f"  {path}")
+        return
+    if not files:
+        sys.exit(f"{args.command}: nothing to do in {os.path.abspath(args.dir)}")
+
+    # Like python split_and_hl.py: steps are recorded under absolute input paths, and
+    # combined_highlights.mp4 and run_metrics.json are written to the working directory
+    os.chdir(args.dir)
+    input_dir = os.getcwd()
+    names = [os.path.basename(f) for f in files]
+    manifest = hl.open_manifest(input_dir)
+    if args.command == 'run':
+        if not args.no_upload:
+            hl.ensure_youtube_credentials_valid()
+        hl.run_all(input_dir, names, upload=not args.no_upload)
+        return
+    if args.command == 'detect':
+        for name, csv_file in hl.detect_all(manifest, input_dir, names).items():
+            print(f"{name}: {csv_file}")
+    elif args.command == 'render':
+        for path in files:
+            print(f"{os.path.basename(path)}: {hl.render_chapter(manifest, path)}")
+    elif args.command == 'split':
+        for path in files:
+            print(f"{os.path.basename(path)}: {hl.split_chapter(manifest, path)}")
+    elif args.command == 'combine':
+        print(hl.combine_highlights(manifest, *files))
+    elif args.command == 'upload':
+        hl.ensure_youtube_credentials_valid()
+        # combine records its output by relative name, and the upload step has to match it
+        hl.upload_highlights(manifest, os.path.relpath(files[0]))
+        for clips_dir in clip_dirs:
+            hl.upload_clips(manifest, clips_dir)
+    hl.write_run_metrics()
+
+if __name__ == '__main__':
+    main()
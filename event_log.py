@@ -0,0 +1,129 @@
+import json
+import os
+import time
+
+# === Event Log ===
+# Line-delimited JSON, one object per line:
+#   {"type": "header", "inputs": [...], "teams": [...], "starting_scores": [...], "fps": ..., "started": ...}
+#   {"type": "event", "frame": 1234, "t_ms": 24680, "gesture": "index", "confidence": 0.83,
+#    "columns": [1, 0, 0], "score": [3, 2]}
+#   {"type": "watermark", "t_ms": 30000}    detection has got this far
+#   {"type": "end", "t_ms": ..., "error": null}
+# Times are milliseconds of video (session time for a session log).
+
+def event_log_path(input_file):
+    return input_file.rsplit('.', 1)[0] + '_events.ndjson'
+
+class EventLogWriter:
+    """Append score events to an event log as they fire.
+
+    Every line is flushed as it is written, so tail_event_log can follow
+    the log while detection is still running. A watermark line every
+    watermark_seconds of video tells a reader how far detection has got
+    when no events come; close() or abort() writes the end line.
+    """
+
+    def __init__(self, path, inputs, team_one, team_two, starting_score_one=0, starting_score_two=0, fps=None,
+                 watermark_seconds=5):
+        self.path = path
+        self.score = [starting_score_one, starting_score_two]
+        self.watermark_seconds = watermark_seconds
+        self.next_watermark = watermark_seconds
+        self.timestamp = 0.0
+        self.file = open(path, 'w')
+        self._write({'type': 'header', 'inputs': [inputs] if isinstance(inputs, str) else list(inputs),
+                     'teams': [team_one, team_two], 'starting_scores': list(self.score), 'fps': fps,
+                     'started': time.time()})
+
+    def _write(self, record):
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def add(self, event):
+        frame_number, timestamp, team_one, team_two, highlights, gesture, confidence = event
+        self.score[0] += team_one
+        self.score[1] += team_two
+        self._write({'type': 'event', 'frame': frame_number, 't_ms': round(timestamp * 1000), 'gesture': gesture,
+                     'confidence': None if confidence is None else round(confidence, 3),
+                     'columns': [team_one, team_two, highlights], 'score': list(self.score)})
+        self.advance(timestamp)
+
+    def advance(self, timestamp):
+        self.timestamp = max(self.timestamp, timestamp)
+        if timestamp >= self.next_watermark:
+            self._write({'type': 'watermark', 't_ms': round(timestamp * 1000)})
+            self.next_watermark = timestamp + self.watermark_seconds
+
+    def close(self, error=None):
+        self._write({'type': 'end', 't_ms': round(self.timestamp * 1000), 'error': error})
+        self.file.close()
+
+    def abort(self, error='aborted'):
+        self.close(error)
+
+def write_event_log(path, inputs, score_events, team_one, team_two, starting_score_one=0, starting_score_two=0,
+                    fps=None):
+    """Write a complete log at once, for events that were not streamed (e.g. merged shards)."""
+    writer = EventLogWriter(path, inputs, team_one, team_two, starting_score_one, starting_score_two, fps)
+    for event in score_events:
+        writer.add(event)
+    writer.close()
+    return path
+
+# === Reading ===
+def _event(record):
+    return (record['frame'], record['t_ms'] / 1000, *record['columns'], record['gesture'], record['confidence'])
+
+def read_event_log_header(path):
+    with open(path) as f:
+        return json.loads(f.readline())
+
+def read_event_log(path):
+    """(header, events) with events shaped like GestureTracker's; a plain JSON parse per line."""
+    header, events = None, []
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record['type'] == 'event':
+                events.append(_event(record))
+            elif record['type'] == 'header':
+                header = record
+    return header, events
+
+def tail_event_log(path, poll_interval=0.25, is_alive=None):
+    """Yield the records of a log as they are appended, until its end line.
+
+    Waits for the file to appear. is_alive, if given, is polled while
+    there is nothing new; once it returns False and the log still has no
+    end line (its writer died before opening or closing it), ValueError
+    is raised instead of waiting forever. So is a log that ended with an
+    error.
+    """
+    f = None
+    buffer = ''
+    try:
+        while True:
+            if f is None and os.path.exists(path):
+                f = open(path)
+            chunk = f.read() if f else ''
+            if not chunk:
+                if is_alive is not None and not is_alive():
+                    # One last read: the writer may have finished between the two checks
+                    chunk = f.read() if f else ''
+                    if not chunk:
+                        raise ValueError(f"{path} ended without an end line")
+                else:
+                    time.sleep(poll_interval)
+                    continue
+            buffer += chunk
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                record = json.loads(line)
+                if record['type'] == 'end' and record.get('error'):
+                    raise ValueError(f"Detection writing {path} failed: {record['error']}")
+                yield record
+                if record['type'] == 'end':
+                    return
+    finally:
+        if f:
+            f.close()
@@ -0,0 +1,143 @@
+# Local stand-in for YouTube's resumable-upload endpoint, for exercising
+# youtube_upload without credentials, quota or a network:
+#
+#   with FakeUploadServer(faults=[None, 503, 'drop']) as server:
+#       transport = Httplib2Transport(httplib2.Http())
+#       video = ResumableUpload(transport, path, metadata, chunk_size=256 * 1024,
+#                               backoff=0, upload_url=server.upload_url).run()
+#       assert server.uploads[video['id']] == open(path, 'rb').read()
+#
+# or standalone: python fake_youtube_server.py --port 8089
+import argparse
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+UPLOAD_PATH = '/upload/youtube/v3/videos'
+SESSION_PATH = '/upload/session/'
+
+class FakeUploadServer:
+    """Serves the resumable-upload protocol on 127.0.0.1 from a background thread.
+
+    faults is consumed one entry per chunk PUT: None handles it normally,
+    an int answers with that HTTP status without storing anything, 'drop'
+    stores half of the chunk and closes the connection without a reply
+    (a connection lost mid-chunk), and 'expire' forgets the session so the
+    client gets a 404. Completed uploads are kept in uploads by video id;
+    requests logs (method, path, Content-Range) for every request.
+    """
+
+    def __init__(self, port=0, faults=()):
+        self.faults = list(faults)
+        self.sessions = {}
+        self.uploads = {}
+        self.videos = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), _handler(self))
+        self.thread = None
+
+    @property
+    def upload_url(self):
+        return f'http://127.0.0.1:{self.httpd.server_port}{UPLOAD_PATH}?uploadType=resumable&part=snippet,status'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def next_fault(self):
+        with self.lock:
+            return self.faults.pop(0) if self.faults else None
+
+def _handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, headers=(), body=b''):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def body(self):
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def do_POST(self):
+            server.requests.append(('POST', self.path, None))
+            if not self.path.startswith(UPLOAD_PATH) or 'uploadType=resumable' not in self.path:
+                return self.reply(404)
+            metadata = json.loads(self.body() or b'{}')
+            total = int(self.headers['X-Upload-Content-Length'])
+            session_id = f'{next(server.ids):04d}'
+            server.sessions[session_id] = {'total': total, 'data': bytearray(), 'metadata': metadata}
+            host, port = self.server.server_address
+            self.reply(200, [('Location', f'http://{host}:{port}{SESSION_PATH}{session_id}')])
+
+        def do_PUT(self):
+            content_range = self.headers.get('Content-Range', '')
+            server.requests.append(('PUT', self.path, content_range))
+            data = self.body()
+            session = server.sessions.get(self.path[len(SESSION_PATH):])
+            if not self.path.startswith(SESSION_PATH) or session is None:
+                return self.reply(404)
+
+            if content_range.startswith('bytes */'):
+                return self.status_reply(session)
+            match = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+)', content_range)
+            if not match or int(match.group(1)) > len(session['data']) or len(data) != \
+                    int(match.group(2)) - int(match.group(1)) + 1:
+                return self.reply(400)
+            fault = server.next_fault()
+            if fault == 'expire':
+                server.sessions.pop(self.path[len(SESSION_PATH):])
+                return self.reply(404)
+            if isinstance(fault, int):
+                return self.reply(fault)
+            start = int(match.group(1))
+            if fault == 'drop':
+                data = data[:len(data) // 2]
+            session['data'][start:] = data
+            if fault == 'drop':
+                self.close_connection = True
+                self.wfile.flush()
+                self.connection.shutdown(2)
+                return
+            self.status_reply(session)
+
+        def status_reply(self, session):
+            if len(session['data']) < session['total']:
+                headers = [('Range', f"bytes=0-{len(session['data']) - 1}")] if session['data'] else []
+                return self.reply(308, headers)
+            if 'id' not in session:
+                session['id'] = f"fake{next(server.ids):07d}"
+                server.uploads[session['id']] = bytes(session['data'])
+                server.videos[session['id']] = session['metadata']
+            video = {'kind': 'youtube#video', 'id': session['id'], **session['metadata']}
+            self.reply(200, [('Content-Type', 'application/json')], json.dumps(video).encode())
+    return Handler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8089)
+    args = parser.parse_args()
+    server = FakeUploadServer(args.port)
+    print(f"Resumable uploads accepted at {server.upload_url}")
+    server.httpd.serve_forever()
@@ -0,0 +1,139 @@
+import bisect
+import os
+import tempfile
+from collections import Counter
+
+import cv2
+import numpy as np
+
+import metrics
+from overlay import scoreboard_badges
+from smart_cut import probe_streams
+
+# === Filter Graph ===
+def atempo_chain(tempo):
+    """atempo filters for an arbitrary tempo; a single atempo only takes 0.5-2."""
+    filters = []
+    while tempo < 0.5:
+        filters.append('atempo=0.5')
+        tempo /= 0.5
+    while tempo > 2.0:
+        filters.append('atempo=2.0')
+        tempo /= 2.0
+    if abs(tempo - 1.0) > 1e-9:
+        filters.append(f'atempo={tempo:.6f}')
+    return filters
+
+def score_spans(start, end, scores):
+    """(span_start, span_end, (score1, score2)) pieces of [start, end) over which the score is constant."""
+    cuts = [t for t in scores.times[bisect.bisect_right(scores.times, start):] if t < end]
+    bounds = [start] + cuts + [end]
+    return [(a, b, scores.at(a)) for a, b in zip(bounds, bounds[1:])]
+
+def _write_badge(path, sprite, alpha):
+    # Team colours are given in moviepy's RGB order; imwrite expects BGR.
+    sprite = cv2.cvtColor(sprite, cv2.COLOR_RGB2BGR)
+    if alpha is not None:
+        sprite = np.dstack([sprite, (alpha * 255).round().astype(np.uint8)])
+    cv2.imwrite(path, sprite)
+
+def build_render_command(input_file, windows, output_file, badge_dir, scores=None, team_one=None, team_two=None,
+                         team1_colors=None, team2_colors=None, slow_motion_factor=1, bg_alpha=1.0, timeline=None):
+    """The ffmpeg command that renders the whole reel in one process.
+
+    Each window is its own seeked input (-ss/-t, so only the windows are
+    decoded). Its video gets the score badges overlaid for the spans where
+    each score applies, then setpts for the speed change; its audio gets
+    the matching atempo chain. All windows are then joined with concat.
+    Badges are the same cv2-rendered sprites the moviepy path blends in,
+    written once each to badge_dir as one PNG input each, split in the
+    graph when several overlays use the same one. Pass scores=None for a
+    reel without overlays.
+
+    With a session_timeline.SessionTimeline, windows are in session time
+    and a window that crosses a chapter boundary is one input per chapter,
+    joined before its overlays.
+    """
+    streams = probe_streams(input_file)
+    video = next(s for s in streams if s['codec_type'] == 'video')
+    has_audio = any(s['codec_type'] == 'audio' for s in streams)
+
+    inputs = []
+    window_inputs = []  # input indices of each window's pieces
+    for start, end in windows:
+        first = inputs.count('-i')
+        pieces = timeline.pieces(start, end) if timeline else [(input_file, start, end)]
+        for source, source_start, source_end in pieces:
+            inputs += ['-ss', f'{source_start:.6f}', '-t', f'{source_end - source_start:.6f}', '-i', source]
+        window_inputs.append(range(first, first + len(pieces)))
+
+    # One PNG input per distinct sprite, keyed by sprite identity; each
+    # sprite is kept next to its input index, so an id can't be reused by a
+    # new sprite once render_badge's LRU drops it
+    badge_files = {}
+    window_overlays = []  # (badge input index, x, y, enable) for each window
+    for start, end in windows:
+        overlays = []
+        spans = score_spans(start, end, scores) if scores is not None else []
+        for a, b, (score1, score2) in spans:
+            enable = f":enable='gte(t,{a - start:.6f})*lt(t,{b - start:.6f})'" if len(spans) > 1 else ''
+            for sprite, alpha, x, y in scoreboard_badges(int(video['width']), team_one, score1, team_two, score2,
+                                                         team1_colors, team2_colors, bg_alpha):
+                if id(sprite) not in badge_files:
+                    path = os.path.join(badge_dir, f'badge{len(badge_files):03d}.png')
+                    _write_badge(path, sprite, alpha)
+                    badge_files[id(sprite)] = (inputs.count('-i'), sprite)
+                    inputs.extend(['-i', path])
+                overlays.append((badge_files[id(sprite)][0], x, y, enable))
+        window_overlays.append(overlays)
+
+    graph = []
+    # A PNG input is a single frame that can feed one filter; split it for each overlay that uses it
+    uses = Counter(index for overlays in window_overlays for index, _, _, _ in overlays)
+    badge_labels = {}
+    for index, count in uses.items():
+        badge_labels[index] = [f'b{index}_{n}' for n in range(count)] if count > 1 else [f'{index}:v']
+        if count > 1:
+            graph.append(f'[{index}:v]split={count}' + ''.join(f'[{label}]' for label in badge_labels[index]))
+
+    concat_inputs = []
+    for i, (start, end) in enumerate(windows):
+        label, audio_label = f'{window_inputs[i][0]}:v', f'{window_inputs[i][0]}:a'
+        if len(window_inputs[i]) > 1:
+            joined = ''.join(f'[{k}:v]' + (f'[{k}:a]' if has_audio else '') for k in window_inputs[i])
+            label, audio_label = f'j{i}v', f'j{i}a'
+            graph.append(f"{joined}concat=n={len(window_inputs[i])}:v=1:a={int(has_audio)}[{label}]"
+                         + (f'[{audio_label}]' if has_audio else ''))
+        for k, (index, x, y, enable) in enumerate(window_overlays[i]):
+            out = f'w{i}o{k}'
+            graph.append(f'[{label}][{badge_labels[index].pop(0)}]overlay={x}:{y}{enable}[{out}]')
+            label = out
+        # fps keeps the source rate after the speed change, duplicating frames as moviepy's speedx does
+        graph.append(f"[{label}]setpts={slow_motion_factor}*(PTS-STARTPTS),fps={video['r_frame_rate']}[v{i}]")
+        concat_inputs.append(f'[v{i}]')
+        if has_audio:
+            audio_chain = ','.join(['asetpts=PTS-STARTPTS'] + atempo_chain(1 / slow_motion_factor))
+            graph.append(f"[{audio_label}]{audio_chain}[a{i}]")
+            concat_inputs.append(f'[a{i}]')
+    graph.append(f"{''.join(concat_inputs)}concat=n={len(windows)}:v=1:a={int(has_audio)}[v]"
+                 + ('[a]' if has_audio else ''))
+
+    command = ['ffmpeg', '-v', 'error', '-y', *inputs, '-filter_complex', ';'.join(graph), '-map', '[v]']
+    if has_audio:
+        command += ['-map', '[a]', '-c:a', 'aac']
+    return command + ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-movflags', '+faststart', output_file]
+
+# === Render ===
+def render_highlights_ffmpeg(input_file, windows, output_file, scores=None, team_one=None, team_two=None,
+                             team1_colors=None, team2_colors=None, slow_motion_factor=1, bg_alpha=1.0,
+                             timeline=None):
+    """Render the windows of input_file into output_file with a single ffmpeg run.
+
+    Same cut, overlay and speed change as the moviepy path, but no Python
+    runs per frame. Raises CalledProcessError if ffmpeg fails.
+    """
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file))) as badge_dir:
+        command = build_render_command(input_file, windows, output_file, badge_dir, scores, team_one, team_two,
+                                       team1_colors, team2_colors, slow_motion_factor, bg_alpha, timeline)
+        metrics.run_subprocess('render', command, check=True)
+    return output_file
@@ -0,0 +1,95 @@
+import itertools
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+
+# === ffmpeg Raw-Pipe Frame Source ===
+def output_size(width, height, target_width=None):
+    if not target_width or target_width >= width:
+        return width, height
+    return target_width, max(2, 2 * round(height * target_width / width / 2))
+
+def ffmpeg_frames(input_file, frame_interval, start_frame=0, end_frame=None, target_width=None,
+                  progress=None, buffers=1, frame_offset=0):
+    """Yield (frame_number, rgb_image) for the same frames sample_frames would pick.
+
+    ffmpeg drops the unsampled frames, scales and converts to RGB in its
+    own threads; every frame is read from its stdout straight into one of
+    `buffers` preallocated arrays, which are reused round-robin. A consumer
+    that keeps frames around (e.g. a queue) needs as many buffers as frames
+    it can hold at once.
+
+    Frames are picked by index with select rather than with the fps filter,
+    which resamples by timestamp and would not land on the same frames as
+    frame_number % frame_interval == 0.
+
+    frame_offset is added to every frame number (and to the sampling
+    phase) without seeking, for a file that continues a longer timeline.
+
+    If ffmpeg fails (an unreadable file, a filter it doesn't support), the
+    CalledProcessError it raises once its output ends carries the end of
+    its stderr.
+    """
+    cap = cv2.VideoCapture(input_file)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width, height = output_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                target_width)
+    cap.release()
+
+    filters = [f"select='not(mod(n+{frame_offset + start_frame + 1}\\,{frame_interval}))'"]
+    if target_width:
+        filters.append(f'scale={width}:{height}')
+    command = ['ffmpeg', '-v', 'error', '-nostdin']
+    if start_frame:
+        command += ['-ss', f'{start_frame / fps:.6f}']
+    command += ['-i', input_file, '-map', '0:v:0', '-vf', ','.join(filters), '-fps_mode', 'passthrough']
+    if end_frame is not None:
+        command += ['-frames:v', str(end_frame // frame_interval - start_frame // frame_interval)]
+    command += ['-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+
+    pool = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(buffers)]
+    first = frame_offset + start_frame
+    frame_number = first - first % frame_interval
+    # stderr goes to a file, so a chatty ffmpeg can't block on a pipe nobody reads
+    errors = tempfile.TemporaryFile()
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+    started = time.perf_counter()
+    finished = False
+    try:
+        for i in itertools.count():
+            image = pool[i % buffers]
+            if not _read_exactly(proc.stdout, memoryview(image).cast('B')):
+                break
+            frame_number += frame_interval
+            if progress:
+                progress(frame_interval)
+            metrics.count('frames_decoded', frame_interval)
+            metrics.count('frames_sampled')
+            yield frame_number, image
+        finished = True
+    finally:
+        proc.stdout.close()
+        if not finished:
+            # The consumer stopped early
+            proc.kill()
+        proc.wait()
+        metrics.observe('subprocess_seconds', time.perf_counter() - started, tool='ffmpeg', stage='decode')
+        errors.seek(0)
+        stderr = errors.read()[-4000:].decode(errors='replace')
+        errors.close()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, command, stderr=stderr)
+
+def _read_exactly(stream, view):
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
@@ -0,0 +1,82 @@
+import cv2
+
+import metrics
+
+# === Sampled Frame Reader ===
+def sample_frames(cap, frame_interval, progress=None, start_frame=0):
+    """Yield (frame_number, image) for every frame_interval-th frame of cap.
+
+    Skipped frames are only grabbed, never retrieved, so OpenCV does not
+    convert them to BGR or copy them into a NumPy array. frame_number matches
+    what the old read-then-skip loop got from CAP_PROP_POS_FRAMES (the 1-based
+    index of the frame just read), without querying the capture per frame.
+    progress, if given, is called with the number of frames advanced.
+    start_frame is where cap has been positioned, so numbering stays absolute.
+    """
+    frame_number = start_frame
+    pending = 0
+    while cap.grab():
+        frame_number += 1
+        pending += 1
+        if frame_number % frame_interval != 0:
+            continue
+        if progress:
+            progress(pending)
+        metrics.count('frames_decoded', pending)
+        metrics.count('frames_sampled')
+        pending = 0
+        success, image = cap.retrieve()
+        if not success:
+            break
+        yield frame_number, image
+    if progress and pending:
+        progress(pending)
+    metrics.count('frames_decoded', pending)
+
+# === Keyframe-Seeking Reader ===
+def seek_sample_frames(cap, frame_interval, index, progress=None, start_frame=0, frame_offset=0):
+    """sample_frames for samples further apart than a GOP, using a keyframe_index.KeyframeIndex.
+
+    When a keyframe lies between the current position and the next
+    sampled frame, the capture seeks straight to that frame and decoding
+    restarts at the keyframe before it, so the GOPs in between are never
+    decoded; otherwise it grabs forward as sample_frames does. Frames are
+    the same ones sample_frames yields, with the same numbers: cap has
+    been positioned at start_frame, and frame_offset is added to every
+    number (and to the sampling phase) for a file that continues a longer
+    timeline. When the samples are at most a GOP apart this is just
+    sample_frames, which is cheaper there.
+    """
+    if frame_interval <= index.gop_length:
+        yield from sample_frames(cap, frame_interval, progress, frame_offset + start_frame)
+        return
+    position = start_frame  # frames of this file consumed so far
+    reported = start_frame
+    while True:
+        number = frame_offset + position
+        target = number - number % frame_interval + frame_interval - frame_offset  # 1-based, in this file
+        if target > index.frame_count:
+            break
+        keyframe = index.keyframe_before(target - 1)
+        decoded = 0
+        if keyframe > position:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target - 1)
+            metrics.count('keyframe_seeks')
+            decoded = target - 1 - keyframe
+            position = target - 1
+        while position < target and cap.grab():
+            position += 1
+            decoded += 1
+        metrics.count('frames_decoded', decoded)
+        if position < target:
+            break
+        if progress:
+            progress(position - reported)
+        reported = position
+        metrics.count('frames_sampled')
+        success, image = cap.retrieve()
+        if not success:
+            break
+        yield frame_offset + position, image
+    if progress and index.frame_count > reported:
+        progress(index.frame_count - reported)
@@ -0,0 +1,262 @@
+import csv
+from datetime import datetime, timedelta
+from importlib.metadata import version
+
+import cv2
+import numpy as np
+
+from ffmpeg_source import ffmpeg_frames
+from frame_sampler import sample_frames, seek_sample_frames
+from event_log import read_event_log
+from gesture_engine import GESTURE_COLUMNS, GESTURE_NAMES, classify, gesture_confidence, landmarks_to_array
+from inference_preprocess import make_preprocessor
+from keyframe_index import load_keyframe_index
+import metrics
+
+cooldown_duration = 5     # seconds of video after a gesture fires before the next one counts
+required_duration = 0.1   # seconds a gesture has to be held
+
+# MediaPipe Hands defaults, spelled out so landmark caches can record them
+HANDS_SETTINGS = {'static_image_mode': False, 'max_num_hands': 2, 'model_complexity': 1,
+                  'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5}
+
+# === Per-process MediaPipe Instance ===
+# mediapipe takes about a second to import, so it is only imported once hands are needed
+_hands = None
+
+def get_hands():
+    global _hands
+    if _hands is None:
+        import mediapipe as mp
+        _hands = mp.solutions.hands.Hands(**HANDS_SETTINGS)
+    return _hands
+
+# === Gesture State Machine ===
+class GestureTracker:
+    """Turns per-frame hand landmarks into score events.
+
+    The cooldown runs on video time rather than wall-clock time, so the
+    events only depend on the frames seen and not on how fast they were
+    processed. Events are (frame_number, timestamp, team_one, team_two,
+    highlights, gesture, confidence); confidence is gesture_confidence on
+    the firing frame, or None when only the matches were given. Every
+    event and the time reached go to event_log (an EventLogWriter) if set.
+    """
+
+    def __init__(self, required_duration=required_duration, cooldown_duration=cooldown_duration, event_log=None):
+        self.required_duration = required_duration
+        self.cooldown_duration = cooldown_duration
+        self.event_log = event_log
+        self.states = {name: [False, None] for name in GESTURE_NAMES}
+        self.cooldown_until = float('-inf')
+
+    def reset(self):
+        """Forget gestures being held, e.g. before frames that do not follow on from the last ones."""
+        self.states = {name: [False, None] for name in GESTURE_NAMES}
+
+    def update(self, frame_number, timestamp, multi_hand_landmarks):
+        """multi_hand_landmarks may be MediaPipe landmarks or a (hands, 21, 3) array."""
+        if multi_hand_landmarks is None or len(multi_hand_landmarks) == 0:
+            if self.event_log:
+                self.event_log.advance(timestamp)
+            return []
+        hands = landmarks_to_array(multi_hand_landmarks)
+        return self.update_matches(frame_number, timestamp, classify(hands), hands)
+
+    def update_matches(self, frame_number, timestamp, matches, hands=None):
+        """Advance with an already classified (hands, gestures) bool array."""
+        if self.event_log:
+            self.event_log.advance(timestamp)
+        events = []
+        if len(matches) == 0:
+            return events
+        if timestamp <= self.cooldown_until:
+            if matches.any():
+                metrics.count('gesture_frames_suppressed_by_cooldown')
+            return events
+        for i, hand_matches in enumerate(matches):
+            for gesture, (name, matched, columns) in enumerate(zip(GESTURE_NAMES, hand_matches, GESTURE_COLUMNS)):
+                if matched:
+                    if not self.states[name][0]:
+                        self.states[name] = [True, timestamp]
+                    elif timestamp - self.states[name][1] >= self.required_duration:
+                        confidence = gesture_confidence(hands[i], gesture) if hands is not None else None
+                        events.append((frame_number, timestamp, *columns, name, confidence))
+                        if self.event_log:
+                            self.event_log.add(events[-1])
+                        metrics.count('gestures_fired', gesture=name)
+                        self.states[name] = [False, None]
+                        self.cooldown_until = timestamp + self.cooldown_duration
+                else:
+                    self.states[name] = [False, None]
+        return events
+
+# === Detection Over A Frame Range ===
+def get_frame_interval(fps, fps_reduction_factor):
+    reduced_fps = fps / fps_reduction_factor
+    return int(fps / reduced_fps)
+
+def cache_settings(fps_reduction_factor, preprocess=None, hands_settings=HANDS_SETTINGS, adaptive_coarse_fps=0,
+                   motion_gating=None, frame_source='opencv'):
+    """Everything that changes the landmarks a detection run produces."""
+    return {'fps_reduction_factor': fps_reduction_factor, 'preprocess': preprocess,
+            'hands': hands_settings, 'adaptive_coarse_fps': adaptive_coarse_fps,
+            'motion_gating': motion_gating, 'frame_source': frame_source, 'mediapipe': version('mediapipe')}
+
+def infer_landmarks(hands, image, preprocessor=None, rgb=False):
+    """hands.process on one sampled frame, through the preprocessor if any."""
+    if preprocessor:
+        image = preprocessor.prepare(image, rgb)
+    elif not rgb:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    with metrics.timed('hands_process_seconds'):
+        landmarks = hands.process(image).multi_hand_landmarks
+    if landmarks:
+        metrics.count('hands_found', len(landmarks))
+    if preprocessor:
+        return preprocessor.map_landmarks(landmarks)
+    return landmarks
+
+def open_sampled_frames(input_file, frame_interval, start_frame=0, end_frame=None, progress=None,
+                        frame_source='opencv', target_width=None, buffers=1):
+    """Yield (frame_number, image) from the chosen source; images are RGB for 'ffmpeg', BGR otherwise.
+
+    The ffmpeg source scales to target_width itself; with OpenCV that is
+    left to the InferencePreprocessor. 'seek' reads with OpenCV too, but
+    jumps over whole GOPs between samples that are further apart than a
+    GOP (see seek_sample_frames); the keyframe index it needs is built on
+    first use and kept next to the video.
+    """
+    if frame_source == 'ffmpeg':
+        yield from ffmpeg_frames(input_file, frame_interval, start_frame, end_frame, target_width,
+                                 progress, buffers)
+        return
+    cap = cv2.VideoCapture(input_file)
+    try:
+        if start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if frame_source == 'seek':
+            frames = seek_sample_frames(cap, frame_interval, load_keyframe_index(input_file), progress, start_frame)
+        else:
+            frames = sample_frames(cap, frame_interval, progress, start_frame)
+        for frame_number, image in frames:
+            if end_frame is not None and frame_number > end_frame:
+                break
+            yield frame_number, image
+    finally:
+        cap.release()
+
+def detect_range(input_file, fps_reduction_factor, start_frame=0, end_frame=None, hands=None, progress=None,
+                 preprocess=None, cache_writer=None, gate=None, frame_source='opencv', event_log=None):
+    """Run detection on frames start_frame+1 .. end_frame (1-based, inclusive).
+
+    preprocess is an optional dict of InferencePreprocessor settings
+    (target_width, roi, auto_roi, ...) applied before hands.process.
+    cache_writer, if given, receives every sampled frame's landmarks.
+    gate is an optional motion_gate.MotionGate; frames it skips reuse the
+    previous frame's landmarks. frame_source is 'opencv', 'seek' or 'ffmpeg'.
+    event_log, if given, is an EventLogWriter that gets each event as it fires.
+    """
+    cap = cv2.VideoCapture(input_file)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    frame_interval = get_frame_interval(fps, fps_reduction_factor)
+    frames = open_sampled_frames(input_file, frame_interval, start_frame, end_frame, progress, frame_source,
+                                 (preprocess or {}).get('target_width'))
+    return detect_frames(frames, fps, hands, preprocess, cache_writer, gate, frame_source == 'ffmpeg', event_log)
+
+def detect_frames(frames, fps, hands=None, preprocess=None, cache_writer=None, gate=None, rgb=False,
+                  event_log=None, tracker=None):
+    """Score events for (frame_number, image) pairs from any sampled-frame source.
+
+    tracker continues an earlier call's GestureTracker (its cooldown
+    carries over); event_log is only used for a new one.
+    """
+    hands = hands or get_hands()
+    preprocessor = make_preprocessor(preprocess)
+    tracker = tracker or GestureTracker(event_log=event_log)
+    score_events = []
+    landmarks = None
+    for frame_number, image in frames:
+        timestamp = frame_number / fps
+        if gate is None or gate.should_infer(image, timestamp, rgb):
+            landmarks = infer_landmarks(hands, image, preprocessor, rgb)
+        if cache_writer:
+            cache_writer.add(frame_number, landmarks)
+        score_events.extend(tracker.update(frame_number, timestamp, landmarks))
+    return score_events
+
+def detect_windows(input_file, fps_reduction_factor, windows, hands=None, progress=None, preprocess=None,
+                   cache_writer=None, gate=None, frame_source='opencv', event_log=None):
+    """detect_range over (start_frame, end_frame) windows only, in order, with one gesture tracker.
+
+    The frames between windows are never decoded. Inside a window the
+    sampled frames are the ones a full run samples; a gesture held at
+    the end of one window does not carry into the next. Skipped frames
+    still count towards progress.
+    """
+    cap = cv2.VideoCapture(input_file)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    frame_interval = get_frame_interval(fps, fps_reduction_factor)
+    tracker = GestureTracker(event_log=event_log)
+    score_events = []
+    position = 0
+    for start_frame, end_frame in windows:
+        if progress and start_frame > position:
+            progress(start_frame - position)
+        tracker.reset()
+        frames = open_sampled_frames(input_file, frame_interval, start_frame, end_frame, progress, frame_source,
+                                     (preprocess or {}).get('target_width'))
+        score_events += detect_frames(frames, fps, hands, preprocess, cache_writer, gate, frame_source == 'ffmpeg',
+                                      tracker=tracker)
+        position = end_frame
+    if progress and frame_count > position:
+        progress(frame_count - position)
+    return score_events
+
+def replay_events(header, records, event_log=None):
+    """Rebuild score events from cached landmarks without touching the video.
+
+    If the header lists detect_windows windows, the tracker is reset at
+    the first record of each, as detect_windows does.
+    """
+    fps = header['fps']
+    matches = classify(records['landmarks'])  # (frames, hands, gestures) in one go
+    # Window i holds frames start+1 .. end, so a frame's window is the number of starts below it
+    starts = [start for start, _ in header.get('windows') or []]
+    window_of = np.searchsorted(starts, records['frame'], side='left').tolist()
+    tracker = GestureTracker(event_log=event_log)
+    score_events = []
+    window = None
+    for i, (frame_number, hand_count) in enumerate(zip(records['frame'].tolist(), records['hands'].tolist())):
+        if window_of[i] != window:
+            tracker.reset()
+            window = window_of[i]
+        score_events.extend(tracker.update_matches(frame_number, frame_number / fps, matches[i, :hand_count],
+                                                   records['landmarks'][i, :hand_count]))
+    return score_events
+
+# === CSV Output ===
+def format_timestamp(timestamp):
+    return (datetime(1, 1, 1) + timedelta(seconds=timestamp)).strftime('%H:%M:%S')
+
+def write_scores_csv(input_file, score_events, team_one, team_two, starting_score_one, starting_score_two,
+                     output_csv=None):
+    """input_file may also be a session's list of chapter paths; they all go on the first row."""
+    inputs = [input_file] if isinstance(input_file, str) else list(input_file)
+    output_csv = output_csv or inputs[0].rsplit('.', 1)[0] + '_scores.csv'
+    with open(output_csv, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(inputs)
+        writer.writerow(['Timestamp', team_one, team_two, 'Highlights'])
+        writer.writerow(['Starting Scores', starting_score_one, starting_score_two, 0])
+        writer.writerows([format_timestamp(t), s1, s2, hl] for _, t, s1, s2, hl, *_ in score_events)
+    return output_csv
+
+def export_scores_csv(log_path, output_csv=None):
+    """The _scores.csv (whole-second timestamps) for an event log, next to it by default."""
+    header, events = read_event_log(log_path)
+    return write_scores_csv(header['inputs'], events, *header['teams'], *header['starting_scores'],
+                            output_csv or log_path.replace('_events.ndjson', '_scores.csv'))
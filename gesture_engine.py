@@ -0,0 +1,73 @@
+import numpy as np
+
+# === Finger Rules ===
+UP, DOWN, ANY = 1, -1, 0
+
+# (tip, pip) landmark indices, in the column order of the rule tuples below
+FINGERS = ('index', 'middle', 'ring', 'little')
+FINGER_TIPS = np.array([8, 12, 16, 20])
+FINGER_PIPS = np.array([6, 10, 14, 18])
+
+# === Gesture Table ===
+# Adding a signal is one row: a state key, one rule per finger in FINGERS
+# order (UP: tip above the PIP joint, DOWN: below it, ANY: don't care) and
+# the (team_one, team_two, highlights) columns it adds to the scores CSV.
+GESTURE_TABLE = [
+    #  name       index  middle  ring   little   CSV columns
+    ('index',    (UP,    DOWN,   DOWN,  DOWN),   (1, 0, 0)),
+    ('v',        (UP,    UP,     DOWN,  DOWN),   (0, 1, 0)),
+    ('little',   (DOWN,  DOWN,   DOWN,  UP),     (0, 0, 1)),
+]
+
+GESTURE_NAMES = [name for name, _, _ in GESTURE_TABLE]
+GESTURE_COLUMNS = [columns for _, _, columns in GESTURE_TABLE]
+_RULES = np.array([rules for _, rules, _ in GESTURE_TABLE], dtype=np.int8)  # (gestures, fingers)
+_WANT_UP = _RULES == UP
+_WANT_DOWN = _RULES == DOWN
+_DONT_CARE = _RULES == ANY
+WRIST, MIDDLE_MCP = 0, 9
+CLEAR_MARGIN = 0.2  # palm lengths a tip has to clear its PIP joint by for full confidence
+
+# === Landmark Arrays ===
+def landmarks_to_array(multi_hand_landmarks):
+    """Copy MediaPipe hand landmarks into a (hands, 21, 3) float32 array.
+
+    Arrays are passed through unchanged, so callers can hand in cached
+    landmarks directly. None or an empty list gives a (0, 21, 3) array.
+    """
+    if isinstance(multi_hand_landmarks, np.ndarray):
+        return multi_hand_landmarks
+    if not multi_hand_landmarks:
+        return np.empty((0, 21, 3), dtype=np.float32)
+    return np.array([[(p.x, p.y, p.z) for p in hand.landmark] for hand in multi_hand_landmarks],
+                    dtype=np.float32)
+
+# === Classification ===
+def classify(hands):
+    """Match every hand against every gesture in one comparison.
+
+    hands is any array shaped (..., 21, 3) (a frame's hands, or a batch of
+    frames/hands for offline re-analysis). Returns a bool array shaped
+    (..., len(GESTURE_TABLE)) in GESTURE_TABLE order.
+    """
+    y = hands[..., 1]
+    tips, pips = y[..., FINGER_TIPS], y[..., FINGER_PIPS]
+    up = (tips < pips)[..., None, :]      # (..., 1, fingers)
+    down = (tips > pips)[..., None, :]
+    return ((_WANT_UP & up) | (_WANT_DOWN & down) | _DONT_CARE).all(axis=-1)
+
+def gesture_confidence(hand, gesture):
+    """0-1: how clearly one hand's (21, 3) landmarks make the gesture at index gesture.
+
+    The smallest clearance between tip and PIP joint over the fingers the
+    gesture constrains, in palm lengths (wrist to middle knuckle) so it
+    doesn't depend on how far the hand is from the camera; CLEAR_MARGIN or
+    more is 1, a finger level with its joint 0.
+    """
+    y = hand[:, 1]
+    clearance = np.where(_WANT_UP[gesture], y[FINGER_PIPS] - y[FINGER_TIPS], y[FINGER_TIPS] - y[FINGER_PIPS])
+    constrained = clearance[~_DONT_CARE[gesture]]
+    if not len(constrained):
+        return 1.0
+    palm = max(float(np.linalg.norm(hand[MIDDLE_MCP, :2] - hand[WRIST, :2])), 1e-6)
+    return float(np.clip(constrained.min() / palm / CLEAR_MARGIN, 0.0, 1.0))
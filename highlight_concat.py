@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from collections import Counter
+
+import metrics
+
+# Stream fields that have to agree for the concat demuxer to stream-copy
+# one file after another. The extradata hash covers the SPS/PPS (or the
+# AAC config), which an MP4 stores only once for the whole track.
+VIDEO_FIELDS = ('codec_name', 'profile', 'pix_fmt', 'width', 'height', 'r_frame_rate', 'extradata_hash')
+AUDIO_FIELDS = ('codec_name', 'profile', 'sample_rate', 'channels', 'extradata_hash')
+
+# === Probing ===
+def probe_concat_params(path):
+    """(signature, duration, video stream, audio stream or None) for one highlight file."""
+    command = ['ffprobe', '-v', 'error', '-show_data_hash', 'sha256', '-show_entries',
+               'stream=codec_type,codec_name,profile,pix_fmt,width,height,r_frame_rate,'
+               'sample_rate,channels,extradata_hash:format=duration', '-of', 'json', path]
+    probe = metrics.run_subprocess('probe', command, capture_output=True, text=True, check=True)
+    info = json.loads(probe.stdout)
+    video = next(s for s in info['streams'] if s['codec_type'] == 'video')
+    audio = next((s for s in info['streams'] if s['codec_type'] == 'audio'), None)
+    signature = (tuple(str(video.get(f)) for f in VIDEO_FIELDS),
+                 tuple(str(audio.get(f)) for f in AUDIO_FIELDS) if audio else None)
+    return signature, float(info['format']['duration']), video, audio
+
+# === Conforming ===
+# Default encoder settings, as moviepy and ffmpeg_render write highlights,
+# so a conformed file gets the same parameter sets as the others.
+CONFORM_ENCODERS = {
+    'h264': ['-c:v', 'libx264'],
+    'hevc': ['-c:v', 'libx265', '-tag:v', 'hvc1'],
+}
+X264_PROFILES = {'Baseline': 'baseline', 'Main': 'main', 'High': 'high', 'High 10': 'high10'}
+
+def _conform_command(path, has_audio, video, audio, output_file):
+    """Re-encode path with the reference streams' parameters."""
+    if video['codec_name'] not in CONFORM_ENCODERS:
+        raise ValueError(f"No encoder to match {video['codec_name']!r} for {path}")
+    command = ['ffmpeg', '-v', 'error', '-y', '-i', path]
+    if audio and not has_audio:
+        layout = 'mono' if int(audio['channels']) == 1 else 'stereo'
+        command += ['-f', 'lavfi', '-i', f"anullsrc=r={audio['sample_rate']}:cl={layout}", '-shortest']
+    command += ['-map', '0:v:0', '-vf', f"scale={video['width']}:{video['height']},fps={video['r_frame_rate']}",
+                *CONFORM_ENCODERS[video['codec_name']], '-pix_fmt', video['pix_fmt']]
+    if video['codec_name'] == 'h264' and video.get('profile') in X264_PROFILES:
+        command += ['-profile:v', X264_PROFILES[video['profile']]]
+    if audio:
+        command += ['-map', '0:a:0' if has_audio else '1:a:0', '-c:a', 'aac', '-ar', str(audio['sample_rate']),
+                    '-ac', str(audio['channels'])]
+    return command + ['-movflags', '+faststart', output_file]
+
+# === Concat ===
+def concat_highlights(paths, output_file):
+    """Join highlight files into output_file without re-encoding where possible.
+
+    The stream parameters shared by most of the footage are the reference;
+    files that match are stream-copied, the rest are re-encoded to the
+    reference first and checked again. Raises ValueError if a file still
+    doesn't match (e.g. the encoder's parameter sets differ) and
+    CalledProcessError if ffmpeg fails; callers fall back to a full
+    re-encode. Returns (copied files, re-encoded files).
+    """
+    probes = [probe_concat_params(p) for p in paths]
+    weights = Counter()
+    for signature, duration, _, _ in probes:
+        weights[signature] += duration
+    reference = weights.most_common(1)[0][0]
+    _, _, ref_video, ref_audio = next(p for p in probes if p[0] == reference)
+
+    reencoded = 0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file))) as tmp:
+        pieces = []
+        for i, (path, (signature, _, _, audio)) in enumerate(zip(paths, probes)):
+            if signature != reference:
+                conformed = os.path.join(tmp, f'{i:04d}.mp4')
+                metrics.run_subprocess('combine',
+                                       _conform_command(path, audio is not None, ref_video, ref_audio, conformed),
+                                       check=True)
+                if probe_concat_params(conformed)[0] != reference:
+                    raise ValueError(f"{path} could not be re-encoded to match the other highlights")
+                path = conformed
+                reencoded += 1
+            pieces.append(os.path.abspath(path))
+
+        list_file = os.path.join(tmp, 'pieces.txt')
+        with open(list_file, 'w') as f:
+            f.writelines("file '{}'\n".format(path.replace("'", "'\\''")) for path in pieces)
+        metrics.run_subprocess('combine', ['ffmpeg', '-v', 'error', '-y', '-f', 'concat', '-safe', '0',
+                                           '-i', list_file, '-map', '0', '-c', 'copy', '-movflags', '+faststart',
+                                           output_file], check=True)
+    return len(paths) - reencoded, reencoded
@@ -0,0 +1,95 @@
+import bisect
+import csv
+import os
+
+from event_log import read_event_log, read_event_log_header
+
+# === Scores CSV ===
+def read_scores_csv(score_csv_file):
+    """Return (input_file, team_one, team_two, start1, start2, events).
+
+    events are (t_sec, team_one, team_two, highlights) in file order.
+    """
+    with open(score_csv_file) as f:
+        reader = csv.reader(f)
+        input_file = next(reader)[0]
+        _, team_one, team_two, _ = next(reader)
+        _, start1, start2, _ = next(reader)
+        events = []
+        for r in reader:
+            hours, minutes, seconds = r[0].split(':')
+            events.append((int(hours) * 3600 + int(minutes) * 60 + int(seconds), int(r[1]), int(r[2]), int(r[3])))
+    return input_file, team_one, team_two, int(start1), int(start2), events
+
+def read_highlight_events(path):
+    """read_scores_csv for either a _scores.csv or an _events.ndjson log.
+
+    Log events keep their millisecond times, so windows and score changes
+    land on the frame the gesture fired rather than the whole second.
+    """
+    if not path.endswith('.ndjson'):
+        return read_scores_csv(path)
+    header, events = read_event_log(path)
+    return (header['inputs'][0], *header['teams'], *header['starting_scores'],
+            [(t, s1, s2, hl) for _, t, s1, s2, hl, _, _ in events])
+
+def precise_events_file(score_csv_file):
+    """The event log a _scores.csv was exported from, unless the CSV has been edited since.
+
+    The CSV is what gets reviewed and corrected by hand, so it wins
+    whenever its events, teams or starting scores no longer match the
+    log's (with the log's times cut to whole seconds, as exported).
+    """
+    log_path = score_csv_file.replace('_scores.csv', '_events.ndjson')
+    if log_path == score_csv_file or not os.path.exists(log_path):
+        return score_csv_file
+    _, *csv_fields = read_scores_csv(score_csv_file)
+    _, *log_fields = read_highlight_events(log_path)
+    log_fields[-1] = [(int(t), s1, s2, hl) for t, s1, s2, hl in log_fields[-1]]
+    return log_path if csv_fields == log_fields else score_csv_file
+
+def read_score_inputs(score_csv_file):
+    """Every video a scores CSV or event log covers: one file, or a session's chapters in timeline order."""
+    if score_csv_file.endswith('.ndjson'):
+        return read_event_log_header(score_csv_file)['inputs']
+    with open(score_csv_file) as f:
+        return [path for path in next(csv.reader(f)) if path]
+
+def highlights_path(score_file):
+    """Where the reel for a _scores.csv or _events.ndjson goes."""
+    for suffix in ('_scores.csv', '_events.ndjson'):
+        if score_file.endswith(suffix):
+            return score_file[:-len(suffix)] + '_highlights.mp4'
+    return score_file.rsplit('.', 1)[0] + '_highlights.mp4'
+
+# === Event Windows ===
+def coalesce_windows(events, highlight_duration):
+    """The (start, end) source windows to cut, with overlapping or touching ones merged.
+
+    Two quick goals become one contiguous read instead of two reads of
+    the shared footage.
+    """
+    windows = []
+    for t_sec, _, _, _ in sorted(events):
+        start = max(0, t_sec - highlight_duration)
+        if t_sec <= start:
+            continue
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], t_sec)
+        else:
+            windows.append([start, t_sec])
+    return [tuple(w) for w in windows]
+
+class ScoreTimeline:
+    """Running score at any source time: every event at or before t has counted."""
+
+    def __init__(self, events, start1, start2):
+        self.times = []
+        self.scores = [(start1, start2)]
+        for t_sec, s1, s2, _ in sorted(events):
+            self.times.append(t_sec)
+            prev1, prev2 = self.scores[-1]
+            self.scores.append((prev1 + s1, prev2 + s2))
+
+    def at(self, t):
+        return self.scores[bisect.bisect_right(self.times, t)]
@@ -140,9 +140,11 @@
 import cv2
 import csv
 from datetime import datetime
-from moviepy.editor import VideoFileClip, concatenate_videoclips, vfx
 import os
 import subprocess
+from overlay import draw_scoreboard
+from segment_split import split_segments
+from highlight_concat import concat_highlights
 
 def draw_text_with_background(image, text, font, scale, color, thickness, bg_color, x_offset, y_offset, padding=10):
     text_size, _ = cv2.getTextSize(text, font, scale, thickness)
@@ -185,6 +187,7 @@ def create_highlight_video(score_csv_file, highlight_duration=7, include_overlay
             total_seconds = timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
             score_events.append((total_seconds, int(row[1]), int(row[2]), int(row[3])))
 
+    from moviepy.editor import VideoFileClip, concatenate_videoclips, vfx
     highlight_clips = []
     current_team_one_score = starting_score_one
     current_team_two_score = starting_score_two
@@ -201,10 +204,8 @@ def create_highlight_video(score_csv_file, highlight_duration=7, include_overlay
         if include_overlays:
             score_one = current_team_one_score
             score_two = current_team_two_score
-            highlight_clip = highlight_clip.fl_image(lambda img, s1=score_one, s2=score_two: draw_text_with_background(
-                draw_text_with_background(
-                    img, f'{team_one}: {s1}', cv2.FONT_HERSHEY_SIMPLEX, 1, team_one_fg, 2, team_one_bg, 0, 50
-                ), f'{team_two}: {s2}', cv2.FONT_HERSHEY_SIMPLEX, 1, team_two_fg, 2, team_two_bg, 0, 100
+            highlight_clip = highlight_clip.fl_image(lambda img, s1=score_one, s2=score_two: draw_scoreboard(
+                img, team_one, s1, team_two, s2, (team_one_bg, team_one_fg), (team_two_bg, team_two_fg)
             ))
 
         highlight_clips.append(highlight_clip)
@@ -222,33 +223,7 @@ def create_highlight_video(score_csv_file, highlight_duration=7, include_overlay
     return output_path
 
 def split_video(video_path, segment_length=14):
-    file_name, ext = os.path.splitext(os.path.basename(video_path))
-    output_dir = f"{file_name}_clips"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    command_square = [
-        'ffmpeg', '-i', video_path, '-vf', 'crop=ih:ih', '-force_key_frames', f"expr:gte(t,n_forced*{segment_length})",
-        '-c:v', 'libx264', '-c:a', 'copy', '-map', '0', '-f', 'segment', 
-        '-segment_time', str(segment_length), '-reset_timestamps', '1',
-        f"{output_dir}/{file_name}_square_%03d{ext}"
-    ]
-    
-    subprocess.run(command_square, check=True)
-    
-    probe = subprocess.run(['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height', '-of', 'csv=p=0', video_path], capture_output=True, text=True)
-    width, height = map(int, probe.stdout.strip().split(','))
-
-    new_height = int(width * 16 / 9)
-    pad_top_bottom = (new_height - height) // 2
-
-    command_mobile = [
-        'ffmpeg', '-i', video_path, '-vf', f'pad={width}:{new_height}:0:{pad_top_bottom}', '-force_key_frames', f"expr:gte(t,n_forced*{segment_length})",
-        '-c:v', 'libx264', '-c:a', 'copy', '-map', '0', '-f', 'segment', 
-        '-segment_time', str(segment_length), '-reset_timestamps', '1',
-        f"{output_dir}/{file_name}_mobile_%03d{ext}"
-    ]
-    
-    subprocess.run(command_mobile, check=True)
+    split_segments(video_path, segment_length, ('square', 'mobile'))
 
 def process_multiple_csvs(csv_files, highlight_duration=7, include_overlays=True, slow_motion_factor=2):
     all_videos = []
@@ -258,15 +233,22 @@ def process_multiple_csvs(csv_files, highlight_duration=7, include_overlays=True
         split_video(video_path, highlight_duration*slow_motion_factor)
     
     print("Combining all individual highlight videos into a single final video...")
-    final_clips = [VideoFileClip(video) for video in all_videos]
-    final_combined_clip = concatenate_videoclips(final_clips)
     final_output_filename = 'combined_highlights.mp4'
     final_output_path = os.path.join(os.path.dirname(csv_files[0]), final_output_filename)
     print(f"Saving the final combined highlights video: {final_output_path}")
-    final_combined_clip.write_videofile(final_output_path, codec='libx264', audio_codec='aac')
+    try:
+        copied, reencoded = concat_highlights(all_videos, final_output_path)
+        print(f"Joined {copied} highlight videos by stream copy, re-encoded {reencoded}")
+    except (subprocess.CalledProcessError, ValueError) as e:
+        print(f"Lossless concat failed ({e}); re-encoding the combined video")
+        from moviepy.editor import VideoFileClip, concatenate_videoclips
+        final_clips = [VideoFileClip(video) for video in all_videos]
+        final_combined_clip = concatenate_videoclips(final_clips)
+        final_combined_clip.write_videofile(final_output_path, codec='libx264', audio_codec='aac')
 
     return final_output_path
 
 # Example usage
-csv_files = ['GX010883_scores.csv', 'GX020883_scores.csv']
-process_multiple_csvs(csv_files, include_overlays=True)  # Default values: highlight_duration=7, include_overlays=True, slow_motion_factor=2
+if __name__ == '__main__':
+    csv_files = ['GX010883_scores.csv', 'GX020883_scores.csv']
+    process_multiple_csvs(csv_files, include_overlays=True)  # Default values: highlight_duration=7, include_overlays=True, slow_motion_factor=2
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+# === Inference Frame Preprocessing ===
+class InferencePreprocessor:
+    """Crop and downscale frames before hands.process, then undo it on the landmarks.
+
+    target_width: width the frame (or ROI) is resized to for inference; None
+        keeps the native resolution.
+    roi: fixed region (x0, y0, x1, y1) as fractions of the frame, e.g. around
+        where the signaller stands; None uses the whole frame.
+    auto_roi: follow the hands. After a detection the ROI shrinks to the hand
+        bounding box grown by roi_margin; after roi_patience frames without a
+        hand it falls back to the fixed roi (or the whole frame).
+
+    The resize and RGB buffers are allocated once per ROI size and reused, so
+    steady state costs no allocations per frame. MediaPipe copies its input,
+    so reusing the buffer between calls is safe, but one instance must not be
+    shared between threads.
+    """
+
+    def __init__(self, target_width=None, roi=None, auto_roi=False, roi_margin=0.5, roi_patience=10):
+        self.target_width = target_width
+        self.fixed_roi = roi or (0.0, 0.0, 1.0, 1.0)
+        self.auto_roi = auto_roi
+        self.roi_margin = roi_margin
+        self.roi_patience = roi_patience
+        self.roi = self.fixed_roi
+        self.misses = 0
+        self._crop_box = None
+        self._resized = None
+        self._rgb = None
+
+    def prepare(self, image, rgb=False):
+        """Return the inference input; rgb=True when image is already RGB (ffmpeg source)."""
+        height, width = image.shape[:2]
+        x0, y0, x1, y1 = self.roi
+        px0, py0 = int(x0 * width), int(y0 * height)
+        px1, py1 = max(px0 + 1, int(x1 * width)), max(py0 + 1, int(y1 * height))
+        self._crop_box = (px0 / width, py0 / height, (px1 - px0) / width, (py1 - py0) / height)
+        crop = image[py0:py1, px0:px1]
+
+        crop_h, crop_w = crop.shape[:2]
+        if self.target_width and crop_w > self.target_width:
+            size = (self.target_width, max(1, round(crop_h * self.target_width / crop_w)))
+            if self._resized is None or self._resized.shape[:2] != size[::-1]:
+                self._resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            cv2.resize(crop, size, dst=self._resized, interpolation=cv2.INTER_LINEAR)
+            crop = self._resized
+
+        if rgb and crop.flags.c_contiguous:
+            return crop
+        if self._rgb is None or self._rgb.shape != crop.shape:
+            self._rgb = np.empty(crop.shape, dtype=np.uint8)
+        if rgb:
+            np.copyto(self._rgb, crop)
+        else:
+            cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self._rgb
+
+    def map_landmarks(self, multi_hand_landmarks):
+        """Rewrite landmarks from ROI coordinates to full-frame coordinates, in place.
+
+        The mapping is a per-axis scale and offset, so the y comparisons the
+        gesture checks make are unchanged; the mapped values are what auto_roi
+        tracks and what downstream consumers should see.
+        """
+        if multi_hand_landmarks and self._crop_box != (0.0, 0.0, 1.0, 1.0):
+            ox, oy, sx, sy = self._crop_box
+            for hand in multi_hand_landmarks:
+                for point in hand.landmark:
+                    point.x = ox + point.x * sx
+                    point.y = oy + point.y * sy
+        if self.auto_roi:
+            self._track(multi_hand_landmarks)
+        return multi_hand_landmarks
+
+    def _track(self, multi_hand_landmarks):
+        if not multi_hand_landmarks:
+            self.misses += 1
+            if self.misses >= self.roi_patience:
+                self.roi = self.fixed_roi
+            return
+        self.misses = 0
+        xs = [p.x for hand in multi_hand_landmarks for p in hand.landmark]
+        ys = [p.y for hand in multi_hand_landmarks for p in hand.landmark]
+        x0, x1, y0, y1 = min(xs), max(xs), min(ys), max(ys)
+        # Grow by roi_margin of the box's larger side, so a raised arm stays inside.
+        pad = max(x1 - x0, y1 - y0) * (0.5 + self.roi_margin)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        fx0, fy0, fx1, fy1 = self.fixed_roi
+        roi = (max(fx0, cx - pad), max(fy0, cy - pad), min(fx1, cx + pad), min(fy1, cy + pad))
+        self.roi = roi if roi[0] < roi[2] and roi[1] < roi[3] else self.fixed_roi
+
+def make_preprocessor(preprocess):
+    """Build an InferencePreprocessor from a settings dict, or None for the plain path."""
+    return InferencePreprocessor(**preprocess) if preprocess else None
@@ -0,0 +1,81 @@
+import bisect
+import json
+import os
+
+import metrics
+from landmark_cache import video_fingerprint
+
+# === Keyframe Index ===
+# <video>_keyframes.json holds where the keyframes of a video's first video
+# stream are, read once from the packet flags (no decoding) and reused
+# until the video's fingerprint changes:
+#   {"fingerprint": ..., "frame_count": 270000, "keyframes": [0, 30, ...], "keyframe_times": [0.0, 1.001, ...]}
+# keyframes are 0-based frame indices in presentation order, the way
+# OpenCV's CAP_PROP_POS_FRAMES counts; keyframe_times are their pts in seconds.
+
+def index_path(input_file):
+    return input_file.rsplit('.', 1)[0] + '_keyframes.json'
+
+class KeyframeIndex:
+    def __init__(self, frame_count, keyframes, keyframe_times):
+        self.frame_count = frame_count
+        self.keyframes = keyframes
+        self.keyframe_times = keyframe_times
+
+    @property
+    def gop_length(self):
+        """Average frames per GOP."""
+        return self.frame_count / max(1, len(self.keyframes))
+
+    def keyframe_before(self, frame):
+        """The last keyframe at or before 0-based frame index frame (0 if there is none)."""
+        i = bisect.bisect_right(self.keyframes, frame)
+        return self.keyframes[i - 1] if i else 0
+
+def probe_packets(input_file):
+    """KeyframeIndex from one ffprobe pass over the video packets."""
+    command = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+               '-of', 'csv=p=0', input_file]
+    probe = metrics.run_subprocess('probe', command, capture_output=True, text=True, check=True)
+    packets = []
+    for line in probe.stdout.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if pts_time not in ('', 'N/A'):
+            packets.append((float(pts_time), 'K' in flags))
+    # Packets come in decode order; a frame's index is its rank by pts
+    packets.sort()
+    keyframes = [i for i, (_, key) in enumerate(packets) if key]
+    return KeyframeIndex(len(packets), keyframes, [packets[i][0] for i in keyframes])
+
+# Indexes already loaded in this process, by path, with the (size, mtime) they were loaded for
+_loaded = {}
+
+def load_keyframe_index(input_file):
+    """The KeyframeIndex of input_file, from its _keyframes.json when that is current, else probed and saved."""
+    stat = os.stat(input_file)
+    loaded = _loaded.get(input_file)
+    if loaded and loaded[0] == (stat.st_size, stat.st_mtime_ns):
+        return loaded[1]
+    path = index_path(input_file)
+    fingerprint = video_fingerprint(input_file)
+    index = None
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+        if saved['fingerprint'] == fingerprint:
+            index = KeyframeIndex(saved['frame_count'], saved['keyframes'], saved['keyframe_times'])
+    except (OSError, ValueError, KeyError):
+        pass
+    if index is None:
+        index = probe_packets(input_file)
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'frame_count': index.frame_count,
+                           'keyframes': index.keyframes, 'keyframe_times': index.keyframe_times}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # A read-only folder only costs the probe again next run
+            print(f"Could not save keyframe index {path}: {e}")
+    _loaded[input_file] = ((stat.st_size, stat.st_mtime_ns), index)
+    return index
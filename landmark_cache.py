@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+# === File Layout ===
+# magic, uint32 header length, JSON header (padded to 64 bytes), then one
+# fixed-size record per sampled frame in frame order. The records can be
+# np.memmap'ed straight from disk.
+MAGIC = b'FHLM\x01\x00\x00\x00'
+ALIGN = 64
+MAX_HANDS = 2
+
+RECORD_DTYPE = np.dtype([
+    ('frame', '<u4'),
+    ('hands', 'u1'),
+    ('landmarks', '<f4', (MAX_HANDS, 21, 3)),
+])
+
+def cache_path(input_file):
+    return input_file.rsplit('.', 1)[0] + '_landmarks.bin'
+
+# === Video Fingerprint ===
+def video_fingerprint(path, block_size=1 << 20, blocks=4):
+    """Cheap content hash: size, mtime and a few evenly spaced blocks.
+
+    Catches a re-exported or replaced chapter without reading gigabytes.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1(f'{stat.st_size}:{int(stat.st_mtime)}'.encode())
+    with open(path, 'rb') as f:
+        for i in range(blocks):
+            f.seek(max(0, (stat.st_size - block_size) * i // max(1, blocks - 1)))
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+# === Writing ===
+class LandmarkCacheWriter:
+    """Append sampled-frame landmarks; the file only appears once close() succeeds.
+
+    windows are the (start_frame, end_frame) windows of a detect_windows
+    run, kept in the header so replay_events resets where each one starts.
+    """
+
+    def __init__(self, input_file, settings, fps, windows=None):
+        self.path = cache_path(input_file)
+        self.tmp_path = self.path + '.tmp'
+        header = {'video': os.path.basename(input_file), 'video_hash': video_fingerprint(input_file),
+                  'record_dtype': RECORD_DTYPE.descr, 'fps': fps, **settings}
+        if windows is not None:
+            header['windows'] = [[int(start), int(end)] for start, end in windows]
+        encoded = json.dumps(header, sort_keys=True).encode()
+        padding = -(len(MAGIC) + 4 + len(encoded)) % ALIGN
+        self.file = open(self.tmp_path, 'wb')
+        self.file.write(MAGIC + struct.pack('<I', len(encoded) + padding) + encoded + b' ' * padding)
+        self.record = np.zeros(1, dtype=RECORD_DTYPE)
+
+    def add(self, frame_number, multi_hand_landmarks):
+        hands = multi_hand_landmarks or []
+        self.record['frame'] = frame_number
+        self.record['hands'] = min(len(hands), MAX_HANDS)
+        self.record['landmarks'] = 0
+        for i, hand in enumerate(hands[:MAX_HANDS]):
+            self.record['landmarks'][0, i] = [(p.x, p.y, p.z) for p in hand.landmark]
+        self.file.write(self.record.tobytes())
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+class LandmarkRecorder:
+    """LandmarkCacheWriter's add() into memory; records() is the array load_landmark_cache would return."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def add(self, frame_number, multi_hand_landmarks):
+        hands = multi_hand_landmarks or []
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record['frame'] = frame_number
+        record['hands'] = min(len(hands), MAX_HANDS)
+        for i, hand in enumerate(hands[:MAX_HANDS]):
+            record['landmarks'][0, i] = [(p.x, p.y, p.z) for p in hand.landmark]
+        self.chunks.append(record)
+
+    def records(self):
+        return np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=RECORD_DTYPE)
+
+# === Reading ===
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None, 0
+        (length,) = struct.unpack('<I', f.read(4))
+        return json.loads(f.read(length)), len(MAGIC) + 4 + length
+
+def load_landmark_cache(input_file, settings):
+    """Return (header, records) if a cache for input_file is still valid, else None.
+
+    The cache is stale when the video fingerprint or any of the detection
+    settings it was written with differ; stale files are removed. records is
+    a read-only memmap of RECORD_DTYPE sorted by frame number.
+    """
+    path = cache_path(input_file)
+    if not os.path.exists(path):
+        return None
+    header, offset = read_header(path)
+    current = {'video_hash': video_fingerprint(input_file), 'record_dtype': json.loads(json.dumps(RECORD_DTYPE.descr)),
+               **json.loads(json.dumps(settings))}
+    if header is None or any(header.get(key) != value for key, value in current.items()):
+        os.remove(path)
+        return None
+    if os.path.getsize(path) == offset:
+        return header, np.zeros(0, dtype=RECORD_DTYPE)
+    return header, np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=offset)
+
+def lookup(records, frame_number):
+    """Landmarks array (hands, 21, 3) for one frame, or None if it wasn't sampled."""
+    i = np.searchsorted(records['frame'], frame_number)
+    if i == len(records) or records['frame'][i] != frame_number:
+        return None
+    return records['landmarks'][i, :records['hands'][i]]
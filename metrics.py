@@ -0,0 +1,167 @@
+import bisect
+import json
+import os
+import subprocess
+import threading
+import time
+
+# Upper bounds in seconds, shared by every histogram; wide enough for a
+# single hands.process call up to a whole chapter render.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+PREFIX = 'highlights_'
+
+# === Registry ===
+# One registry per process. Updates are a dict lookup and an add under a
+# lock, cheap enough for per-frame use.
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_records = {}
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def count(name, n=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = {'buckets': [0] * (len(BUCKETS) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0}
+        h['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+        h['count'] += 1
+        h['sum'] += seconds
+        h['max'] = max(h['max'], seconds)
+
+def record(name, **fields):
+    """Keep one row (e.g. one clip's render time) for the JSON report; not exported to Prometheus."""
+    with _lock:
+        _records.setdefault(name, []).append(fields)
+
+class timed:
+    """Context manager observing the time spent inside it."""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+def run_subprocess(stage, command, **kwargs):
+    """subprocess.run, with its wall time observed per tool and pipeline stage."""
+    with timed('subprocess_seconds', tool=os.path.basename(command[0]), stage=stage):
+        return subprocess.run(command, **kwargs)
+
+# === Snapshots ===
+def snapshot(reset=False):
+    """Picklable copy of the registry; reset=True also clears it (for reused worker processes)."""
+    with _lock:
+        snap = {'counters': list(_counters.items()),
+                'histograms': [(k, {**h, 'buckets': list(h['buckets'])}) for k, h in _histograms.items()],
+                'records': {name: list(rows) for name, rows in _records.items()}}
+        if reset:
+            _counters.clear()
+            _histograms.clear()
+            _records.clear()
+    return snap
+
+def merge(snap):
+    """Add a snapshot from another process into this one's registry."""
+    with _lock:
+        for key, value in snap['counters']:
+            _counters[key] = _counters.get(key, 0) + value
+        for key, other in snap['histograms']:
+            h = _histograms.setdefault(key, {'buckets': [0] * (len(BUCKETS) + 1), 'count': 0, 'sum': 0.0,
+                                             'max': 0.0})
+            h['buckets'] = [a + b for a, b in zip(h['buckets'], other['buckets'])]
+            h['count'] += other['count']
+            h['sum'] += other['sum']
+            h['max'] = max(h['max'], other['max'])
+        for name, rows in snap['records'].items():
+            _records.setdefault(name, []).extend(rows)
+
+# === Export ===
+def _series(name, labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+def run_report(**extra):
+    """JSON-ready dict of every counter and histogram, plus any extra sections."""
+    snap = snapshot()
+    report = {'counters': {_series(name, labels): value for (name, labels), value in snap['counters']},
+              'histograms': {}, 'records': snap['records']}
+    for (name, labels), h in snap['histograms']:
+        report['histograms'][_series(name, labels)] = {
+            'count': h['count'], 'sum': round(h['sum'], 6), 'mean': round(h['sum'] / max(1, h['count']), 6),
+            'max': round(h['max'], 6),
+            'buckets': {str(le): n for le, n in zip(BUCKETS + ('+Inf',), h['buckets'])}}
+    report.update(extra)
+    return report
+
+def write_json(path, **extra):
+    _write_atomic(path, json.dumps(run_report(**extra), indent=1, default=str))
+
+def write_prometheus(path):
+    """Prometheus text format, for node_exporter's textfile collector."""
+    snap = snapshot()
+    lines = []
+    for name in sorted({name for (name, _), _ in snap['counters']}):
+        lines.append(f'# TYPE {PREFIX}{name}_total counter')
+        lines += [f'{_series(PREFIX + name + "_total", labels)} {value}'
+                  for (n, labels), value in snap['counters'] if n == name]
+    for name in sorted({name for (name, _), _ in snap['histograms']}):
+        lines.append(f'# TYPE {PREFIX}{name} histogram')
+        for (n, labels), h in snap['histograms']:
+            if n != name:
+                continue
+            cumulative = 0
+            for le, n_bucket in zip(BUCKETS + ('+Inf',), h['buckets']):
+                cumulative += n_bucket
+                lines.append(f'{_series(PREFIX + name + "_bucket", labels, [("le", le)])} {cumulative}')
+            lines.append(f'{_series(PREFIX + name + "_sum", labels)} {h["sum"]}')
+            lines.append(f'{_series(PREFIX + name + "_count", labels)} {h["count"]}')
+    _write_atomic(path, '\n'.join(lines) + '\n')
+
+def _write_atomic(path, text):
+    # The textfile collector may read at any moment, so never expose a half-written file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+# === Progress ===
+class ThrottledProgress:
+    """Progress callback that forwards to update (e.g. tqdm's) at most every min_interval seconds.
+
+    Counts in between are summed; call flush() at the end so the bar
+    reaches its total.
+    """
+
+    def __init__(self, update, min_interval=0.5):
+        self.update = update
+        self.min_interval = min_interval
+        self.pending = 0
+        self.last = time.perf_counter()
+
+    def __call__(self, n=1):
+        self.pending += n
+        now = time.perf_counter()
+        if now - self.last >= self.min_interval:
+            self.flush()
+            self.last = now
+
+    def flush(self):
+        if self.pending:
+            self.update(self.pending)
+            self.pending = 0
@@ -0,0 +1,77 @@
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+# === Badge Sprites ===
+@lru_cache(maxsize=64)
+def render_badge(text, fg, bg, font=cv2.FONT_HERSHEY_SIMPLEX, scale=1, thickness=2, padding=10, bg_alpha=1.0):
+    """Render a text-on-background badge once; returns (sprite, alpha, text_size).
+
+    The pixels are the ones draw_text_with_background would leave in the
+    frame: the filled rectangle plus anti-aliased text at the same offsets.
+    alpha is None for an opaque badge (blending is then a plain copy),
+    otherwise a float32 (h, w, 1) mask. Scores only change on a goal, so
+    a small LRU covers a whole session.
+    """
+    text_size, _ = cv2.getTextSize(text, font, scale, thickness)
+    width, height = text_size[0] + padding + 1, text_size[1] + 2 * padding + 1
+    sprite = np.empty((height, width, 3), dtype=np.uint8)
+    sprite[:] = bg
+    cv2.putText(sprite, text, (padding // 2, text_size[1] + padding - padding // 2), font, scale, fg, thickness,
+                cv2.LINE_AA)
+    sprite.flags.writeable = False
+    if bg_alpha >= 1.0:
+        return sprite, None, text_size
+
+    # Translucent background, opaque text: alpha follows the text coverage.
+    coverage = np.abs(sprite.astype(np.int16) - np.array(bg, dtype=np.int16)).max(axis=2, keepdims=True)
+    alpha = np.maximum(bg_alpha, np.clip(coverage / max(1, np.abs(np.subtract(fg, bg)).max()), 0, 1))
+    return sprite, alpha.astype(np.float32), text_size
+
+# === Layout ===
+def place_badge(frame_width, text, fg, bg, x_offset, y_offset, padding=10, bg_alpha=1.0,
+                font=cv2.FONT_HERSHEY_SIMPLEX, scale=1, thickness=2):
+    """(sprite, alpha, x, y): the cached badge and where its top-left corner goes."""
+    sprite, alpha, text_size = render_badge(text, tuple(fg), tuple(bg), font, scale, thickness, padding, bg_alpha)
+    x = int((frame_width - text_size[0] - padding) // 2 + x_offset)
+    y = int(y_offset) - text_size[1] - padding
+    return sprite, alpha, x, y
+
+def scoreboard_badges(frame_width, team_one, score_one, team_two, score_two, team1_colors, team2_colors,
+                      bg_alpha=1.0):
+    """Both score badges, placed as create_highlight_video lays them out.
+
+    team*_colors are (bg, fg) pairs from get_team_colors.
+    """
+    team1_bg, team1_fg = team1_colors
+    team2_bg, team2_fg = team2_colors
+    return [place_badge(frame_width, f'{team_one}: {score_one}', team1_fg, team1_bg, 0, 50, bg_alpha=bg_alpha),
+            place_badge(frame_width, f'{team_two}: {score_two}', team2_fg, team2_bg, 0, 100, bg_alpha=bg_alpha)]
+
+# === Compositor ===
+def blend_badge(image, sprite, alpha, x, y):
+    """Copy (or alpha-blend) a placed badge into image in place; only its region is touched."""
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite.shape[1], image.shape[1]), min(y + sprite.shape[0], image.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return image
+    src = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+    roi = image[y0:y1, x0:x1]
+    if alpha is None:
+        roi[:] = src
+    else:
+        a = alpha[y0 - y:y1 - y, x0 - x:x1 - x]
+        roi[:] = (src * a + roi * (1 - a)).astype(np.uint8)
+    return image
+
+def draw_scoreboard(image, team_one, score_one, team_two, score_two, team1_colors, team2_colors, bg_alpha=1.0):
+    """Draw both score badges. Frames handed out read-only by the decoder are
+    copied once; writable frames are drawn on directly.
+    """
+    if not image.flags.writeable:
+        image = image.copy()
+    for badge in scoreboard_badges(image.shape[1], team_one, score_one, team_two, score_two,
+                                   team1_colors, team2_colors, bg_alpha):
+        blend_badge(image, *badge)
+    return image
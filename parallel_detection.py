@@ -0,0 +1,137 @@
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+import metrics
+from event_log import event_log_path, write_event_log
+from gesture_detection import cooldown_duration, required_duration, detect_range, replay_events, write_scores_csv
+from landmark_cache import RECORD_DTYPE, LandmarkRecorder
+from motion_gate import make_gate, print_gate_counts
+
+# === Shard Planning ===
+def plan_shards(frame_count, fps, shard_seconds=300, overlap_seconds=None):
+    """Split a chapter into (warm_start, own_start, own_end) frame ranges.
+
+    Each shard only keeps the landmarks of frames in (own_start, own_end];
+    the frames from warm_start are decoded first so that MediaPipe's
+    tracking leading into own_start looks like it would in a serial run.
+    """
+    if overlap_seconds is None:
+        overlap_seconds = cooldown_duration + required_duration + 1
+    shard_frames = max(1, int(shard_seconds * fps))
+    overlap_frames = int(overlap_seconds * fps)
+    shards = []
+    for own_start in range(0, max(frame_count, 1), shard_frames):
+        own_end = min(own_start + shard_frames, frame_count)
+        shards.append((max(0, own_start - overlap_frames), own_start, own_end))
+    # The last shard keeps reading to the end of the stream, in case
+    # CAP_PROP_FRAME_COUNT undercounts.
+    warm_start, own_start, _ = shards[-1]
+    shards[-1] = (warm_start, own_start, None)
+    return shards
+
+# === Worker ===
+def _detect_shard(input_file, fps_reduction_factor, preprocess, motion_gating, frame_source,
+                  warm_start, own_start, own_end):
+    gate = make_gate(motion_gating)
+    recorder = LandmarkRecorder()
+    detect_range(input_file, fps_reduction_factor, warm_start, own_end, preprocess=preprocess, cache_writer=recorder,
+                 gate=gate, frame_source=frame_source)
+    records = recorder.records()
+    # Worker processes are reused across shards, so hand back and clear this shard's metrics
+    return records[records['frame'] > own_start], gate.counts() if gate else None, metrics.snapshot(reset=True)
+
+# === Merging ===
+def merge_shard_records(shard_records):
+    """One chapter's landmark records from its shards', in frame order, each frame once.
+
+    Gestures are not decided in the shards: a gesture held or a cooldown
+    started before a shard's own range would be invisible to it. Replaying
+    the merged records through one GestureTracker (replay_events) fires
+    exactly the events a serial run over the same landmarks fires.
+    """
+    merged, last_frame = [], -1
+    for records in shard_records:
+        records = records[records['frame'] > last_frame]
+        if len(records):
+            merged.append(records)
+            last_frame = int(records['frame'][-1])
+    return np.concatenate(merged) if merged else np.zeros(0, dtype=RECORD_DTYPE)
+
+# === Shared Pool ===
+# One process pool for the whole run: every chapter's shards go to it, and
+# each worker builds its MediaPipe Hands once rather than once per chapter
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool(max_workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool[0] != max_workers:
+            if _pool is not None:
+                _pool[1].shutdown()
+            # spawn keeps the parent's MediaPipe graph threads out of the workers
+            _pool = max_workers, ProcessPoolExecutor(max_workers=max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+        return _pool[1]
+
+# === Parallel Detection ===
+def process_videos_parallel(input_files, fps_reduction_factor, team_one, team_two,
+                            starting_score_one=0, starting_score_two=0,
+                            max_workers=None, shard_seconds=300, overlap_seconds=None, preprocess=None,
+                            motion_gating=None, frame_source='opencv'):
+    """Detect gestures in all chapters at once and write one _scores.csv each.
+
+    Chapters are cut into overlapping time shards and spread across the
+    shared process pool (get_pool); every worker process builds its own
+    MediaPipe Hands instance on first use and keeps it for later calls,
+    which may run from several threads at once. Returns the CSV paths in
+    input order. Each chapter's event log is written once its shards are
+    merged, not as events fire.
+    """
+    max_workers = max_workers or os.cpu_count()
+    plans = {}
+    fps_by_file = {}
+    for input_file in input_files:
+        cap = cv2.VideoCapture(input_file)
+        fps = fps_by_file[input_file] = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        plans[input_file] = plan_shards(frame_count, fps, shard_seconds, overlap_seconds)
+
+    results = {input_file: [None] * len(shards) for input_file, shards in plans.items()}
+    pool = get_pool(max_workers)
+    futures = {}
+    for input_file, shards in plans.items():
+        for i, shard in enumerate(shards):
+            future = pool.submit(_detect_shard, input_file, fps_reduction_factor, preprocess, motion_gating,
+                                 frame_source, *shard)
+            futures[future] = (input_file, i)
+    try:
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Detecting shards"):
+            input_file, i = futures[future]
+            records, counts, shard_metrics = future.result()
+            metrics.merge(shard_metrics)
+            results[input_file][i] = records, counts
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+    output_csvs = []
+    for input_file in input_files:
+        records = merge_shard_records([records for records, _ in results[input_file]])
+        score_events = replay_events({'fps': fps_by_file[input_file]}, records)
+        if motion_gating:
+            counts = [c for _, c in results[input_file]]
+            print_gate_counts(os.path.basename(input_file), {key: sum(c[key] for c in counts) for key in counts[0]})
+        write_event_log(event_log_path(input_file), input_file, score_events, team_one, team_two,
+                        starting_score_one, starting_score_two, fps_by_file[input_file])
+        output_csvs.append(write_scores_csv(input_file, score_events, team_one, team_two,
+                                            starting_score_one, starting_score_two))
+    return output_csvs
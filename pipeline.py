@@ -0,0 +1,192 @@
+import queue
+import threading
+import time
+
+import cv2
+
+from gesture_detection import (HANDS_SETTINGS, GestureTracker, get_frame_interval, get_hands, infer_landmarks,
+                               open_sampled_frames)
+from inference_preprocess import make_preprocessor
+
+_DONE = object()
+
+class StageTimer:
+    """Time a pipeline stage spends working versus stalled on its queues.
+
+    waiting: blocked on get() because the upstream stage is behind.
+    blocked: blocked on put() because the downstream stage is behind.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = 0
+        self.waiting = 0.0
+        self.blocked = 0.0
+        self.total = 0.0
+
+    def get(self, q):
+        start = time.perf_counter()
+        item = q.get()
+        with self.lock:
+            self.waiting += time.perf_counter() - start
+        return item
+
+    def put(self, q, item):
+        start = time.perf_counter()
+        q.put(item)
+        with self.lock:
+            self.blocked += time.perf_counter() - start
+
+    def report(self):
+        return {'items': self.items, 'total': round(self.total, 3),
+                'waiting': round(self.waiting, 3), 'blocked': round(self.blocked, 3),
+                'busy': round(self.total - self.waiting - self.blocked, 3)}
+
+# === Stages ===
+def _decode(sampled_frames, frames, n_workers, timer, errors, stop):
+    start = time.perf_counter()
+    try:
+        for frame_number, image in sampled_frames:
+            if stop.is_set():
+                break
+            timer.put(frames, (timer.items, frame_number, image))
+            timer.items += 1
+    except Exception as e:
+        errors.append(e)
+    finally:
+        sampled_frames.close()
+        for _ in range(n_workers):
+            frames.put(_DONE)
+        timer.total = time.perf_counter() - start
+
+def _infer(hands, preprocess, rgb, frames, results, timer, errors, stop):
+    start = time.perf_counter()
+    preprocessor = make_preprocessor(preprocess)
+    item = None
+    try:
+        while True:
+            item = timer.get(frames)
+            if item is _DONE:
+                break
+            if stop.is_set():
+                continue  # consume, so the decoder gets to stop
+            seq, frame_number, image = item
+            landmarks = infer_landmarks(hands, image, preprocessor, rgb)
+            timer.put(results, (seq, frame_number, landmarks))
+            with timer.lock:
+                timer.items += 1
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+        # Keep draining so the decoder is never stuck on a full queue.
+        while item is not _DONE:
+            item = frames.get()
+    finally:
+        results.put(_DONE)
+        with timer.lock:
+            timer.total += time.perf_counter() - start
+
+def _classify(fps, results, n_workers, timer, tracker, cache_writer):
+    """Feed inference results to the tracker strictly in frame order."""
+    start = time.perf_counter()
+    score_events = []
+    pending = {}
+    next_seq = 0
+    done = 0
+    while done < n_workers:
+        item = timer.get(results)
+        if item is _DONE:
+            done += 1
+            continue
+        seq, frame_number, landmarks = item
+        pending[seq] = (frame_number, landmarks)
+        while next_seq in pending:
+            frame_number, landmarks = pending.pop(next_seq)
+            if cache_writer:
+                cache_writer.add(frame_number, landmarks)
+            score_events.extend(tracker.update(frame_number, frame_number / fps, landmarks))
+            next_seq += 1
+            timer.items += 1
+    timer.total = time.perf_counter() - start
+    return score_events
+
+# === Pipelined Detection ===
+def pipeline_hands_settings(inference_workers):
+    if inference_workers == 1:
+        return HANDS_SETTINGS
+    return {**HANDS_SETTINGS, 'static_image_mode': True}
+
+def detect_range_pipelined(input_file, fps_reduction_factor, start_frame=0, end_frame=None,
+                           queue_depth=8, inference_workers=1, hands=None, progress=None,
+                           preprocess=None, cache_writer=None, frame_source='opencv', event_log=None):
+    """Same events as gesture_detection.detect_range, with overlapped stages.
+
+    A decoder thread fills a queue of at most queue_depth sampled frames,
+    inference_workers threads run MediaPipe on them, and the calling thread
+    classifies results in frame order so the gesture states and cooldown are
+    deterministic. Returns (score_events, stage_report); the report shows
+    where each stage stalled, which points at the bottleneck. preprocess is
+    passed to every inference worker as in detect_range; with auto_roi each
+    worker tracks the ROI over the frames it sees. If any stage fails, the
+    others are stopped and the frame source closed before the error is
+    raised.
+    """
+    cap = cv2.VideoCapture(input_file)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    frame_interval = get_frame_interval(fps, fps_reduction_factor)
+
+    if inference_workers == 1:
+        hands_per_worker = [hands or get_hands()]
+    else:
+        # Workers see interleaved frames, so cross-frame tracking would be wrong.
+        import mediapipe as mp
+        hands_per_worker = [mp.solutions.hands.Hands(**pipeline_hands_settings(inference_workers))
+                            for _ in range(inference_workers)]
+
+    frames = queue.Queue(maxsize=queue_depth)
+    results = queue.Queue(maxsize=queue_depth)
+    timers = {'decode': StageTimer(), 'inference': StageTimer(), 'classify': StageTimer()}
+    errors = []
+    stop = threading.Event()
+
+    # Every frame in the queue, one per worker and the one being decoded are alive at once.
+    sampled_frames = open_sampled_frames(input_file, frame_interval, start_frame, end_frame, progress, frame_source,
+                                         (preprocess or {}).get('target_width'),
+                                         buffers=queue_depth + inference_workers + 2)
+    rgb = frame_source == 'ffmpeg'
+    threads = [threading.Thread(target=_decode, daemon=True,
+                                args=(sampled_frames, frames, inference_workers, timers['decode'], errors, stop))]
+    threads += [threading.Thread(target=_infer, daemon=True,
+                                 args=(worker_hands, preprocess, rgb, frames, results, timers['inference'], errors,
+                                       stop))
+                for worker_hands in hands_per_worker]
+    for thread in threads:
+        thread.start()
+    try:
+        score_events = _classify(fps, results, inference_workers, timers['classify'],
+                                 GestureTracker(event_log=event_log), cache_writer)
+    finally:
+        # If classifying failed, stop the other stages and empty the results
+        # queue until they have exited, so none is left blocked on a put
+        stop.set()
+        while any(thread.is_alive() for thread in threads):
+            try:
+                results.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        for thread in threads:
+            thread.join()
+        sampled_frames.close()
+        if inference_workers > 1:
+            for worker_hands in hands_per_worker:
+                worker_hands.close()
+    if errors:
+        raise errors[0]
+
+    return score_events, {name: timer.report() for name, timer in timers.items()}
+
+def print_stage_report(report):
+    for name, stats in report.items():
+        print(f"  {name:10s} items={stats['items']:<7d} busy={stats['busy']:.2f}s "
+              f"waiting={stats['waiting']:.2f}s blocked={stats['blocked']:.2f}s")
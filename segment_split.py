@@ -0,0 +1,58 @@
+import os
+
+import metrics
+
+# Social-media variants of a highlight reel: name -> video filter. Filters
+# are written as ffmpeg expressions on the input size, so no probe is
+# needed. Add an entry (e.g. a 9:16 crop) to make a new variant available.
+OUTPUT_FORMATS = {
+    'square': 'crop=ih:ih',
+    'mobile': 'pad=iw:trunc(iw*16/9):0:trunc((oh-ih)/2)',
+}
+
+# === Thread Budget ===
+def encoder_threads(n_outputs, parallel_splits=1):
+    """x264 threads per output so parallel_splits concurrent splits share the CPUs."""
+    return max(1, (os.cpu_count() or 1) // max(1, parallel_splits * n_outputs))
+
+# === Split ===
+def build_split_command(video_path, segment_length, formats, output_dir, parallel_splits=1):
+    file_name, ext = os.path.splitext(os.path.basename(video_path))
+    labels = [f'[s{i}]' for i in range(len(formats))]
+    graph = [f"[0:v]split={len(formats)}{''.join(labels)}"]
+    graph += [f'{label}{OUTPUT_FORMATS[name]}[v{i}]' for i, (label, name) in enumerate(zip(labels, formats))]
+
+    threads = encoder_threads(len(formats), parallel_splits)
+    command = ['ffmpeg', '-v', 'error', '-y', '-threads', str(max(1, threads * len(formats))), '-i', video_path,
+               '-filter_complex', ';'.join(graph)]
+    for i, name in enumerate(formats):
+        command += [
+            '-map', f'[v{i}]', '-map', '0:a?', '-force_key_frames', f"expr:gte(t,n_forced*{segment_length})",
+            '-c:v', 'libx264', '-threads', str(threads), '-c:a', 'copy', '-f', 'segment',
+            '-segment_time', str(segment_length), '-reset_timestamps', '1',
+            f"{output_dir}/{file_name}_{name}_%03d{ext}"
+        ]
+    return command
+
+def split_segments(video_path, segment_length, formats=('square',), output_dir=None, parallel_splits=1):
+    """Cut video_path into segment_length pieces in every format, decoding it once.
+
+    The decoded frames go through a split filter to one filter chain and
+    one segment muxer per format, all in the same ffmpeg process.
+    parallel_splits is how many splits the caller runs at once; encoder
+    threads are divided between them.
+    """
+    unknown = [name for name in formats if name not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown split formats {unknown}; known: {sorted(OUTPUT_FORMATS)}")
+    file_name = os.path.splitext(os.path.basename(video_path))[0]
+    if output_dir is None:
+        output_dir = f"{file_name}_clips"
+    os.makedirs(output_dir, exist_ok=True)
+    # Drop segments of an earlier, longer run so the directory holds exactly this split
+    for name in os.listdir(output_dir):
+        if any(name.startswith(f'{file_name}_{fmt}_') for fmt in formats):
+            os.remove(os.path.join(output_dir, name))
+    metrics.run_subprocess('split', build_split_command(video_path, segment_length, formats, output_dir,
+                                                        parallel_splits), check=True)
+    return output_dir
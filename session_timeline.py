@@ -0,0 +1,157 @@
+import bisect
+import threading
+
+import cv2
+
+from ffmpeg_source import ffmpeg_frames
+from frame_sampler import sample_frames, seek_sample_frames
+from gesture_detection import detect_frames, get_frame_interval
+from keyframe_index import load_keyframe_index
+
+# === Session Timeline ===
+class SessionTimeline:
+    """The chapters of one GoPro recording (GX01xxxx, GX02xxxx, ...) as one timeline.
+
+    Frame numbers and times run on from one chapter into the next, so a
+    session time maps to a chapter and a time inside it, and a window of
+    session time maps to one piece per chapter it covers. All chapters
+    must have the same frame rate.
+    """
+
+    def __init__(self, chapters):
+        self.chapters = list(chapters)
+        self.start_frames = []
+        frame_counts = []
+        fps = None
+        for path in self.chapters:
+            cap = cv2.VideoCapture(path)
+            chapter_fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_counts.append(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+            cap.release()
+            if fps is not None and abs(chapter_fps - fps) > 1e-3:
+                raise ValueError(f"{path} runs at {chapter_fps:.3f} fps, the session at {fps:.3f}")
+            fps = chapter_fps
+        self.fps = fps
+        total = 0
+        for count in frame_counts:
+            self.start_frames.append(total)
+            total += count
+        self.frame_count = total
+        self.start_times = [frame / fps for frame in self.start_frames]
+        self.duration = total / fps
+
+    def locate(self, t):
+        """(chapter index, time inside that chapter) for session time t."""
+        i = max(0, bisect.bisect_right(self.start_times, t) - 1)
+        return i, t - self.start_times[i]
+
+    def pieces(self, start, end):
+        """(path, chapter_start, chapter_end) pieces covering session time [start, end)."""
+        pieces = []
+        i, _ = self.locate(start)
+        while i < len(self.chapters) and self.start_times[i] < end:
+            chapter_end = self.start_times[i + 1] if i + 1 < len(self.chapters) else self.duration
+            a, b = max(start, self.start_times[i]), min(end, chapter_end)
+            if b > a:
+                pieces.append((self.chapters[i], a - self.start_times[i], b - self.start_times[i]))
+            i += 1
+        return pieces
+
+# === Continuous Frame Reader ===
+class _ChapterReader:
+    """One chapter's sampled frames, started on a background thread.
+
+    The thread opens the file and decodes the first sampled frame while
+    the previous chapter is still being read, so the switch costs nothing.
+    Progress from the thread is held back until take() hands over the
+    caller's callback.
+    """
+
+    def __init__(self, open_frames):
+        self.pending = 0
+        self.progress = None
+        self.first = self.error = None
+        self.frames = open_frames(self._count)
+        self.thread = threading.Thread(target=self._prime, daemon=True)
+        self.thread.start()
+
+    def _count(self, n):
+        if self.progress:
+            self.progress(n)
+        else:
+            self.pending += n
+
+    def _prime(self):
+        try:
+            self.first = next(self.frames, None)
+        except Exception as e:
+            self.error = e
+
+    def take(self, progress):
+        self.thread.join()
+        if self.error:
+            raise self.error
+        self.progress = progress or (lambda n: None)
+        if progress and self.pending:
+            progress(self.pending)
+        if self.first is not None:
+            yield self.first
+            yield from self.frames
+
+    def close(self):
+        self.thread.join()
+        self.frames.close()
+
+def session_frames(timeline, frame_interval, progress=None, frame_source='opencv', target_width=None, buffers=1):
+    """Yield (session_frame_number, image) over every chapter, as if they were one file.
+
+    Frames are sampled every frame_interval frames of session time, so the
+    spacing does not restart at a chapter boundary. The next chapter is
+    opened ahead of time (see _ChapterReader).
+    """
+    def opener(i):
+        def open_frames(count):
+            if frame_source == 'ffmpeg':
+                return ffmpeg_frames(timeline.chapters[i], frame_interval, target_width=target_width,
+                                     progress=count, buffers=buffers, frame_offset=timeline.start_frames[i])
+            return _opencv_frames(timeline.chapters[i], frame_interval, count, timeline.start_frames[i],
+                                  frame_source == 'seek')
+        return open_frames
+
+    reader = _ChapterReader(opener(0))
+    try:
+        for i in range(len(timeline.chapters)):
+            current = reader
+            reader = _ChapterReader(opener(i + 1)) if i + 1 < len(timeline.chapters) else None
+            try:
+                yield from current.take(progress)
+            finally:
+                current.close()
+    finally:
+        if reader:
+            reader.close()
+
+def _opencv_frames(path, frame_interval, progress, frame_offset, seek=False):
+    cap = cv2.VideoCapture(path)
+    try:
+        if seek:
+            yield from seek_sample_frames(cap, frame_interval, load_keyframe_index(path), progress,
+                                          frame_offset=frame_offset)
+        else:
+            yield from sample_frames(cap, frame_interval, progress, frame_offset)
+    finally:
+        cap.release()
+
+# === Session Detection ===
+def detect_session(timeline, fps_reduction_factor, hands=None, progress=None, preprocess=None, gate=None,
+                   frame_source='opencv', event_log=None):
+    """detect_range over a whole session, with one gesture tracker for all chapters.
+
+    A gesture held across a chapter switch still counts, and the cooldown
+    after a goal at the end of one chapter carries into the next. Events
+    carry session frame numbers and times.
+    """
+    frame_interval = get_frame_interval(timeline.fps, fps_reduction_factor)
+    frames = session_frames(timeline, frame_interval, progress, frame_source, (preprocess or {}).get('target_width'))
+    return detect_frames(frames, timeline.fps, hands, preprocess, gate=gate, rgb=frame_source == 'ffmpeg',
+                         event_log=event_log)
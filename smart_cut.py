@@ -0,0 +1,136 @@
+import json
+import os
+import tempfile
+
+import metrics
+from keyframe_index import load_keyframe_index
+
+# Re-encode settings per source codec, used only for the partial GOPs at
+# the edges of each cut. The edges get the source's profile, level and
+# pixel format, but their SPS/PPS still differ from the camera's, and an
+# avc1/hvc1 track has room for just one set; the joined track is tagged
+# avc3/hev1 instead, which carries the parameter sets in-band.
+ENCODERS = {
+    'h264': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18'],
+    'hevc': ['-c:v', 'libx265', '-preset', 'veryfast', '-crf', '20'],
+}
+IN_BAND_TAGS = {'h264': 'avc3', 'hevc': 'hev1'}
+# ffprobe profile names the edge encoders can produce
+PROFILES = {
+    'h264': {'Constrained Baseline': 'baseline', 'Baseline': 'baseline', 'Main': 'main', 'High': 'high',
+             'High 10': 'high10'},
+    'hevc': {'Main': 'main', 'Main 10': 'main10'},
+}
+SEEK_EPSILON = 0.001  # keep a keyframe seek from landing on the previous GOP through rounding
+
+# === Probing ===
+def probe_streams(input_file):
+    command = ['ffprobe', '-v', 'error', '-show_entries',
+               'stream=index,codec_type,codec_name,profile,level,pix_fmt,width,height,r_frame_rate,sample_rate,'
+               'channels',
+               '-of', 'json', input_file]
+    probe = metrics.run_subprocess('probe', command, capture_output=True, text=True, check=True)
+    return json.loads(probe.stdout)['streams']
+
+def probe_keyframes(input_file):
+    """Keyframe times in seconds, from the cached keyframe index (probed from packet flags once per file)."""
+    return load_keyframe_index(input_file).keyframe_times
+
+# === Cut Planning ===
+def plan_cut(start, end, keyframes):
+    """Split [start, end) into ('encode' | 'copy', piece_start, piece_end) pieces.
+
+    Whole GOPs between the first and last keyframe inside the window are
+    stream-copied; the partial GOPs before and after are re-encoded.
+    """
+    inside = [k for k in keyframes if start <= k <= end]
+    if len(inside) < 2:
+        return [('encode', start, end)]
+    first, last = inside[0], inside[-1]
+    pieces = []
+    if first > start:
+        pieces.append(('encode', start, first))
+    pieces.append(('copy', first, last))
+    if end > last:
+        pieces.append(('encode', last, end))
+    return pieces
+
+def edge_encoder(video):
+    """Encoder arguments for the edges of a video stream; ValueError if they can't match its profile."""
+    codec = video['codec_name']
+    profile = PROFILES.get(codec, {}).get(video.get('profile'))
+    if codec not in ENCODERS or profile is None:
+        raise ValueError(f"No smart-cut encoder for {codec!r} ({video.get('profile')})")
+    command = [*ENCODERS[codec], '-profile:v', profile, '-pix_fmt', video.get('pix_fmt', 'yuv420p')]
+    if codec == 'h264' and int(video.get('level') or 0) > 0:
+        command += ['-level', f"{int(video['level']) / 10:g}"]
+    return command
+
+def copies_audio(audio):
+    """Whether copied pieces can keep the source audio: only AAC-LC matches the edges' re-encoded AAC."""
+    return audio is not None and audio['codec_name'] == 'aac' and audio.get('profile') == 'LC'
+
+def _piece_command(input_file, mode, start, end, video, audio, path):
+    if mode == 'copy':
+        command = ['ffmpeg', '-v', 'error', '-y', '-ss', f'{start + SEEK_EPSILON:.6f}', '-i', input_file,
+                   '-t', f'{end - start:.6f}', '-map', '0:v:0', '-map', '0:a:0?', '-c:v', 'copy',
+                   '-avoid_negative_ts', 'make_zero']
+    else:
+        command = ['ffmpeg', '-v', 'error', '-y', '-ss', f'{start:.6f}', '-i', input_file,
+                   '-t', f'{end - start:.6f}', '-map', '0:v:0', '-map', '0:a:0?', *edge_encoder(video)]
+    if audio and mode == 'copy' and copies_audio(audio):
+        command += ['-c:a', 'copy']
+    elif audio:
+        command += ['-c:a', 'aac', '-ar', str(audio['sample_rate']), '-ac', str(audio['channels'])]
+    return command + ['-f', 'mpegts', path]
+
+# === Smart Cut ===
+def smart_cut(input_file, windows, output_file, keyframes=None, timeline=None):
+    """Write the (start, end) windows of input_file, back to back, to output_file.
+
+    With a session_timeline.SessionTimeline the windows are in session
+    time and input_file is its first chapter; a window that crosses a
+    chapter boundary is cut from both files.
+
+    Pieces go through MPEG-TS so the re-encoded edges can carry their own
+    parameter sets, then are joined with the concat demuxer without another
+    encode. Audio is copied only when it is AAC-LC like the edges', and
+    re-encoded in every piece otherwise. Raises ValueError for codecs or
+    profiles without a matching encoder and CalledProcessError if ffmpeg
+    fails; callers fall back to a full render.
+    Returns (copied seconds, re-encoded seconds).
+    """
+    streams = probe_streams(input_file)
+    video = next(s for s in streams if s['codec_type'] == 'video')
+    audio = next((s for s in streams if s['codec_type'] == 'audio'), None)
+    edge_encoder(video)  # raises before any piece is cut
+    keyframes_by_file = {input_file: keyframes} if keyframes is not None else {}
+
+    copied = encoded = 0.0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file))) as tmp:
+        pieces = []
+        for start, end in windows:
+            for source, source_start, source_end in (timeline.pieces(start, end) if timeline
+                                                     else [(input_file, start, end)]):
+                if source not in keyframes_by_file:
+                    keyframes_by_file[source] = probe_keyframes(source)
+                for mode, piece_start, piece_end in plan_cut(source_start, source_end, keyframes_by_file[source]):
+                    if piece_end - piece_start <= 0:
+                        continue
+                    path = os.path.join(tmp, f'{len(pieces):04d}.ts')
+                    metrics.run_subprocess('smart_cut', _piece_command(source, mode, piece_start, piece_end, video,
+                                                                       audio, path), check=True)
+                    pieces.append(path)
+                    if mode == 'copy':
+                        copied += piece_end - piece_start
+                    else:
+                        encoded += piece_end - piece_start
+
+        list_file = os.path.join(tmp, 'pieces.txt')
+        with open(list_file, 'w') as f:
+            f.writelines(f"file '{path}'\n" for path in pieces)
+        metrics.run_subprocess('smart_cut', ['ffmpeg', '-v', 'error', '-y', '-f', 'concat', '-safe', '0',
+                                             '-i', list_file, '-c', 'copy', '-tag:v', IN_BAND_TAGS[video['codec_name']],
+                                             '-bsf:a', 'aac_adtstoasc', '-movflags', '+faststart', output_file],
+                            check=True)
+    return copied, encoded
@@ -1,20 +1,42 @@
 import os
-import csv
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 import cv2
-import mediapipe as mp
 from tqdm import tqdm
-from moviepy.editor import VideoFileClip, concatenate_videoclips, vfx
 import re
+import shutil
 import subprocess
+import tempfile
+import threading
+from gesture_detection import (HANDS_SETTINGS, cache_settings, cooldown_duration, required_duration, detect_range,
+                               detect_windows, replay_events, export_scores_csv)
+from gesture_engine import GESTURE_TABLE
+from parallel_detection import process_videos_parallel
+from pipeline import detect_range_pipelined, pipeline_hands_settings, print_stage_report
+from adaptive_sampling import detect_adaptive, print_adaptive_stats
+from motion_gate import make_gate, print_gate_counts
+from whistle_detection import make_whistle_gate, print_whistle_report, whistle_events
+from landmark_cache import LandmarkCacheWriter, load_landmark_cache
+from smart_cut import smart_cut
+from highlight_windows import (ScoreTimeline, coalesce_windows, highlights_path, precise_events_file,
+                               read_highlight_events, read_score_inputs)
+from event_log import EventLogWriter, event_log_path, tail_event_log
+from overlay import draw_scoreboard
+from ffmpeg_render import render_highlights_ffmpeg
+from segment_split import split_segments
+from highlight_concat import concat_highlights
+from stage_scheduler import StageScheduler, print_schedule_report
+from build_manifest import MANIFEST_NAME, BuildManifest
+from session_timeline import SessionTimeline, detect_session
+from functools import partial
+import metrics
+from metrics import ThrottledProgress
 
 # === ADDED FOR YOUTUBE UPLOAD ===
 import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
 # === END SECTION ===
+# mediapipe, moviepy and the Google API client each take a second or more to import,
+# so they are imported inside the functions that use them; see cli.py
 
 
 # === GoPro Sorting Function ===
@@ -43,110 +65,177 @@ def sort_gopro_score_csvs(filenames):
         return (session, chapter)
     return sorted(filenames, key=gopro_csv_sort_key)
 
+def group_gopro_sessions(filenames):
+    """Chapter lists, one per recording session, each in chapter order."""
+    sessions = {}
+    for name in sort_gopro_filenames(filenames):
+        sessions.setdefault(int(os.path.splitext(name.strip())[0][4:]), []).append(name)
+    return list(sessions.values())
+
 # === Gesture Processing Setup ===
 team_one = "Team Black"
 team_two = "Team Orange"
 starting_score_one = 0
 starting_score_two = 0
 fps_reduction_factor = 5
-
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands()
-mp_drawing = mp.solutions.drawing_utils
-
-# === Gesture Detection Functions ===
-def is_index_finger(landmarks):
-    return (landmarks.landmark[8].y < landmarks.landmark[6].y and
-            landmarks.landmark[12].y > landmarks.landmark[10].y and
-            landmarks.landmark[16].y > landmarks.landmark[14].y and
-            landmarks.landmark[20].y > landmarks.landmark[18].y)
-
-def is_v_sign(landmarks):
-    return [landmarks.landmark[8].y < landmarks.landmark[6].y,
-            landmarks.landmark[12].y < landmarks.landmark[10].y,
-            landmarks.landmark[16].y > landmarks.landmark[14].y,
-            landmarks.landmark[20].y > landmarks.landmark[18].y] == [True]*4
-
-def is_little_finger(landmarks):
-    return (landmarks.landmark[20].y < landmarks.landmark[18].y and
-            landmarks.landmark[8].y > landmarks.landmark[6].y and
-            landmarks.landmark[12].y > landmarks.landmark[10].y and
-            landmarks.landmark[16].y > landmarks.landmark[14].y)
+# 'seek' jumps between keyframes (<video>_keyframes.json) when samples are more than a GOP apart, e.g. <= 1 fps
+frame_source = 'opencv'  # 'ffmpeg' decimates, scales and converts to RGB inside an ffmpeg process
+detection_workers = 1  # >1 spreads every chapter's time shards over one shared process pool
+pipeline_queue_depth = 0  # >0 overlaps decode, inference and classification in threads
+pipeline_inference_workers = 1
+# Inference preprocessing, see inference_preprocess.InferencePreprocessor
+inference_preprocess = None  # e.g. {'target_width': 960, 'roi': (0.3, 0.2, 0.7, 1.0), 'auto_roi': True}
+adaptive_coarse_fps = 0  # >0 scans at this rate first, then samples densely only around hands
+# Skip hands.process on unchanged frames (serial and process-pool detection only)
+motion_gating = None  # e.g. {'region': (0.3, 0.2, 0.7, 1.0), 'threshold': 4.0, 'max_skip_seconds': 1.0}
+# Hand inference only around referee whistles in the audio (per-file serial detection; before/after in seconds)
+whistle_gating = None  # e.g. {'before': 10, 'after': 20}; 'whistle_only': True makes each whistle an event instead
+use_landmark_cache = False  # store landmarks next to each video and rebuild _scores.csv from them when valid
+highlight_renderer = 'moviepy'  # 'ffmpeg' renders each reel as one ffmpeg filter graph, no Python per frame
+split_formats = ('square',)  # segment_split.OUTPUT_FORMATS to cut, all from one decode; e.g. ('square', 'mobile')
+segment_length = 7.0  # seconds per split clip
+# Chapters of a stage that may run at once; detection shares the per-process hands, so keep it at 1
+stage_limits = {'detect': 1, 'render': 1, 'split': 1, 'upload': 2}
+highlight_settings = {'highlight_duration': 7, 'include_overlays': False, 'slow_motion_factor': 1}
+incremental_build = True  # skip steps whose inputs and settings match highlights_manifest.json from a previous run
+metrics_report = 'run_metrics.json'  # counters, latency histograms and the stage schedule of the run
+metrics_textfile = None  # e.g. '/var/lib/node_exporter/textfile_collector/highlights.prom'
+join_chapters = False  # detect and cut each GoPro session's chapters as one timeline, across chapter boundaries
+stream_render = False  # cut each chapter's reel from its event log while detection is still running
+upload_settings = {'chunk_size': 8 * 1024 * 1024, 'max_retries': 8}  # chunk_size: a multiple of 256 KiB
+upload_split_clips = False  # upload each chapter's split clips while later chapters render; every upload costs quota
 
 # === Video Processor ===
+def detection_settings():
+    """cache_settings for the detection path process_video takes with the current config."""
+    coarse_fps = 0 if whistle_gating else adaptive_coarse_fps
+    use_pipeline = pipeline_queue_depth > 0 and not coarse_fps and not whistle_gating
+    hands_settings = pipeline_hands_settings(pipeline_inference_workers) if use_pipeline else HANDS_SETTINGS
+    gated = motion_gating and not (use_pipeline or coarse_fps)
+    source = 'opencv' if coarse_fps and frame_source == 'ffmpeg' else frame_source
+    settings = cache_settings(fps_reduction_factor, inference_preprocess, hands_settings, coarse_fps,
+                              motion_gating if gated else None, source)
+    return {**settings, 'whistle_gating': whistle_gating} if whistle_gating else settings
+
 def process_video(input_file):
+    # Whistle gating takes the serial path; adaptive sampling and the pipeline are off with it
+    whistle_gate = make_whistle_gate(whistle_gating)
+    coarse_fps = 0 if whistle_gate else adaptive_coarse_fps
+    use_pipeline = pipeline_queue_depth > 0 and not coarse_fps and not whistle_gate
+    gate = make_gate(motion_gating) if not (use_pipeline or coarse_fps) else None
+    source = 'opencv' if coarse_fps and frame_source == 'ffmpeg' else frame_source
+    settings = detection_settings()
     cap = cv2.VideoCapture(input_file)
     fps = cap.get(cv2.CAP_PROP_FPS)
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    reduced_fps = fps / fps_reduction_factor
-    frame_interval = int(fps / reduced_fps)
-
-    index_finger_count = v_sign_count = little_finger_count = 0
-    gesture_cooldown = datetime.min
-    cooldown_duration = timedelta(seconds=5)
-    required_duration = 0.1
-    states = {'index': [False, None], 'v': [False, None], 'little': [False, None]}
-    score_events = []
-
-    with tqdm(total=frame_count, desc=f"Processing {os.path.basename(input_file)}") as pbar:
-        while cap.isOpened():
-            success, image = cap.read()
-            if not success:
-                break
-            frame_number = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
-            pbar.update(1)
-            if frame_number % frame_interval != 0:
-                continue
-
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = hands.process(image_rgb)
-            timestamp = frame_number / fps
-            event_time = datetime(1, 1, 1) + timedelta(seconds=timestamp)
-            formatted_time = event_time.strftime('%H:%M:%S')
-
-            if results.multi_hand_landmarks and datetime.now() > gesture_cooldown:
-                for landmarks in results.multi_hand_landmarks:
-                    if is_index_finger(landmarks):
-                        if not states['index'][0]:
-                            states['index'] = [True, timestamp]
-                        elif timestamp - states['index'][1] >= required_duration:
-                            index_finger_count += 1
-                            score_events.append([formatted_time, 1, 0, 0])
-                            states['index'] = [False, None]
-                            gesture_cooldown = datetime.now() + cooldown_duration
-                    else:
-                        states['index'] = [False, None]
-
-                    if is_v_sign(landmarks):
-                        if not states['v'][0]:
-                            states['v'] = [True, timestamp]
-                        elif timestamp - states['v'][1] >= required_duration:
-                            v_sign_count += 1
-                            score_events.append([formatted_time, 0, 1, 0])
-                            states['v'] = [False, None]
-                            gesture_cooldown = datetime.now() + cooldown_duration
-                    else:
-                        states['v'] = [False, None]
-
-                    if is_little_finger(landmarks):
-                        if not states['little'][0]:
-                            states['little'] = [True, timestamp]
-                        elif timestamp - states['little'][1] >= required_duration:
-                            little_finger_count += 1
-                            score_events.append([formatted_time, 0, 0, 1])
-                            states['little'] = [False, None]
-                            gesture_cooldown = datetime.now() + cooldown_duration
-                    else:
-                        states['little'] = [False, None]
-
     cap.release()
-    output_csv = input_file.rsplit('.', 1)[0] + '_scores.csv'
-    with open(output_csv, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([input_file])
-        writer.writerow(['Timestamp', team_one, team_two, 'Highlights'])
-        writer.writerow(['Starting Scores', starting_score_one, starting_score_two, 0])
-        writer.writerows(score_events)
+    # Events are appended to the log as they fire; the _scores.csv is exported from it at the end
+    event_log = EventLogWriter(event_log_path(input_file), input_file, team_one, team_two,
+                               starting_score_one, starting_score_two, fps)
+
+    if use_landmark_cache:
+        cached = load_landmark_cache(input_file, settings)
+        if cached is not None:
+            print(f"Replaying cached landmarks for {os.path.basename(input_file)}")
+            replay_events(*cached, event_log=event_log)
+            event_log.close()
+            return export_scores_csv(event_log.path)
+
+    try:
+        whistles = whistle_gate.scan(input_file) if whistle_gate else None
+    except BaseException as e:
+        event_log.abort(repr(e))
+        raise
+    if whistle_gate and whistles is None:
+        print(f"No audio in {os.path.basename(input_file)}, running hand inference over all of it")
+    whistle_only = whistles is not None and whistle_gate.whistle_only
+    windows = None
+    if whistles is not None and not whistle_only:
+        windows = [(int(start * fps), int(end * fps))
+                   for start, end in whistle_gate.windows(whistles, frame_count / fps)]
+    cache_writer = (LandmarkCacheWriter(input_file, settings, fps, windows)
+                    if use_landmark_cache and not whistle_only else None)
+    try:
+        with tqdm(total=frame_count, desc=f"Processing {os.path.basename(input_file)}") as pbar:
+            progress = ThrottledProgress(pbar.update)
+            if whistle_only:
+                score_events = whistle_events(whistles, fps, cooldown_duration, event_log=event_log)
+                event_log.advance(frame_count / fps)
+                progress(frame_count)
+            elif windows is not None:
+                score_events = detect_windows(input_file, fps_reduction_factor, windows, progress=progress,
+                                              preprocess=inference_preprocess, cache_writer=cache_writer, gate=gate,
+                                              frame_source=source, event_log=event_log)
+            elif coarse_fps > 0:
+                score_events, adaptive_stats = detect_adaptive(input_file, fps_reduction_factor, adaptive_coarse_fps,
+                                                               progress=progress,
+                                                               preprocess=inference_preprocess,
+                                                               cache_writer=cache_writer, event_log=event_log,
+                                                               frame_source=source)
+            elif use_pipeline:
+                score_events, report = detect_range_pipelined(input_file, fps_reduction_factor,
+                                                              queue_depth=pipeline_queue_depth,
+                                                              inference_workers=pipeline_inference_workers,
+                                                              progress=progress,
+                                                              preprocess=inference_preprocess,
+                                                              cache_writer=cache_writer, frame_source=source,
+                                                              event_log=event_log)
+            else:
+                score_events = detect_range(input_file, fps_reduction_factor, progress=progress,
+                                            preprocess=inference_preprocess, cache_writer=cache_writer, gate=gate,
+                                            frame_source=source, event_log=event_log)
+            progress.flush()
+    except BaseException as e:
+        if cache_writer:
+            cache_writer.abort()
+        event_log.abort(repr(e))
+        raise
+    if cache_writer:
+        cache_writer.close()
+    event_log.close()
+    if whistles is not None:
+        print_whistle_report(os.path.basename(input_file), whistles,
+                             [] if whistle_only else whistle_gate.windows(whistles, frame_count / fps),
+                             frame_count / fps)
+    if coarse_fps > 0:
+        print_adaptive_stats(os.path.basename(input_file), adaptive_stats)
+    elif use_pipeline:
+        print(f"Pipeline stages for {os.path.basename(input_file)}:")
+        print_stage_report(report)
+    elif gate and not whistle_only:
+        print_gate_counts(os.path.basename(input_file), gate.counts())
+    return export_scores_csv(event_log.path)
+
+def session_event_log_path(chapters):
+    return event_log_path(chapters[0]).replace('_events.ndjson', '_session_events.ndjson')
+
+def process_session(chapters):
+    """process_video for a whole session: one continuous detection over all its chapters.
+
+    Writes <first chapter>_session_events.ndjson and the matching
+    _session_scores.csv, with session timestamps and every chapter listed. Uses the plain detection path (with
+    the motion gate, if set); the pipelined, adaptive, parallel and
+    landmark-cache paths work per file.
+    """
+    timeline = SessionTimeline(chapters)
+    gate = make_gate(motion_gating)
+    name = os.path.basename(session_event_log_path(chapters)).replace('_events.ndjson', '')
+    event_log = EventLogWriter(session_event_log_path(chapters), chapters, team_one, team_two,
+                               starting_score_one, starting_score_two, timeline.fps)
+    try:
+        with tqdm(total=timeline.frame_count, desc=f"Processing {name} ({len(chapters)} chapters)") as pbar:
+            progress = ThrottledProgress(pbar.update)
+            detect_session(timeline, fps_reduction_factor, progress=progress,
+                           preprocess=inference_preprocess, gate=gate, frame_source=frame_source,
+                           event_log=event_log)
+            progress.flush()
+    except BaseException as e:
+        event_log.abort(repr(e))
+        raise
+    event_log.close()
+    if gate:
+        print_gate_counts(name, gate.counts())
+    return export_scores_csv(event_log.path)
 
 # === Highlight Video Generation ===
 def draw_text_with_background(image, text, font, scale, color, thickness, bg_color, x_offset, y_offset, padding=10):
@@ -170,59 +259,226 @@ def get_team_colors(name, default_bg, default_fg):
             return colors[c]
     return default_bg, default_fg
 
-def create_highlight_video(score_csv_file, highlight_duration=7, include_overlays=False, slow_motion_factor=1):
-    with open(score_csv_file) as f:
-        reader = csv.reader(f)
-        input_file = next(reader)[0]
-        _, team_one, team_two, _ = next(reader)
-        _, start1, start2, _ = next(reader)
-        events = [(datetime.strptime(r[0], '%H:%M:%S'), int(r[1]), int(r[2]), int(r[3])) for r in reader]
-
+def create_highlight_video(score_csv_file, highlight_duration=7, include_overlays=False, slow_motion_factor=1,
+                           smart_cut_enabled=True, renderer='moviepy'):
+    input_file, team_one, team_two, start1, start2, events = read_highlight_events(score_csv_file)
     if not events:
         return None
-
-    start1, start2 = int(start1), int(start2)
-    cur1, cur2 = start1, start2
-    clips, team1_bg, team1_fg = [], *get_team_colors(team_one, (255, 255, 0), (0, 0, 0))
+    # A session CSV lists all its chapters; its times and windows are on the session timeline
+    inputs = read_score_inputs(score_csv_file)
+    timeline = SessionTimeline(inputs) if len(inputs) > 1 else None
+
+    output_file = highlights_path(score_csv_file)
+    windows = coalesce_windows(events, highlight_duration)
+    started = time.perf_counter()
+
+    def finished(used):
+        elapsed = time.perf_counter() - started
+        metrics.observe('render_seconds', elapsed, renderer=used)
+        metrics.record('clip_renders', clip=os.path.basename(output_file), renderer=used, seconds=round(elapsed, 3),
+                       windows=len(windows), footage_seconds=sum(end - start for start, end in windows))
+        return output_file
+
+    # Plain cuts only need the edge GOPs re-encoded
+    if smart_cut_enabled and not include_overlays and slow_motion_factor == 1:
+        try:
+            copied, encoded = smart_cut(input_file, windows, output_file, timeline=timeline)
+            print(f"Smart cut {output_file}: {copied:.1f}s stream-copied, {encoded:.1f}s re-encoded")
+            return finished('smart_cut')
+        except (subprocess.CalledProcessError, ValueError) as e:
+            print(f"Smart cut failed for {input_file} ({e}); rendering with {renderer}")
+
+    scores = ScoreTimeline(events, start1, start2)
+    team1_bg, team1_fg = get_team_colors(team_one, (255, 255, 0), (0, 0, 0))
     team2_bg, team2_fg = get_team_colors(team_two, (0, 0, 255), (255, 255, 255))
 
-    for t, s1, s2, _ in events:
-        t_sec = t.hour * 3600 + t.minute * 60 + t.second
-        start = max(0, t_sec - highlight_duration)
-        clip = VideoFileClip(input_file).subclip(start, t_sec).fx(vfx.speedx, 1 / slow_motion_factor)
+    if renderer == 'ffmpeg':
+        render_highlights_ffmpeg(input_file, windows, output_file, scores if include_overlays else None,
+                                 team_one, team_two, (team1_bg, team1_fg), (team2_bg, team2_fg), slow_motion_factor,
+                                 timeline=timeline)
+        return finished('ffmpeg')
+
+    def overlay(img, t):
+        cur1, cur2 = scores.at(t)
+        return draw_scoreboard(img, team_one, cur1, team_two, cur2, (team1_bg, team1_fg), (team2_bg, team2_fg))
+
+    from moviepy.editor import VideoFileClip, concatenate_videoclips, vfx
+    # One reader per file, chained for a session; windows are read in order, so it only ever seeks forward.
+    readers = [VideoFileClip(path) for path in inputs]
+    source = concatenate_videoclips(readers) if timeline else readers[0]
+    clips = []
+    for start, end in windows:
+        clip = source.subclip(start, end)
         if include_overlays:
-            clip = clip.fl_image(lambda img: draw_text_with_background(
-                draw_text_with_background(img, f'{team_one}: {cur1}', cv2.FONT_HERSHEY_SIMPLEX, 1, team1_fg, 2, team1_bg, 0, 50),
-                f'{team_two}: {cur2}', cv2.FONT_HERSHEY_SIMPLEX, 1, team2_fg, 2, team2_bg, 0, 100
-            ))
-        clips.append(clip)
-        cur1 += s1
-        cur2 += s2
+            clip = clip.fl(lambda gf, t, start=start: overlay(gf(t), start + t))
+        clips.append(clip.fx(vfx.speedx, 1 / slow_motion_factor))
 
     final = concatenate_videoclips(clips)
-    output_file = score_csv_file.replace('_scores.csv', '_highlights.mp4')
     final.write_videofile(output_file, codec='libx264', audio_codec='aac')
+    for reader in readers:
+        reader.close()
+    return finished('moviepy')
+
+def stream_highlight_video(log_path, highlight_duration=7, include_overlays=False, slow_motion_factor=1,
+                           smart_cut_enabled=True, is_alive=None):
+    """create_highlight_video for an event log that detection is still appending to.
+
+    A window is cut once detection is more than highlight_duration past
+    its end, when no later event can extend it any more, and the pieces
+    are joined when the log ends. Pieces are smart-cut, or rendered with
+    the ffmpeg renderer for overlays and slow motion; is_alive is passed
+    to tail_event_log.
+    """
+    output_file = highlights_path(log_path)
+    events, pieces = [], []
+    piece_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_file)))
+
+    def cut(window, path):
+        if smart_cut_enabled and not include_overlays and slow_motion_factor == 1:
+            try:
+                smart_cut(input_file, [window], path, timeline=timeline)
+                return
+            except (subprocess.CalledProcessError, ValueError) as e:
+                print(f"Smart cut failed for {input_file} ({e}); rendering with ffmpeg")
+        team1_colors = get_team_colors(team_one, (255, 255, 0), (0, 0, 0))
+        team2_colors = get_team_colors(team_two, (0, 0, 255), (255, 255, 255))
+        scores = ScoreTimeline(events, start1, start2) if include_overlays else None
+        render_highlights_ffmpeg(input_file, [window], path, scores, team_one, team_two, team1_colors, team2_colors,
+                                 slow_motion_factor, timeline=timeline)
+
+    try:
+        for record in tail_event_log(log_path, is_alive=is_alive):
+            if record['type'] == 'header':
+                inputs = record['inputs']
+                input_file = inputs[0]
+                timeline = SessionTimeline(inputs) if len(inputs) > 1 else None
+                team_one, team_two = record['teams']
+                start1, start2 = record['starting_scores']
+                continue
+            if record['type'] == 'event':
+                events.append((record['t_ms'] / 1000, *record['columns']))
+            reached = float('inf') if record['type'] == 'end' else record['t_ms'] / 1000
+            windows = coalesce_windows(events, highlight_duration)
+            while len(pieces) < len(windows) and windows[len(pieces)][1] + highlight_duration < reached:
+                path = os.path.join(piece_dir, f'{len(pieces):03d}.mp4')
+                cut(windows[len(pieces)], path)
+                print(f"Cut highlight {len(pieces) + 1} of {os.path.basename(output_file)}")
+                pieces.append(path)
+        if not pieces:
+            return None
+        concat_highlights(pieces, output_file)
+    finally:
+        shutil.rmtree(piece_dir)
     return output_file
 
 def split_video(video_path, segment_length=7):
-    file_name, ext = os.path.splitext(os.path.basename(video_path))
-    output_dir = f"{file_name}_clips"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    command_square = [
-        'ffmpeg', '-i', video_path, '-vf', 'crop=ih:ih', '-force_key_frames', f"expr:gte(t,n_forced*{segment_length})",
-        '-c:v', 'libx264', '-c:a', 'copy', '-map', '0', '-f', 'segment', 
-        '-segment_time', str(segment_length), '-reset_timestamps', '1',
-        f"{output_dir}/{file_name}_square_%03d{ext}"
-    ]
-    
-    subprocess.run(command_square, check=True)
+    return split_segments(video_path, segment_length, split_formats, parallel_splits=stage_limits['split'])
+
+# === Session Stages ===
+# Each stage goes through the build manifest, so a rerun skips whatever is still up to date.
+def render_settings(renderer=None):
+    return {**highlight_settings, 'renderer': renderer or highlight_renderer}
+
+def detect_streaming(manifest, detect, log_path):
+    """Run detect() with the reel cut from the event log it writes, as the events come in.
+
+    The finished reel is recorded as the render step of the exported CSV
+    with renderer 'stream' (smart cut, the ffmpeg renderer for overlays),
+    so the render stage finds it up to date while stream_render is on. If
+    the streamed cut fails, the render stage does the job as usual.
+    """
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    detecting = threading.Event()
+    detecting.set()
+    streamed = {}
+
+    def render():
+        try:
+            streamed['path'] = stream_highlight_video(log_path, is_alive=detecting.is_set, **highlight_settings)
+        except Exception as e:
+            print(f"Streaming render of {os.path.basename(log_path)} failed ({e!r}); rendering after detection")
+
+    thread = threading.Thread(target=render)
+    thread.start()
+    try:
+        csv_file = detect()
+    finally:
+        detecting.clear()
+        thread.join()
+    if 'path' in streamed and manifest.enabled:
+        manifest.record(f"render {os.path.basename(csv_file)}", [csv_file, *read_score_inputs(csv_file)],
+                        render_settings('stream'), streamed['path'])
+    return csv_file
+
+def detect_chapter(manifest, input_file):
+    params = {**detection_settings(), 'cooldown_duration': cooldown_duration,
+              'required_duration': required_duration, 'gestures': GESTURE_TABLE,
+              'teams': [team_one, team_two, starting_score_one, starting_score_two]}
+    if detection_workers > 1 and not whistle_gating:
+        detect = lambda: process_videos_parallel([input_file], fps_reduction_factor, team_one, team_two,
+                                                 starting_score_one, starting_score_two,
+                                                 max_workers=detection_workers, preprocess=inference_preprocess,
+                                                 motion_gating=motion_gating, frame_source=frame_source)[0]
+    else:
+        detect = lambda: process_video(input_file)
+    if stream_render:
+        detect = partial(detect_streaming, manifest, detect, event_log_path(input_file))
+    # The _scores.csv is reviewed and corrected by hand; an edit must not count as a stale output
+    return manifest.step(f"detect {os.path.basename(input_file)}", [input_file], params, detect, editable=True)
+
+def detect_session_chapters(manifest, chapters):
+    params = {**cache_settings(fps_reduction_factor, inference_preprocess, HANDS_SETTINGS,
+                               motion_gating=motion_gating, frame_source=frame_source),
+              'cooldown_duration': cooldown_duration, 'required_duration': required_duration,
+              'gestures': GESTURE_TABLE, 'teams': [team_one, team_two, starting_score_one, starting_score_two]}
+    detect = lambda: process_session(chapters)
+    if stream_render:
+        detect = partial(detect_streaming, manifest, detect, session_event_log_path(chapters))
+    return manifest.step(f"detect session {os.path.basename(chapters[0])}", chapters, params, detect,
+                         editable=True)
+
+def render_chapter(manifest, csv_file):
+    # Cut from the millisecond event log unless the CSV has been corrected by hand
+    source = precise_events_file(csv_file)
+    name, inputs = f"render {os.path.basename(csv_file)}", [csv_file, *read_score_inputs(csv_file)]
+    if stream_render and manifest.enabled and manifest.is_current(name, inputs, render_settings('stream')):
+        print(f"Up to date: {name} (cut while detecting)")
+        return manifest.steps[name]['result']
+    return manifest.step(name, inputs, render_settings(),
+                         lambda: create_highlight_video(source, renderer=highlight_renderer, **highlight_settings))
+
+def split_chapter(manifest, highlight_path):
+    if highlight_path is None:
+        return None
+    length = float(segment_length)
+    return manifest.step(f"split {os.path.basename(highlight_path)}", [highlight_path],
+                         {'segment_length': length, 'formats': split_formats},
+                         lambda: split_video(highlight_path, length))
+
+def combine_highlights(manifest, *highlight_paths):
+    highlight_paths = [p for p in highlight_paths if p]
+    if not highlight_paths:
+        return None
+    return manifest.step('combine', highlight_paths, {}, lambda: combine_videos(highlight_paths))
+
+def combine_videos(highlight_paths):
+    final_path = "combined_highlights.mp4"
+    try:
+        copied, reencoded = concat_highlights(highlight_paths, final_path)
+        print(f"Joined {copied} highlight videos by stream copy, re-encoded {reencoded}")
+    except (subprocess.CalledProcessError, ValueError) as e:
+        print(f"Lossless concat failed ({e}); re-encoding the combined video")
+        from moviepy.editor import VideoFileClip, concatenate_videoclips
+        final_clip = concatenate_videoclips([VideoFileClip(p) for p in highlight_paths])
+        final_clip.write_videofile(final_path, codec='libx264', audio_codec='aac')
+    return final_path
 
 # === ADDED FOR YOUTUBE UPLOAD ===
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 CREDENTIALS_PICKLE = "youtube_credentials.pkl"
 
-def authenticate_youtube():
+def load_youtube_credentials():
     client_secrets = os.getenv("YOUTUBE_CLIENT_SECRET_FILE")
     if not client_secrets or not os.path.exists(client_secrets):
         raise FileNotFoundError("Missing or invalid YOUTUBE_CLIENT_SECRET_FILE env variable")
@@ -230,15 +486,25 @@ def authenticate_youtube():
         with open(CREDENTIALS_PICKLE, "rb") as f:
             credentials = pickle.load(f)
     else:
+        from google_auth_oauthlib.flow import InstalledAppFlow
         flow = InstalledAppFlow.from_client_secrets_file(client_secrets, SCOPES)
         credentials = flow.run_console()
         with open(CREDENTIALS_PICKLE, "wb") as f:
             pickle.dump(credentials, f)
-    return build("youtube", "v3", credentials=credentials)
+    return credentials
+
+def authenticate_youtube():
+    from googleapiclient.discovery import build
+    return build("youtube", "v3", credentials=load_youtube_credentials())
+
+def upload_video_to_youtube(file_path, title, description, privacy="public", transport=None):
+    """Resumable chunked upload (see youtube_upload.ResumableUpload); returns the video ID.
 
-def upload_video_to_youtube(file_path, title, description, privacy="public"):
-    youtube = authenticate_youtube()
-    media = MediaFileUpload(file_path, chunksize=-1, resumable=True)
+    An interrupted upload of the same file and metadata resumes where it
+    stopped, also on a later run. transport defaults to an OAuth one from
+    the saved credentials; each call makes its own, so uploads can run
+    in parallel.
+    """
     request_body = {
         "snippet": {
             "title": title,
@@ -250,18 +516,69 @@ def upload_video_to_youtube(file_path, title, description, privacy="public"):
             "privacyStatus": privacy
         }
     }
+    from youtube_upload import ResumableUpload, youtube_transport
     print(f"📤 Uploading {file_path} to YouTube...")
-    request = youtube.videos().insert(
-        part="snippet,status",
-        body=request_body,
-        media_body=media
-    )
-    response = None
-    while response is None:
-        status, response = request.next_chunk()
-        if status:
-            print(f"Uploading... {int(status.progress() * 100)}%")
+    name = os.path.basename(file_path)
+    upload = ResumableUpload(transport or youtube_transport(load_youtube_credentials()), file_path, request_body,
+                             progress=lambda sent, total: print(f"Uploading {name}... {int(sent / total * 100)}%"),
+                             **upload_settings)
+    response = upload.run()
     print(f"✅ Upload complete. Video ID: {response['id']}")
+    return response['id']
+
+def probe_creation_time(path):
+    """The creation_time tag of path's container (GoPro sets it when recording), or None."""
+    command = ['ffprobe', '-v', 'error', '-show_entries', 'format_tags=creation_time', '-of', 'csv=p=0', path]
+    probe = metrics.run_subprocess('probe', command, capture_output=True, text=True)
+    try:
+        return datetime.fromisoformat(probe.stdout.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+def recording_date(path):
+    """The day the footage in path was recorded, for upload titles.
+
+    Taken from the chapter path was cut from (GX011291_highlights.mp4 and
+    its clips are named after it), or the first chapter next to path: its
+    creation_time, else its modification time. Without a chapter to go
+    by, path's own modification time.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    named = re.match(r'GX\d{6}', os.path.basename(path))
+    source = path
+    # Clips are in a folder next to the chapters
+    for chapter_dir in (folder, os.path.dirname(folder)):
+        chapters = [f for f in find_videos(chapter_dir) if not named or os.path.splitext(f)[0] == named.group(0)]
+        if chapters:
+            source = os.path.join(chapter_dir, chapters[0])
+            break
+    created = probe_creation_time(source) if source != path else None
+    return (created or datetime.fromtimestamp(os.path.getmtime(source))).date()
+
+def upload_highlights(manifest, final_path):
+    if final_path is None:
+        print("No highlight videos generated; skipping upload.")
+        return None
+    date_str = recording_date(final_path).strftime("%b %d")
+    title = f"{date_str} - Highlights"
+    description = f"Highlights of the game played in Pune on {date_str} by local Pune footballers."
+    # Recorded in the build manifest under the file's fingerprint, so a rerun doesn't upload the same video twice
+    return manifest.step(f"upload {os.path.basename(final_path)}", [final_path], {},
+                         lambda: upload_video_to_youtube(final_path, title, description))
+
+def upload_clips(manifest, clips_dir):
+    if clips_dir is None:
+        return None
+    video_ids = []
+    # The folder can also hold <clip>.upload.json state from an interrupted upload
+    for clip in sorted(c for c in os.listdir(clips_dir) if c.lower().endswith('.mp4')):
+        clip_path = os.path.join(clips_dir, clip)
+        date_str = recording_date(clip_path).strftime("%b %d")
+        title = f"{date_str} - {os.path.splitext(clip)[0]}"
+        description = f"A highlight from the game played in Pune on {date_str}."
+        video_ids.append(manifest.step(f"upload {clip}", [clip_path], {},
+                                       lambda: upload_video_to_youtube(clip_path, title, description)))
+    return video_ids
 
 def ensure_youtube_credentials_valid():
     """Ensure valid YouTube credentials exist; refresh or regenerate if necessary."""
@@ -283,79 +600,91 @@ def ensure_youtube_credentials_valid():
 
 # === END SECTION ===
 
-# # === MAIN EXECUTION ===
-# input_dir = os.getcwd()
-
-# # Step 1: Get and sort video files
-# video_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.mp4')]
-# video_files = sort_gopro_filenames(video_files)
-# print("Sorted video files:", video_files)
-
-# # # Step 2: Process each video
-# for file in video_files:
-#     process_video(os.path.join(input_dir, file))
-
-# # Step 3: Find and sort score CSVs (based on matching video name)
-# csv_files = [f for f in os.listdir(input_dir) if f.endswith('_scores.csv')]
-# csv_files = sort_gopro_score_csvs(csv_files)
-# print("Sorted CSV files:", csv_files)
-
-# # Step 4: Generate and combine highlight videos
-# highlight_paths = []
-# for csv_file in csv_files:
-#     highlight_path = create_highlight_video(os.path.join(input_dir, csv_file))
-#     split_video(highlight_path)
-#     highlight_paths.append(highlight_path)
-
-# # # Optional: Combine the original (unsplit) highlight videos if needed
-# final_clip = concatenate_videoclips([VideoFileClip(p) for p in highlight_paths])
-# final_path = "combined_highlights.mp4"  # ✅ define this first
-# final_clip.write_videofile("combined_highlights.mp4", codec='libx264', audio_codec='aac')
-# # === ADDED FOR YOUTUBE UPLOAD ===
-# today_str = datetime.now().strftime("%b %d")
-# title = f"{today_str} - Highlights"
-# description = f"Highlights of the game played in Pune on {today_str} by local Pune footballers."
-# upload_video_to_youtube(final_path, title, description)
-# # === END SECTION ===
-# === MAIN EXECUTION ===
-input_dir = os.getcwd()
-
-# Step 0: Validate YouTube credentials before doing anything else
-youtube = ensure_youtube_credentials_valid()
+# === Runs ===
+# Shared by the __main__ block below and the subcommands in cli.py
+def find_videos(input_dir):
+    """The GoPro chapters (GX011291.mp4, ...) in input_dir, in recording order; our own outputs are left out."""
+    return sort_gopro_filenames([f for f in os.listdir(input_dir)
+                                 if f.lower().endswith('.mp4') and re.fullmatch(r'GX\d{6}', os.path.splitext(f)[0])])
+
+def find_outputs(input_dir, suffix):
+    """<chapter><suffix> files in input_dir, e.g. GX011291_scores.csv, in recording order.
+
+    With join_chapters, the session files (<first chapter>_session<suffix>) instead.
+    """
+    pattern = re.compile(r'(GX\d{6})' + ('_session' if join_chapters else '') + re.escape(suffix))
+    found = {m.group(1) + '.mp4': m.group(0) for m in map(pattern.fullmatch, os.listdir(input_dir)) if m}
+    return [found[name] for name in sort_gopro_filenames(found)]
+
+def open_manifest(input_dir):
+    return BuildManifest(os.path.join(input_dir, MANIFEST_NAME), enabled=incremental_build)
+
+def detection_units(manifest, input_dir, video_files):
+    """(name, detect) for each chapter, or each session with join_chapters; detect() returns its _scores.csv."""
+    if join_chapters:
+        # One detect/render/split chain per session, named after its first chapter
+        return [(chapters[0], partial(detect_session_chapters, manifest,
+                                      [os.path.join(input_dir, f) for f in chapters]))
+                for chapters in group_gopro_sessions(video_files)]
+    return [(file, partial(detect_chapter, manifest, os.path.join(input_dir, file))) for file in video_files]
+
+def run_stage_limits():
+    """stage_limits for this run: with a shard pool, every chapter's detection can wait on it at once."""
+    if detection_workers > 1 and not whistle_gating and not join_chapters:
+        return {**stage_limits, 'detect': max(stage_limits['detect'], detection_workers)}
+    return stage_limits
+
+def detect_all(manifest, input_dir, video_files):
+    """Run detection_units with run_stage_limits(); {name: _scores.csv}."""
+    scheduler = StageScheduler(run_stage_limits())
+    for name, detect in detection_units(manifest, input_dir, video_files):
+        scheduler.add(name, 'detect', detect)
+    results, _ = scheduler.run()
+    if scheduler.errors:
+        raise scheduler.errors[0]
+    return results
+
+def write_run_metrics(**extra):
+    metrics.write_json(metrics_report, **extra)
+    if metrics_textfile:
+        metrics.write_prometheus(metrics_textfile)
+
+def run_all(input_dir, video_files, upload=True):
+    """Detect, render and split each chapter, combine the reels and upload the result.
+
+    A chapter is rendered as soon as its _scores.csv exists while the
+    next one is still being detected; the reels are combined once all are
+    rendered, and uploaded as soon as the combined video exists.
+    """
+    manifest = open_manifest(input_dir)
+    scheduler = StageScheduler(run_stage_limits())
+    renders = []
+    for file, detect_fn in detection_units(manifest, input_dir, video_files):
+        detect = scheduler.add(f"detect {file}", 'detect', detect_fn)
+        render = scheduler.add(f"render {file}", 'render', partial(render_chapter, manifest), [detect])
+        split = scheduler.add(f"split {file}", 'split', partial(split_chapter, manifest), [render])
+        if upload and upload_split_clips:
+            scheduler.add(f"upload {file} clips", 'upload', partial(upload_clips, manifest), [split])
+        renders.append(render)
+    combine = scheduler.add('combine', 'combine', partial(combine_highlights, manifest), renders)
+    if upload:
+        scheduler.add('upload', 'upload', partial(upload_highlights, manifest), [combine])
+    results, report = scheduler.run()
+    print_schedule_report(report)
+    write_run_metrics(schedule=report)
+    if scheduler.errors:
+        raise scheduler.errors[0]
 
-# Step 1: Get and sort video files
-video_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.mp4')]
-video_files = sort_gopro_filenames(video_files)
-print("Sorted video files:", video_files)
-
-# Step 2: Process each video
-for file in video_files:
-    process_video(os.path.join(input_dir, file))
+# === MAIN EXECUTION ===
+if __name__ == '__main__':
+    input_dir = os.getcwd()
 
-# Step 3: Find and sort score CSVs
-csv_files = [f for f in os.listdir(input_dir) if f.endswith('_scores.csv')]
-csv_files = sort_gopro_score_csvs(csv_files)
-print("Sorted CSV files:", csv_files)
+    # Step 0: Validate YouTube credentials before doing anything else
+    youtube = ensure_youtube_credentials_valid()
 
-# Step 4: Generate and combine highlight videos
-highlight_paths = []
-for csv_file in csv_files:
-    highlight_path = create_highlight_video(os.path.join(input_dir, csv_file))
-    if highlight_path is None:
-        continue
-    split_video(highlight_path)
-    highlight_paths.append(highlight_path)
+    # Step 1: Get and sort video files
+    video_files = find_videos(input_dir)
+    print("Sorted video files:", video_files)
 
-# Step 5: Combine highlights
-if highlight_paths:
-    final_clip = concatenate_videoclips([VideoFileClip(p) for p in highlight_paths])
-    final_path = "combined_highlights.mp4"
-    final_clip.write_videofile(final_path, codec='libx264', audio_codec='aac')
-
-    # Step 6: Upload to YouTube
-    today_str = datetime.now().strftime("%b %d")
-    title = f"{today_str} - Highlights"
-    description = f"Highlights of the game played in Pune on {today_str} by local Pune footballers."
-    upload_video_to_youtube(final_path, title, description)
-else:
-    print("No highlight videos generated; skipping combination and upload.")
+    # Steps 2-6: detect, render, split, combine and upload, overlapping the stages
+    run_all(input_dir, video_files)
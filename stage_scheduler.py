@@ -0,0 +1,130 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# === Stage Scheduler ===
+class StageScheduler:
+    """Run a DAG of tasks, each as soon as its dependencies are done.
+
+    Every task belongs to a stage ('detect', 'render', ...); limits caps
+    how many tasks of a stage run at once, so the CPU-heavy stages don't
+    oversubscribe the machine. Stages missing from limits are unbounded.
+    A task's function gets its dependencies' results as positional
+    arguments, in the order the dependencies were given. Ready tasks of a
+    stage start in the order they were added.
+
+    If a task raises, everything downstream of it is skipped and the rest
+    of the graph still runs; the exceptions are collected in errors for
+    the caller to re-raise once it has reported.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(limits or {})
+        self.tasks = {}
+        self.errors = []
+
+    def add(self, name, stage, fn, deps=()):
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"Task {name!r} depends on unknown task {dep!r}")
+        self.tasks[name] = {'stage': stage, 'fn': fn, 'deps': tuple(deps), 'state': 'pending'}
+        return name
+
+    def _ready(self, task):
+        return task['state'] == 'pending' and all(self.tasks[d]['state'] == 'done' for d in task['deps'])
+
+    def _skip_dependents(self, name):
+        for other_name, other in self.tasks.items():
+            if other['state'] == 'pending' and name in other['deps']:
+                other['state'] = 'skipped'
+                self._skip_dependents(other_name)
+
+    def run(self):
+        """Run every task; returns (results by task name, report)."""
+        t0 = time.perf_counter()
+        running = {stage: 0 for stage in self.limits}
+        futures = {}
+
+        def call(task):
+            task['start'] = time.perf_counter() - t0
+            try:
+                return task['fn'](*(self.tasks[d]['result'] for d in task['deps']))
+            finally:
+                task['end'] = time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self.tasks))) as pool:
+            while True:
+                now = time.perf_counter() - t0
+                for name, task in self.tasks.items():
+                    if not self._ready(task):
+                        continue
+                    task.setdefault('ready', now)
+                    limit = self.limits.get(task['stage'])
+                    if limit is not None and running[task['stage']] >= limit:
+                        continue
+                    task['state'] = 'running'
+                    if limit is not None:
+                        running[task['stage']] += 1
+                    futures[pool.submit(call, task)] = name
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    task = self.tasks[name]
+                    if task['stage'] in running:
+                        running[task['stage']] -= 1
+                    try:
+                        task['result'] = future.result()
+                        task['state'] = 'done'
+                    except Exception as e:
+                        self.errors.append(e)
+                        task['state'] = 'failed'
+                        print(f"Task {name} failed: {e!r}")
+                        self._skip_dependents(name)
+
+        results = {name: task.get('result') for name, task in self.tasks.items()}
+        return results, self.report(time.perf_counter() - t0)
+
+    # === Reporting ===
+    def critical_path(self):
+        """The chain of tasks that determined the finish time, first to last.
+
+        Walks back from the task that finished last, each time to the
+        dependency that finished last (the one it was actually waiting for).
+        """
+        finished = {n: t for n, t in self.tasks.items() if 'end' in t}
+        if not finished:
+            return []
+        path = [max(finished, key=lambda n: finished[n]['end'])]
+        while True:
+            deps = [d for d in self.tasks[path[-1]]['deps'] if d in finished]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda d: finished[d]['end']))
+        return path[::-1]
+
+    def report(self, wall):
+        stages = {}
+        for task in self.tasks.values():
+            stats = stages.setdefault(task['stage'], {'tasks': 0, 'busy': 0.0, 'waiting': 0.0, 'skipped': 0})
+            if 'end' not in task:
+                stats['skipped'] += task['state'] == 'skipped'
+                continue
+            stats['tasks'] += 1
+            stats['busy'] += task['end'] - task['start']
+            stats['waiting'] += task['start'] - task['ready']
+        path = [(name, self.tasks[name]['stage'], round(self.tasks[name]['start'] - self.tasks[name]['ready'], 3),
+                 round(self.tasks[name]['end'] - self.tasks[name]['start'], 3)) for name in self.critical_path()]
+        return {'wall': round(wall, 3),
+                'stages': {s: {k: round(v, 3) for k, v in stats.items()} for s, stats in stages.items()},
+                'critical_path': path}
+
+def print_schedule_report(report):
+    print(f"Scheduled {sum(s['tasks'] for s in report['stages'].values())} tasks in {report['wall']:.2f}s")
+    for stage, stats in report['stages'].items():
+        print(f"  {stage:8s} tasks={stats['tasks']:<4d} busy={stats['busy']:.2f}s "
+              f"waiting for a slot={stats['waiting']:.2f}s skipped={stats['skipped']}")
+    print("  critical path:")
+    for name, stage, waiting, busy in report['critical_path']:
+        print(f"    {name:40s} {stage:8s} waited {waiting:.2f}s, ran {busy:.2f}s")
@@ -0,0 +1,16 @@
+from adaptive_sampling import dense_windows
+
+def test_window_spans_the_neighbouring_coarse_frames():
+    assert dense_windows([100], 25) == [(76, 124)]
+
+def test_adjacent_hits_merge():
+    assert dense_windows([100, 125, 150, 300], 25) == [(76, 174), (276, 324)]
+
+def test_windows_touching_end_to_start_merge():
+    assert dense_windows([100, 149], 25) == [(76, 173)]
+
+def test_window_starts_at_frame_one():
+    assert dense_windows([10], 25) == [(1, 34)]
+
+def test_no_hits_no_windows():
+    assert dense_windows([], 25) == []
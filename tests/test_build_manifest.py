@@ -0,0 +1,63 @@
+import os
+
+from build_manifest import BuildManifest
+
+def make_step(tmp_path, name='scores.csv', editable=False):
+    video = tmp_path / 'GX010001.mp4'
+    video.write_bytes(b'video' * 1000)
+    output = tmp_path / name
+    manifest = BuildManifest(str(tmp_path / 'manifest.json'))
+    calls = []
+    def build():
+        calls.append(1)
+        output.write_text('Timestamp,A,B,Highlights\n')
+        return str(output)
+    run = lambda params={'fps': 5}: manifest.step('detect', [str(video)], params, build, editable=editable)
+    return manifest, video, output, run, calls
+
+def touch_later(path, content):
+    stat = os.stat(path)
+    path.write_bytes(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+
+def test_unchanged_step_is_skipped(tmp_path):
+    manifest, video, output, run, calls = make_step(tmp_path)
+    assert run() == run() == str(output)
+    assert len(calls) == 1
+    # A new manifest reads what the last run recorded
+    assert BuildManifest(manifest.path).is_current('detect', [str(video)], {'fps': 5})
+
+def test_changed_params_input_or_output_rerun(tmp_path):
+    manifest, video, output, run, calls = make_step(tmp_path)
+    run()
+    run({'fps': 10})
+    assert len(calls) == 2
+    touch_later(video, b'other video' * 1000)
+    run({'fps': 10})
+    assert len(calls) == 3
+    touch_later(output, b'edited')
+    run({'fps': 10})
+    assert len(calls) == 4
+    output.unlink()
+    run({'fps': 10})
+    assert len(calls) == 5
+
+def test_editable_output_only_has_to_exist(tmp_path):
+    manifest, video, output, run, calls = make_step(tmp_path, editable=True)
+    run()
+    touch_later(output, b'Timestamp,A,B,Highlights\n00:01:00,1,0,0\n')
+    run()
+    assert len(calls) == 1
+    assert output.read_bytes().endswith(b'00:01:00,1,0,0\n')
+    output.unlink()
+    run()
+    assert len(calls) == 2
+
+def test_disabled_manifest_always_builds(tmp_path):
+    video = tmp_path / 'GX010001.mp4'
+    video.write_bytes(b'video')
+    manifest = BuildManifest(str(tmp_path / 'manifest.json'), enabled=False)
+    calls = []
+    for _ in range(2):
+        manifest.step('detect', [str(video)], {}, lambda: calls.append(1))
+    assert len(calls) == 2 and not os.path.exists(manifest.path)
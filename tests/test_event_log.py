@@ -0,0 +1,36 @@
+# The event log -> _scores.csv round trip, and which of the two a reel is cut from.
+from event_log import EventLogWriter, read_event_log
+from gesture_detection import export_scores_csv
+from highlight_windows import precise_events_file, read_highlight_events, read_scores_csv
+
+def write_log(path, video):
+    log = EventLogWriter(str(path), video, 'Team Black', 'Team Orange', 1, 2, fps=50, watermark_seconds=5)
+    log.add((1502, 30.04, 1, 0, 0, 'index', 0.91))
+    log.advance(40)
+    log.add((3251, 65.02, 0, 1, 0, 'v', 0.5))
+    log.add((4000, 80.0, 0, 0, 1, 'little', None))
+    log.close()
+    return str(path)
+
+def test_event_log_round_trips_to_the_csv(tmp_path):
+    video = str(tmp_path / 'GX010001.mp4')
+    log_path = write_log(tmp_path / 'GX010001_events.ndjson', video)
+    header, events = read_event_log(log_path)
+    assert header['inputs'] == [video] and header['starting_scores'] == [1, 2]
+    assert events == [(1502, 30.04, 1, 0, 0, 'index', 0.91), (3251, 65.02, 0, 1, 0, 'v', 0.5),
+                      (4000, 80.0, 0, 0, 1, 'little', None)]
+
+    csv_path = export_scores_csv(log_path)
+    assert csv_path == str(tmp_path / 'GX010001_scores.csv')
+    assert read_scores_csv(csv_path) == (video, 'Team Black', 'Team Orange', 1, 2,
+                                         [(30, 1, 0, 0), (65, 0, 1, 0), (80, 0, 0, 1)])
+    # The log keeps the millisecond times
+    assert read_highlight_events(log_path)[-1] == [(30.04, 1, 0, 0), (65.02, 0, 1, 0), (80.0, 0, 0, 1)]
+
+def test_log_is_used_until_the_csv_is_edited(tmp_path):
+    log_path = write_log(tmp_path / 'GX010001_events.ndjson', str(tmp_path / 'GX010001.mp4'))
+    csv_path = export_scores_csv(log_path)
+    assert precise_events_file(csv_path) == log_path
+    with open(csv_path, 'a') as f:
+        f.write('00:02:00,1,0,0\n')
+    assert precise_events_file(csv_path) == csv_path
@@ -0,0 +1,59 @@
+# classify against the per-gesture checks it replaced, on random landmarks.
+from types import SimpleNamespace
+
+import numpy as np
+
+from gesture_engine import GESTURE_NAMES, classify, gesture_confidence
+
+# The checks as split_and_hl.py had them before the gesture table
+def old_is_index_finger(landmarks):
+    return (landmarks.landmark[8].y < landmarks.landmark[6].y and
+            landmarks.landmark[12].y > landmarks.landmark[10].y and
+            landmarks.landmark[16].y > landmarks.landmark[14].y and
+            landmarks.landmark[20].y > landmarks.landmark[18].y)
+
+def old_is_v_sign(landmarks):
+    return [landmarks.landmark[8].y < landmarks.landmark[6].y,
+            landmarks.landmark[12].y < landmarks.landmark[10].y,
+            landmarks.landmark[16].y > landmarks.landmark[14].y,
+            landmarks.landmark[20].y > landmarks.landmark[18].y] == [True]*4
+
+def old_is_little_finger(landmarks):
+    return (landmarks.landmark[20].y < landmarks.landmark[18].y and
+            landmarks.landmark[8].y > landmarks.landmark[6].y and
+            landmarks.landmark[12].y > landmarks.landmark[10].y and
+            landmarks.landmark[16].y > landmarks.landmark[14].y)
+
+OLD_CHECKS = {'index': old_is_index_finger, 'v': old_is_v_sign, 'little': old_is_little_finger}
+
+def as_mediapipe(hand):
+    return SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in hand])
+
+def random_hands(count, seed=0):
+    rng = np.random.default_rng(seed)
+    hands = rng.random((count, 21, 3), dtype=np.float32)
+    # Quantised coordinates make ties (tip level with its joint) common
+    hands[count // 2:] = np.round(hands[count // 2:] * 4) / 4
+    return hands
+
+def test_classify_matches_old_checks():
+    hands = random_hands(5000)
+    matches = classify(hands)
+    assert matches.shape == (len(hands), len(GESTURE_NAMES))
+    for hand, row in zip(hands, matches):
+        landmarks = as_mediapipe(hand)
+        for name, matched in zip(GESTURE_NAMES, row):
+            assert matched == OLD_CHECKS[name](landmarks)
+
+def test_every_gesture_occurs_in_the_sample():
+    assert classify(random_hands(5000)).any(axis=0).all()
+
+def test_classify_batches_frames_and_hands():
+    hands = random_hands(24).reshape(4, 6, 21, 3)
+    assert np.array_equal(classify(hands).reshape(24, -1), classify(hands.reshape(24, 21, 3)))
+
+def test_confidence_is_zero_to_one():
+    hands = random_hands(1000, seed=2)
+    for hand in hands:
+        for gesture in range(len(GESTURE_NAMES)):
+            assert 0.0 <= gesture_confidence(hand, gesture) <= 1.0
@@ -0,0 +1,16 @@
+# Highlight windows and running scores.
+from highlight_windows import ScoreTimeline, coalesce_windows
+
+def test_windows_end_at_their_events():
+    assert coalesce_windows([(30, 1, 0, 0), (100, 0, 1, 0)], 7) == [(23, 30), (93, 100)]
+
+def test_overlapping_and_touching_windows_merge():
+    events = [(30, 1, 0, 0), (34, 0, 1, 0), (41, 0, 0, 1), (60, 1, 0, 0)]
+    assert coalesce_windows(events, 7) == [(23, 41), (53, 60)]
+
+def test_windows_are_clamped_at_zero_and_sorted():
+    assert coalesce_windows([(50, 1, 0, 0), (3, 0, 1, 0), (0, 0, 0, 1)], 7) == [(0, 3), (43, 50)]
+
+def test_score_counts_events_at_or_before_t():
+    scores = ScoreTimeline([(30, 1, 0, 0), (10, 0, 1, 0), (30, 0, 1, 0)], 2, 1)
+    assert [scores.at(t) for t in (0, 10, 29.9, 30, 1000)] == [(2, 1), (2, 2), (2, 2), (3, 3), (3, 3)]
@@ -0,0 +1,13 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+def test_gray_level_follows_the_channel_order():
+    # More red weighs 0.299 in gray; read as BGR it would be blue at 0.114 and stay under the threshold
+    still = np.full((72, 128, 3), 100, dtype=np.uint8)
+    redder = still.copy()
+    redder[..., 0] += 30
+    for rgb, infers in ((True, True), (False, False)):
+        gate = MotionGate(threshold=4.0)
+        assert gate.should_infer(still, 0.0, rgb)
+        assert gate.should_infer(redder, 0.2, rgb) == infers
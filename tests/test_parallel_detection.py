@@ -0,0 +1,64 @@
+# Shard planning, and merging shard landmarks so gestures across a shard
+# boundary fire as in a serial run.
+import numpy as np
+
+from gesture_detection import replay_events
+from gesture_engine import FINGER_PIPS, FINGER_TIPS, GESTURE_TABLE, UP
+from landmark_cache import RECORD_DTYPE
+from parallel_detection import merge_shard_records, plan_shards
+
+FPS = 25
+
+def hand(gesture):
+    landmarks = np.zeros((21, 3), dtype=np.float32)
+    landmarks[0, 1], landmarks[9, 1] = 0.9, 0.6  # wrist, middle knuckle
+    landmarks[FINGER_PIPS, 1] = 0.5
+    rules = dict((name, rules) for name, rules, _ in GESTURE_TABLE)[gesture]
+    landmarks[FINGER_TIPS, 1] = [0.3 if rule == UP else 0.7 for rule in rules]
+    return landmarks
+
+def make_records(gestures, step=5):
+    """One record every step frames; gestures[i] is the gesture shown in record i, or None."""
+    records = np.zeros(len(gestures), dtype=RECORD_DTYPE)
+    records['frame'] = np.arange(1, len(gestures) + 1) * step
+    for i, gesture in enumerate(gestures):
+        if gesture:
+            records['hands'][i] = 1
+            records['landmarks'][i, 0] = hand(gesture)
+    return records
+
+def split_into_shards(records, bounds, overlap):
+    """What the workers hand back: each shard's records in (own_start, own_end], after some warm-up."""
+    shards = []
+    for own_start, own_end in zip(bounds, bounds[1:]):
+        warm = records[(records['frame'] > own_start - overlap) & (records['frame'] <= own_end)]
+        shards.append(warm[warm['frame'] > own_start])
+    return shards
+
+def test_shards_cover_the_chapter_once():
+    shards = plan_shards(frame_count=10000, fps=FPS, shard_seconds=60, overlap_seconds=7)
+    assert shards[0] == (0, 0, 1500)
+    assert shards[-1][2] is None
+    for (_, _, own_end), (warm_start, own_start, _) in zip(shards, shards[1:]):
+        assert own_start == own_end
+        assert warm_start == own_start - 7 * FPS
+    assert shards[-1][1] < 10000
+
+def test_short_chapter_is_one_shard():
+    assert plan_shards(frame_count=100, fps=FPS, shard_seconds=60) == [(0, 0, None)]
+
+def test_merge_keeps_frame_order_and_drops_repeats():
+    records = make_records(['index'] * 10)
+    merged = merge_shard_records([records[:6], records[4:], records[:0]])
+    assert merged['frame'].tolist() == records['frame'].tolist()
+
+def test_merged_shards_replay_like_a_serial_run():
+    # A gesture held across the first boundary, and chained cooldowns: an
+    # event every cooldown, so a shard alone would fire at other times
+    gestures = (['index'] * 60 + [None] * 5 + ['v'] * 120 + [None] * 10 + ['little'] * 80) * 2
+    records = make_records(gestures)
+    serial = replay_events({'fps': FPS}, records)
+    assert len(serial) > 5
+    for bounds in ([0, 300, 900, 5000], [0, 37, 512, 513, 1400, 5000]):
+        shards = split_into_shards(records, bounds, overlap=50)
+        assert replay_events({'fps': FPS}, merge_shard_records(shards)) == serial
@@ -0,0 +1,34 @@
+# A failing stage must stop the others and close the frame source.
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+import pipeline
+
+class FailingWriter:
+    def add(self, frame_number, landmarks):
+        if frame_number >= 50:
+            raise OSError('disk full')
+
+def test_classify_failure_stops_the_pipeline(tmp_path, monkeypatch):
+    video = str(tmp_path / 'GX010001.mp4')
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'mp4v'), 25, (32, 32))
+    writer.write(np.zeros((32, 32, 3), dtype=np.uint8))
+    writer.release()
+    closed = threading.Event()
+    def frames(input_file, interval, start, end, *args, **kwargs):
+        try:
+            for n in range(interval, 10 ** 9, interval):
+                yield n, np.zeros((8, 8, 3), dtype=np.uint8)
+        finally:
+            closed.set()
+    monkeypatch.setattr(pipeline, 'open_sampled_frames', frames)
+    monkeypatch.setattr(pipeline, 'infer_landmarks', lambda *args: None)
+    threads = threading.active_count()
+    with pytest.raises(OSError, match='disk full'):
+        pipeline.detect_range_pipelined(video, 5, queue_depth=2, inference_workers=1, hands=object(),
+                                        cache_writer=FailingWriter())
+    assert closed.is_set()
+    assert threading.active_count() == threads
@@ -0,0 +1,33 @@
+import pytest
+
+from smart_cut import copies_audio, edge_encoder, plan_cut
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+def test_whole_gops_are_copied_and_edges_encoded():
+    assert plan_cut(1.5, 8.5, KEYFRAMES) == [('encode', 1.5, 2.0), ('copy', 2.0, 8.0), ('encode', 8.0, 8.5)]
+
+def test_window_on_keyframes_is_copied_whole():
+    assert plan_cut(2.0, 6.0, KEYFRAMES) == [('copy', 2.0, 6.0)]
+
+def test_window_within_one_gop_is_encoded():
+    assert plan_cut(2.5, 5.0, KEYFRAMES) == [('encode', 2.5, 5.0)]
+    assert plan_cut(2.5, 3.5, KEYFRAMES) == [('encode', 2.5, 3.5)]
+
+def test_edges_match_the_source_profile_and_level():
+    command = edge_encoder({'codec_name': 'h264', 'profile': 'High', 'level': 42, 'pix_fmt': 'yuvj420p'})
+    assert command[command.index('-profile:v') + 1] == 'high'
+    assert command[command.index('-level') + 1] == '4.2'
+    assert command[command.index('-pix_fmt') + 1] == 'yuvj420p'
+
+def test_unmatched_profiles_fall_back():
+    with pytest.raises(ValueError):
+        edge_encoder({'codec_name': 'h264', 'profile': 'High 4:4:4 Predictive', 'level': 51})
+    with pytest.raises(ValueError):
+        edge_encoder({'codec_name': 'prores', 'profile': 'HQ'})
+
+def test_only_aac_lc_audio_is_copied():
+    assert copies_audio({'codec_name': 'aac', 'profile': 'LC'})
+    assert not copies_audio({'codec_name': 'aac', 'profile': 'HE-AAC'})
+    assert not copies_audio({'codec_name': 'pcm_s16le'})
+    assert not copies_audio(None)
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from stage_scheduler import StageScheduler
+
+def test_results_flow_along_dependencies():
+    scheduler = StageScheduler()
+    scheduler.add('a', 'detect', lambda: 2)
+    scheduler.add('b', 'detect', lambda: 3)
+    scheduler.add('sum', 'combine', lambda a, b: a + b, ['a', 'b'])
+    scheduler.add('double', 'combine', lambda total: total * 2, ['sum'])
+    results, report = scheduler.run()
+    assert results == {'a': 2, 'b': 3, 'sum': 5, 'double': 10}
+    assert not scheduler.errors
+
+def test_stage_limits_cap_concurrency():
+    running, peak = {'render': 0}, {'render': 0}
+    lock = threading.Lock()
+    def render():
+        with lock:
+            running['render'] += 1
+            peak['render'] = max(peak['render'], running['render'])
+        time.sleep(0.02)
+        with lock:
+            running['render'] -= 1
+    scheduler = StageScheduler({'render': 2})
+    for i in range(6):
+        scheduler.add(f'render {i}', 'render', render)
+    scheduler.run()
+    assert peak['render'] == 2
+
+def test_same_stage_starts_in_order():
+    started = []
+    scheduler = StageScheduler({'detect': 1})
+    for i in range(5):
+        scheduler.add(f'detect {i}', 'detect', lambda i=i: started.append(i))
+    scheduler.run()
+    assert started == [0, 1, 2, 3, 4]
+
+def test_failure_skips_only_its_dependents():
+    def fail():
+        raise RuntimeError('no video')
+    scheduler = StageScheduler()
+    scheduler.add('detect 1', 'detect', fail)
+    scheduler.add('render 1', 'render', lambda csv: csv, ['detect 1'])
+    scheduler.add('detect 2', 'detect', lambda: 'two.csv')
+    scheduler.add('render 2', 'render', lambda csv: csv + '.mp4', ['detect 2'])
+    results, _ = scheduler.run()
+    assert [str(e) for e in scheduler.errors] == ['no video']
+    assert scheduler.tasks['render 1']['state'] == 'skipped'
+    assert results['render 2'] == 'two.csv.mp4'
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+import gesture_detection
+from gesture_detection import detect_windows, replay_events
+from gesture_engine import FINGER_PIPS, FINGER_TIPS, GESTURE_TABLE, UP
+from landmark_cache import LandmarkCacheWriter, load_landmark_cache
+from whistle_detection import WhistleGate, band_activity, lost_events, whistle_events
+
+RATE = 11025
+
+def test_tone_in_band_dominates_its_frames():
+    t = np.arange(RATE * 2) / RATE
+    noise = np.random.default_rng(0).normal(0, 0.01, len(t)).astype(np.float32)
+    tone = (0.5 * np.sin(2 * np.pi * 3500 * t) * (t >= 1)).astype(np.float32)
+    # Chunk boundaries must not matter
+    share, power = band_activity(np.array_split(noise + tone, 7), RATE, (2500, 4500))
+    whole, _ = band_activity([noise + tone], RATE, (2500, 4500))
+    assert np.allclose(share, whole, atol=1e-6)
+    half = len(share) // 2
+    assert share[:half - 2].max() < 0.5 < share[half + 2:].min()
+
+def test_windows_around_whistles_merge_and_clamp():
+    gate = WhistleGate(before=10, after=20)
+    whistles = [(5.0, 6.0, 0.9), (30.0, 31.0, 0.9), (100.0, 101.0, 0.9)]
+    assert gate.windows(whistles, 110) == [(0.0, 51.0), (90.0, 110)]
+
+def test_whistles_within_the_cooldown_become_one_event():
+    events = whistle_events([(12.0, 12.8, 0.9), (14.0, 14.5, 0.8), (60.0, 60.5, 0.95)], fps=25, cooldown=5)
+    assert events == [(300, 12.0, 0, 0, 1, 'whistle', 0.9), (1500, 60.0, 0, 0, 1, 'whistle', 0.95)]
+
+def test_lost_events_are_full_scan_events_without_a_gated_match():
+    full = [(1, 30.0, 1, 0, 0, 'index', 1.0), (2, 90.0, 0, 1, 0, 'v', 1.0)]
+    gated = [(1, 30.5, 1, 0, 0, 'index', 1.0), (2, 90.0, 1, 0, 0, 'index', 1.0)]
+    assert lost_events(full, gated) == [full[1]]
+    assert lost_events(full, gated, match_columns=False) == []
+
+def mediapipe_hand(gesture):
+    """A MediaPipe-style hand (.landmark with x, y, z) showing gesture."""
+    landmarks = np.zeros((21, 3), dtype=np.float32)
+    landmarks[0, 1], landmarks[9, 1] = 0.9, 0.6  # wrist, middle knuckle
+    landmarks[FINGER_PIPS, 1] = 0.5
+    rules = dict((name, rules) for name, rules, _ in GESTURE_TABLE)[gesture]
+    landmarks[FINGER_TIPS, 1] = [0.3 if rule == UP else 0.7 for rule in rules]
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in landmarks])
+
+def test_replayed_window_cache_matches_detect_windows(tmp_path, monkeypatch):
+    video = str(tmp_path / 'GX010001.mp4')
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'mp4v'), 25, (32, 32))
+    for _ in range(400):
+        writer.write(np.zeros((32, 32, 3), dtype=np.uint8))
+    writer.release()
+    # 'index' on the last sample of the first window and the first of the
+    # second: held across the gap it would fire at 155, and its cooldown
+    # would hide the one at 250
+    shown = {100: 'index', 155: 'index', 250: 'index'}
+    monkeypatch.setattr(gesture_detection, 'open_sampled_frames',
+                        lambda input_file, interval, start, end, *args: ((n, n) for n in range(start + 1, end + 1)
+                                                                         if n % interval == 0))
+    monkeypatch.setattr(gesture_detection, 'infer_landmarks',
+                        lambda hands, frame_number, *args: [mediapipe_hand(shown[frame_number])]
+                        if frame_number in shown else None)
+    windows = [(0, 100), (150, 300)]
+    cache_writer = LandmarkCacheWriter(video, {'fps_reduction_factor': 5}, 25, windows)
+    gated = detect_windows(video, 5, windows, hands=object(), cache_writer=cache_writer)
+    cache_writer.close()
+    assert [event[0] for event in gated] == [250]
+    assert replay_events(*load_landmark_cache(video, {'fps_reduction_factor': 5})) == gated
@@ -0,0 +1,77 @@
+# Resumable uploads against fake_youtube_server, with the faults the real
+# endpoint produces: 5xx answers, connections lost mid-chunk and sessions
+# that expire.
+import os
+from datetime import date, datetime
+
+import httplib2
+import pytest
+
+import split_and_hl
+from build_manifest import BuildManifest
+from fake_youtube_server import FakeUploadServer
+from youtube_upload import CHUNK_ALIGN, Httplib2Transport, ResumableUpload, UploadError
+
+METADATA = {'snippet': {'title': 'Highlights'}, 'status': {'privacyStatus': 'unlisted'}}
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'combined_highlights.mp4'
+    path.write_bytes(os.urandom(5 * CHUNK_ALIGN + 1234))
+    return str(path)
+
+def upload(server, path, **kwargs):
+    return ResumableUpload(Httplib2Transport(httplib2.Http()), path, METADATA, chunk_size=CHUNK_ALIGN, backoff=0,
+                           upload_url=server.upload_url, **kwargs)
+
+def test_upload_survives_faults(video):
+    with FakeUploadServer(faults=[None, 503, 'drop', None, 'expire', None, 'drop']) as server:
+        result = upload(server, video).run()
+    with open(video, 'rb') as f:
+        assert server.uploads[result['id']] == f.read()
+    assert result['snippet'] == METADATA['snippet']
+    assert not os.path.exists(video + '.upload.json')
+    # The expired session was replaced by a new one
+    assert sum(method == 'POST' for method, _, _ in server.requests) == 2
+
+def test_upload_resumes_in_a_later_run(video):
+    with FakeUploadServer(faults=[None, None, 503]) as server:
+        with pytest.raises(UploadError):
+            upload(server, video, max_retries=0).run()
+        assert os.path.exists(video + '.upload.json')
+        result = upload(server, video).run()
+    with open(video, 'rb') as f:
+        assert server.uploads[result['id']] == f.read()
+    assert not os.path.exists(video + '.upload.json')
+    # The second run asked where the session stood instead of starting over
+    assert sum(method == 'POST' for method, _, _ in server.requests) == 1
+    puts = [content_range for method, _, content_range in server.requests if method == 'PUT']
+    assert f'bytes */{os.path.getsize(video)}' in puts
+    assert puts[0] == f'bytes 0-{CHUNK_ALIGN - 1}/{os.path.getsize(video)}'
+
+def test_uploads_are_titled_by_recording_date_and_done_once(tmp_path, monkeypatch):
+    chapter = tmp_path / 'GX010001.MP4'
+    combined = tmp_path / 'combined_highlights.mp4'
+    clips_dir = tmp_path / 'GX010001_highlights_clips'
+    clips_dir.mkdir()
+    for path in (chapter, combined, clips_dir / 'GX010001_highlights_square_000.mp4'):
+        path.write_bytes(os.urandom(1000))
+    monkeypatch.setattr(split_and_hl, 'probe_creation_time',
+                        lambda path: datetime(2024, 5, 4, 18, 30) if path == str(chapter) else None)
+    uploads = []
+    monkeypatch.setattr(split_and_hl, 'upload_video_to_youtube',
+                        lambda path, title, description: uploads.append(title) or f'video{len(uploads)}')
+    manifest = BuildManifest(str(tmp_path / 'highlights_manifest.json'))
+    for _ in range(2):
+        assert split_and_hl.upload_highlights(manifest, str(combined)) == 'video1'
+        assert split_and_hl.upload_clips(manifest, str(clips_dir)) == ['video2']
+    assert uploads == ['May 04 - Highlights', 'May 04 - GX010001_highlights_square_000']
+
+def test_recording_date_falls_back_to_the_chapter_mtime(tmp_path, monkeypatch):
+    chapter = tmp_path / 'GX010001.mp4'
+    chapter.write_bytes(b'')
+    reel = tmp_path / 'GX010001_highlights.mp4'
+    reel.write_bytes(b'')
+    os.utime(chapter, (datetime(2023, 11, 2, 12).timestamp(),) * 2)
+    monkeypatch.setattr(split_and_hl, 'probe_creation_time', lambda path: None)
+    assert split_and_hl.recording_date(str(reel)) == date(2023, 11, 2)
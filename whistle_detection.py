@@ -0,0 +1,175 @@
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+import metrics
+
+# === Audio ===
+def has_audio(input_file):
+    command = ['ffprobe', '-v', 'error', '-show_entries', 'stream=codec_type', '-of', 'csv=p=0', input_file]
+    probe = metrics.run_subprocess('probe', command, capture_output=True, text=True, check=True)
+    return 'audio' in probe.stdout.split()
+
+def decode_audio_chunks(input_file, sample_rate, chunk_seconds=60):
+    """Yield the first audio stream as mono float32 arrays of chunk_seconds, decoded by ffmpeg (no video).
+
+    Raises CalledProcessError, with the end of ffmpeg's stderr, if the
+    decode fails.
+    """
+    command = ['ffmpeg', '-v', 'error', '-nostdin', '-i', input_file, '-map', '0:a:0', '-vn', '-ac', '1',
+               '-ar', str(sample_rate), '-f', 's16le', 'pipe:1']
+    errors = tempfile.TemporaryFile()
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+    started = time.perf_counter()
+    finished = False
+    try:
+        while True:
+            data = proc.stdout.read(2 * int(sample_rate * chunk_seconds))
+            if not data:
+                break
+            yield np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768
+        finished = True
+    finally:
+        proc.stdout.close()
+        if not finished:
+            proc.kill()
+        proc.wait()
+        metrics.observe('subprocess_seconds', time.perf_counter() - started, tool='ffmpeg', stage='whistle')
+        errors.seek(0)
+        stderr = errors.read()[-4000:].decode(errors='replace')
+        errors.close()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, command, stderr=stderr)
+
+def band_activity(chunks, sample_rate, band, frame_size=512, hop=256):
+    """(band share, band power in dB) per STFT frame over a stream of sample chunks.
+
+    Each chunk is cut into overlapping Hann-windowed frames with a strided
+    view and transformed with one rfft call; the samples that do not fill
+    a last frame are carried into the next chunk. Band share is the part
+    of a frame's power that falls inside band (lo, hi) in Hz.
+    """
+    window = np.hanning(frame_size).astype(np.float32)
+    lo = int(np.ceil(band[0] * frame_size / sample_rate))
+    hi = int(band[1] * frame_size / sample_rate) + 1
+    shares, powers = [], []
+    carry = np.empty(0, dtype=np.float32)
+    for chunk in chunks:
+        samples = np.concatenate([carry, chunk])
+        count = (len(samples) - frame_size) // hop + 1
+        if count <= 0:
+            carry = samples
+            continue
+        frames = np.lib.stride_tricks.sliding_window_view(samples, frame_size)[::hop][:count]
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        in_band = spectrum[:, lo:hi].sum(axis=1)
+        shares.append(in_band / (spectrum.sum(axis=1) + 1e-12))
+        powers.append(10 * np.log10(in_band + 1e-12))
+        carry = samples[count * hop:]
+    if not shares:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(shares), np.concatenate(powers)
+
+# === Whistle Gate ===
+class WhistleGate:
+    """Find referee whistles in a video's audio and the windows around them.
+
+    A whistle is a run of STFT frames, at least min_duration long, whose
+    power is mostly (min_band_ratio) inside band and at least min_snr_db
+    above the file's median in-band level; runs less than max_gap apart
+    are one whistle. Every goal is followed by a whistle, so hand
+    inference only has to run from before seconds ahead of each whistle
+    to after seconds past it. With whistle_only, the whistles themselves
+    become highlight events, for footage where the signaller is out of
+    frame.
+    """
+
+    def __init__(self, before=10.0, after=20.0, whistle_only=False, band=(2500, 4500), min_band_ratio=0.5,
+                 min_snr_db=12.0, min_duration=0.2, max_gap=0.3, sample_rate=11025):
+        self.before = before
+        self.after = after
+        self.whistle_only = whistle_only
+        self.band = band
+        self.min_band_ratio = min_band_ratio
+        self.min_snr_db = min_snr_db
+        self.min_duration = min_duration
+        self.max_gap = max_gap
+        self.sample_rate = sample_rate
+        self.hop = 256
+
+    def scan(self, input_file):
+        """[(start, end, peak band share)] in seconds; None when the file has no audio stream.
+
+        A decode failure raises CalledProcessError rather than passing
+        for a file without audio.
+        """
+        if not has_audio(input_file):
+            return None
+        with metrics.timed('whistle_scan_seconds'):
+            share, power = band_activity(decode_audio_chunks(input_file, self.sample_rate), self.sample_rate,
+                                         self.band, hop=self.hop)
+        if not len(share):
+            return None
+        active = (share >= self.min_band_ratio) & (power >= np.median(power) + self.min_snr_db)
+        edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+        seconds_per_frame = self.hop / self.sample_rate
+        whistles = []
+        for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            if whistles and start * seconds_per_frame - whistles[-1][1] < self.max_gap:
+                previous = whistles.pop()
+                whistles.append((previous[0], end * seconds_per_frame, max(previous[2], share[start:end].max())))
+            else:
+                whistles.append((start * seconds_per_frame, end * seconds_per_frame, share[start:end].max()))
+        whistles = [(float(start), float(end), float(peak)) for start, end, peak in whistles
+                    if end - start >= self.min_duration]
+        metrics.count('whistles_found', len(whistles))
+        return whistles
+
+    def windows(self, whistles, duration):
+        """Merged (start, end) seconds to run hand inference in, clamped to [0, duration]."""
+        windows = []
+        for start, end, _ in whistles:
+            start, end = max(0.0, start - self.before), min(duration, end + self.after)
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+            else:
+                windows.append((start, end))
+        return windows
+
+def whistle_events(whistles, fps, cooldown=5.0, event_log=None):
+    """Highlight events (the CSV's third column) at whistle starts, for whistle_only.
+
+    A whistle less than cooldown seconds after the last event's is
+    dropped, as a held gesture would be.
+    """
+    events = []
+    for start, end, peak in whistles:
+        if events and start - events[-1][1] < cooldown:
+            continue
+        events.append((round(start * fps), start, 0, 0, 1, 'whistle', peak))
+        if event_log:
+            event_log.add(events[-1])
+    metrics.count('whistle_events', len(events))
+    return events
+
+def make_whistle_gate(whistle_gating):
+    """Build a WhistleGate from a settings dict, or None when whistle gating is off."""
+    return WhistleGate(**whistle_gating) if whistle_gating else None
+
+# === Reporting ===
+def lost_events(full_events, gated_events, tolerance=2.0, match_columns=True):
+    """Events of a full scan with no gated event (of the same columns) within tolerance seconds."""
+    return [event for event in full_events
+            if not any(abs(event[1] - other[1]) <= tolerance and (event[2:5] == other[2:5] or not match_columns)
+                       for other in gated_events)]
+
+def print_whistle_report(input_file, whistles, windows, duration, full_events=None, gated_events=None):
+    scanned = sum(end - start for start, end in windows)
+    print(f"{input_file}: {len(whistles)} whistles, hand inference over {scanned:.0f}s of {duration:.0f}s "
+          f"({100 * (1 - scanned / max(duration, 1e-9)):.1f}% skipped)")
+    if full_events is not None:
+        lost = lost_events(full_events, gated_events)
+        print(f"{input_file}: {len(lost)} of {len(full_events)} full-scan events lost"
+              + ''.join(f"\n  {event[1]:.1f}s {event[5]}" for event in lost))
@@ -0,0 +1,185 @@
+import http.client
+import json
+import os
+import random
+import re
+import time
+
+import httplib2
+
+import metrics
+from build_manifest import params_hash
+from landmark_cache import video_fingerprint
+
+UPLOAD_URL = 'https://www.googleapis.com/upload/youtube/v3/videos?uploadType=resumable&part=snippet,status'
+CHUNK_ALIGN = 256 * 1024  # every chunk but the last has to be a multiple of this
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class UploadError(Exception):
+    """The server refused the upload, or it kept failing after every retry."""
+
+# === Transport ===
+class Httplib2Transport:
+    """request(method, url, headers, body) -> (status, headers, body) over an httplib2.Http-like object.
+
+    Use youtube_transport() for the real API, or wrap a plain
+    httplib2.Http() to talk to fake_youtube_server. Any object with the
+    same request() method can replace this class; connection failures
+    must surface as OSError (ConnectionError) so they are retried.
+    """
+
+    def __init__(self, http):
+        self.http = http
+        # 308 is the protocol's "Resume Incomplete", not a redirect to follow
+        self.http.redirect_codes = set(self.http.redirect_codes) - {308}
+
+    def request(self, method, url, headers=None, body=None):
+        try:
+            response, content = self.http.request(url, method, body=body, headers=headers or {})
+        except (httplib2.HttpLib2Error, http.client.HTTPException) as e:
+            raise ConnectionError(f"{method} {url}: {e!r}") from e
+        return response.status, {k.lower(): v for k, v in response.items()}, content
+
+def youtube_transport(credentials):
+    """Transport authorised with OAuth credentials; it refreshes the token when it expires."""
+    import google_auth_httplib2
+    return Httplib2Transport(google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http()))
+
+# === Resumable Upload ===
+class ResumableUpload:
+    """Upload one file with the YouTube resumable-upload protocol.
+
+    The file goes up in chunk_size pieces. After a dropped connection or a
+    5xx/429 the client waits (exponential backoff with jitter, up to
+    max_retries times in a row), asks the server how much it has, and
+    continues from there. The session URI is saved next to the file
+    (<file>.upload.json) along with a fingerprint of the file and its
+    metadata, so a later run picks the same upload back up instead of
+    starting over; the state file is removed once the upload completes.
+    progress, if given, is called with (bytes committed, total bytes).
+    """
+
+    def __init__(self, transport, path, metadata, chunk_size=8 * 1024 * 1024, max_retries=8, backoff=1.0,
+                 max_backoff=64.0, progress=None, upload_url=UPLOAD_URL, content_type='video/*'):
+        if chunk_size <= 0 or chunk_size % CHUNK_ALIGN:
+            raise ValueError(f"chunk_size must be a positive multiple of {CHUNK_ALIGN}, got {chunk_size}")
+        self.transport = transport
+        self.path = path
+        self.metadata = metadata
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.progress = progress
+        self.upload_url = upload_url
+        self.content_type = content_type
+        self.state_path = path + '.upload.json'
+        self.size = os.path.getsize(path)
+        if not self.size:
+            raise ValueError(f"{path} is empty")
+        self.identity = {'fingerprint': video_fingerprint(path), 'size': self.size,
+                         'metadata': params_hash(metadata), 'upload_url': upload_url}
+        self.session_uri = self._load_session()
+
+    # --- Session state ---
+    def _load_session(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state['session_uri'] if state.get('identity') == self.identity else None
+
+    def _save_session(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'session_uri': self.session_uri, 'identity': self.identity}, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def _forget_session(self):
+        self.session_uri = None
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    # --- Protocol ---
+    def _start(self):
+        body = json.dumps(self.metadata).encode()
+        status, headers, content = self.transport.request('POST', self.upload_url, {
+            'Content-Type': 'application/json; charset=UTF-8', 'Content-Length': str(len(body)),
+            'X-Upload-Content-Length': str(self.size), 'X-Upload-Content-Type': self.content_type}, body)
+        if status != 200 or 'location' not in headers:
+            return status, content
+        self.session_uri = headers['location']
+        self._save_session()
+        return status, content
+
+    def _query(self):
+        """Ask the server how far the upload got: (status, committed bytes, content)."""
+        status, headers, content = self.transport.request('PUT', self.session_uri, {
+            'Content-Length': '0', 'Content-Range': f'bytes */{self.size}'})
+        return status, _committed(headers), content
+
+    def _send(self, f, offset):
+        f.seek(offset)
+        chunk = f.read(self.chunk_size)
+        started = time.perf_counter()
+        status, headers, content = self.transport.request('PUT', self.session_uri, {
+            'Content-Length': str(len(chunk)),
+            'Content-Range': f'bytes {offset}-{offset + len(chunk) - 1}/{self.size}'}, chunk)
+        metrics.observe('upload_chunk_seconds', time.perf_counter() - started)
+        return status, _committed(headers), content
+
+    def run(self):
+        """Upload until done; returns the API's response (the video resource) as a dict."""
+        offset = None  # None: ask the server how much it has before sending
+        failures = 0
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    if self.session_uri is None:
+                        status, content = self._start()
+                        if status == 200 and self.session_uri:
+                            offset, failures = 0, 0
+                            continue
+                    else:
+                        if offset is None:
+                            status, committed, content = self._query()
+                        else:
+                            status, committed, content = self._send(f, offset)
+                        if status in (200, 201):
+                            self._forget_session()
+                            if self.progress:
+                                self.progress(self.size, self.size)
+                            return json.loads(content)
+                        if status == 308:
+                            if offset is not None:
+                                metrics.count('upload_bytes', max(0, committed - offset))
+                            offset, failures = committed, 0
+                            if self.progress:
+                                self.progress(offset, self.size)
+                            continue
+                        if status in (404, 410):
+                            # The session expired (they last about a week); start a new one from byte 0
+                            metrics.count('upload_retries', reason='expired')
+                            self._forget_session()
+                            continue
+                except OSError as e:
+                    status, content = None, e
+                if status is not None and status not in RETRY_STATUSES:
+                    raise UploadError(f"Upload of {self.path} failed with HTTP {status}: {content[:500]!r}")
+
+                failures += 1
+                metrics.count('upload_retries', reason=str(status or 'connection'))
+                if failures > self.max_retries:
+                    raise UploadError(f"Upload of {self.path} still failing after {self.max_retries} retries "
+                                      f"(last: {status or content!r})")
+                delay = min(self.max_backoff, self.backoff * 2 ** (failures - 1)) * random.uniform(0.5, 1.0)
+                print(f"Upload of {os.path.basename(self.path)} interrupted ({status or content!r}); "
+                      f"retry {failures}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                offset = None
+
+def _committed(headers):
+    """Bytes the server holds, from a 308's Range header ('bytes=0-N'); 0 when it has none."""
+    match = re.fullmatch(r'bytes=0-(\d+)', headers.get('range', ''))
+    return int(match.group(1)) + 1 if match else 0